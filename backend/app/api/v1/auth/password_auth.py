@@ -1,38 +1,82 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Cookie 
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import uuid4
+import redis
 
 from app.core import settings
-from app.crud.creator import get_user_by_email
-from app.db.session import get_db
-from app.utils.auth import verify_password
+from app.crud.creator import get_user_by_email_async
+from app.db.session import get_async_db
+from app.utils.password_hashing import verify_and_update_password_async
 from app.utils.constants.http_codes import (
     HTTP_204_NO_CONTENT,
     HTTP_401_UNAUTHORIZED, 
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 from app.utils.constants.http_error_details import (
     INVALID_LOGIN_CREDENTIALS_ERROR,
+    SERVER_BUSY_ERROR,
 )
-from app.utils.auth import create_access_token, create_refresh_token, decode_refresh_token, store_tokens, store_access_token
+from app.utils.auth import create_access_token, create_refresh_token, decode_refresh_token, store_tokens
 from app.utils.logging import Logger, LogLevel
+from app.utils.rate_limit import limit_login
+from app.utils.refresh_tokens import RotationResult, register_refresh_token, revoke_refresh_token, \
+    revoke_user_refresh_tokens, rotate_refresh_token
+
+def refresh_token_store_unavailable(e: redis.RedisError) -> HTTPException:
+    Logger.log(LogLevel.ERROR, f"Refresh token store unavailable: {str(e)}")
+    return HTTPException(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        detail=SERVER_BUSY_ERROR,
+        headers={"Retry-After": "1"}
+    )
+
+def clear_auth_cookies(response: Response):
+    response.delete_cookie(
+        key="access_token",
+        httponly=True,
+        secure=False,      
+        samesite="lax",
+        path="/"
+    )
+    response.delete_cookie(
+        key="refresh_token",
+        httponly=True,
+        secure=False,
+        samesite="lax",
+        path="/"
+    )
 
 router = APIRouter()
 
-@router.post('/login')
-async def login(response: Response, db = Depends(get_db) , form_data: OAuth2PasswordRequestForm = Depends()):
+@router.post('/login', dependencies=[Depends(limit_login)])
+async def login(response: Response, db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()):
     email = form_data.username
     password = form_data.password
-    user = get_user_by_email(db=db, email=email)
-    if user is None or not verify_password(password, user.password_hash):
+    user = await get_user_by_email_async(db=db, email=email)
+    if user is None or not user.password_hash:
+        Logger.log(LogLevel.ERROR, "Incorrect login credentials.")
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=INVALID_LOGIN_CREDENTIALS_ERROR)
+    verified, new_password_hash = await verify_and_update_password_async(password, user.password_hash)
+    if not verified:
         Logger.log(LogLevel.ERROR, "Incorrect login credentials.")
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=INVALID_LOGIN_CREDENTIALS_ERROR)
+    if new_password_hash:
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the plain password.
+        user.password_hash = new_password_hash
+        await db.commit()
     access_token = create_access_token(data={
         "sub": str(user.id)
     })
+    jti = str(uuid4())
     refresh_token = create_refresh_token(data={
         "sub": str(user.id),
-        "jti": str(uuid4())
+        "jti": jti
     })
+    try:
+        await register_refresh_token(user.id, jti)
+    except redis.RedisError as e:
+        raise refresh_token_store_unavailable(e)
     store_tokens(response, access_token, refresh_token)
     if not user.has_profile:
         return {
@@ -57,35 +101,52 @@ async def refresh_auth_tokens(response: Response, refresh_token: str = Cookie(No
     if decoded is None:
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=INVALID_LOGIN_CREDENTIALS_ERROR)
     sub = decoded.get("sub")
+    jti = str(uuid4())
+    try:
+        result = await rotate_refresh_token(int(sub), decoded.get("jti"), jti)
+        if result is RotationResult.REUSED:
+            # A rotated token came back after the grace window: assume it was stolen and end every session.
+            Logger.log(LogLevel.WARN, f"Refresh token reuse detected for user {sub}, revoking all sessions.")
+            await revoke_user_refresh_tokens(int(sub))
+    except redis.RedisError as e:
+        raise refresh_token_store_unavailable(e)
+    if result is not RotationResult.ROTATED:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=INVALID_LOGIN_CREDENTIALS_ERROR)
+
     access_token = create_access_token(data={
         "sub": sub,
     })
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=False,
-        samesite='lax',
-        max_age=60 * settings.access_token_expire_minutes
-    )
+    refresh_token = create_refresh_token(data={
+        "sub": sub,
+        "jti": jti
+    })
+    store_tokens(response, access_token, refresh_token)
     response.status_code = HTTP_204_NO_CONTENT
     return response
 
 @router.post("/logout")
-async def logout(response: Response):
-    response.delete_cookie(
-        key="access_token",
-        httponly=True,
-        secure=False,      
-        samesite="lax",
-        path="/"
-    )
-    response.delete_cookie(
-        key="refresh_token",
-        httponly=True,
-        secure=False,
-        samesite="lax",
-        path="/"
-    )
+async def logout(response: Response, refresh_token: str = Cookie(None)):
+    try:
+        decoded = decode_refresh_token(refresh_token) if refresh_token else None
+        if decoded is not None:
+            await revoke_refresh_token(int(decoded["sub"]), decoded["jti"])
+    except HTTPException:
+        pass
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not revoke refresh token on logout: {str(e)}")
+    clear_auth_cookies(response)
     response.status_code = HTTP_204_NO_CONTENT
-    return response
\ No newline at end of file
+    return response
+
+@router.post("/logout-all")
+async def logout_all(response: Response, refresh_token: str = Cookie(None)):
+    decoded = decode_refresh_token(refresh_token) if refresh_token else None
+    if decoded is None:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail=INVALID_LOGIN_CREDENTIALS_ERROR)
+    try:
+        await revoke_user_refresh_tokens(int(decoded["sub"]))
+    except redis.RedisError as e:
+        raise refresh_token_store_unavailable(e)
+    clear_auth_cookies(response)
+    response.status_code = HTTP_204_NO_CONTENT
+    return response
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_400_BAD_REQUEST
 
 from app.models.creator import Creator
-from app.schemas.creator import CreatorOut, CreatorCreate, CurrentUserDataOut, CreatorWithProfileOut
-from app.db.session import get_db
+from app.schemas.creator import CreatorOut, CreatorCreate, CurrentUserDataOut, Principal
+from app.db.session import get_async_db
 from app.crud import creator as creator_crud
-from app.utils.auth import get_current_user_with_profile
+from app.utils.auth import get_current_principal
 from app.utils.constants.http_codes import (
     HTTP_200_OK,
     HTTP_201_CREATED,
@@ -14,12 +14,13 @@ from app.utils.constants.http_codes import (
 )
 from app.utils.exceptions.custom_exceptions import FieldValidationError
 from app.utils.logging import Logger, LogLevel
+from app.utils.rate_limit import limit_signup
 from app.utils.s3 import build_s3_url
 
 router = APIRouter()
 
 @router.get("/me", response_model=CurrentUserDataOut, status_code=HTTP_200_OK)
-async def get_logged_in_user(current_user: CreatorWithProfileOut = Depends(get_current_user_with_profile)):
+async def get_logged_in_user(current_user: Principal = Depends(get_current_principal)):
     try:
         return {
             "id": current_user.id,
@@ -35,20 +36,20 @@ async def get_logged_in_user(current_user: CreatorWithProfileOut = Depends(get_c
             detail=str(e)
         )
 
-@router.post("/create", response_model=CreatorOut, status_code=HTTP_201_CREATED)
-async def create(creator_in: CreatorCreate, db: Session = Depends(get_db)):
+@router.post("/create", response_model=CreatorOut, status_code=HTTP_201_CREATED, dependencies=[Depends(limit_signup)])
+async def create(creator_in: CreatorCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        user =  creator_crud.create_user(
+        user = await creator_crud.create_user_async(
             creator_in=creator_in,
             db=db
         )
-        db.commit()
+        await db.commit()
         return user
-    except FieldValidationError as e:
-        db.rollback()
+    except (FieldValidationError, HTTPException) as e:
+        await db.rollback()
         raise e
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error: {str(e)}"
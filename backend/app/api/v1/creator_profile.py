@@ -1,11 +1,15 @@
 from fileinput import filename
+import asyncio
+import os
 
-from fastapi import APIRouter, Depends, Form, File, UploadFile
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Optional
 
-from app.external_services.aws_s3_client import AwsS3Client
+from app.celery.tasks import task_process_profile_image
+from app.external_services.aws_s3_client import AwsS3Client, get_s3_client
 from app.utils.constants.http_codes import (
     HTTP_200_OK,
     HTTP_201_CREATED,
@@ -13,55 +17,62 @@ from app.utils.constants.http_codes import (
     HTTP_404_NOT_FOUND,
     HTTP_500_INTERNAL_SERVER_ERROR
 )
+from app.core import settings
+from app.schemas.creator import Principal
 from app.schemas.creator_profile import CreatorProfileCreate, CreatorProfileUpdate, CreatorProfileOut, \
-    CreatorProfileUploadPictures
+    CreatorProfileUploadPictures, ProfileImageUploadCreate, ProfileImageUploadOut, ProfileImageUploadConfirm
 from app.db.base import Creator, Tip
-from app.db.session import get_db
+from app.db.session import get_async_db, AsyncSessionLocal
 from app.crud import creator_profile as crud_creator_profile
-from app.utils.auth import get_current_user, get_optional_user
+from app.crud import tip as crud_tip
+from app.utils.auth import get_current_principal, get_current_user_with_profile_async
+from app.utils.cache import get_or_build_creator_profile
 from app.utils.constants.http_error_details import (
     CREATOR_PROFILE_NOT_FOUND_ERROR,
     CREATOR_PROFILE_ALREADY_EXISTS,
     CREATOR_PROFILE_DOES_NOT_EXIST
 )
-from app.utils.exceptions.custom_exceptions import FieldValidationError
 from app.utils.logging import Logger, LogLevel
-from app.utils.s3 import build_s3_url, upload_profile_picture_to_s3, delete_profile_picture_from_s3, \
-    upload_profile_banner_to_s3, delete_profile_banner_from_s3
-from app.utils.upload import validate_uploaded_image
+from app.utils.s3 import build_profile_picture_key, build_profile_banner_key
+from app.utils.exceptions.custom_exceptions import FieldValidationError
+from app.utils.upload import ALLOWED_TYPES, MAX_FILE_SIZE, StreamedForm, stream_image_form, verify_presigned_upload
 
 router = APIRouter()
 
-@router.get("/username/{username}", response_model=CreatorProfileOut, status_code=HTTP_200_OK)
-async def get(username: str, db: Session = Depends(get_db), current_user: Optional[Creator] = Depends(get_optional_user)):
-    try:
-        creator_profile = crud_creator_profile.get_creator_profile_by_username(
+async def build_creator_profile_out(username: str) -> Optional[CreatorProfileOut]:
+    async with AsyncSessionLocal() as db:
+        creator_profile = await crud_creator_profile.get_creator_profile_by_username_async(
             db=db,
             username=username
         )
         if not creator_profile:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=CREATOR_PROFILE_NOT_FOUND_ERROR)
-        tips = db.query(Tip).filter_by(creator_profile_id=creator_profile.id).order_by(Tip.created_at.desc()).limit(6).all()
-        profile_picture_url=None
-        if creator_profile.profile_picture_key:
-            profile_picture_url=build_s3_url(creator_profile.profile_picture_key)
-        profile_banner_url = None
-        if creator_profile.profile_banner_key:
-            profile_banner_url = build_s3_url(creator_profile.profile_banner_key)
-        return CreatorProfileOut(
-            id=creator_profile.id,
-            display_name=creator_profile.display_name,
-            bio=creator_profile.bio,
-            created_at=creator_profile.created_at,
-            is_bank_connected=creator_profile.is_bank_connected,
-            currency=creator_profile.get_currency,
-            tube_tip_value=creator_profile.get_tube_tip_value,
-            tips=tips,
-            number_of_tips=creator_profile.number_of_tips,
-            youtube_channel_name=creator_profile.youtube_channel_name,
-            profile_picture_url=profile_picture_url,
-            profile_banner_url=profile_banner_url
+            return None
+        tips = await crud_tip.get_tips_by_creator_async(db=db, creator_profile_id=creator_profile.id, limit=6)
+    return CreatorProfileOut(
+        id=creator_profile.id,
+        display_name=creator_profile.display_name,
+        bio=creator_profile.bio,
+        created_at=creator_profile.created_at,
+        is_bank_connected=creator_profile.is_bank_connected,
+        currency=creator_profile.get_currency,
+        tube_tip_value=creator_profile.get_tube_tip_value,
+        tips=tips,
+        number_of_tips=creator_profile.number_of_tips,
+        youtube_channel_name=creator_profile.youtube_channel_name,
+        profile_picture_url=creator_profile.profile_picture_url,
+        profile_banner_url=creator_profile.profile_banner_url
+    )
+
+@router.get("/username/{username}", response_model=CreatorProfileOut, status_code=HTTP_200_OK)
+async def get(username: str):
+    try:
+        creator_profile = await get_or_build_creator_profile(
+            username=username,
+            build=lambda: build_creator_profile_out(username)
         )
+        if not creator_profile:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=CREATOR_PROFILE_NOT_FOUND_ERROR)
+        return creator_profile
     except ValueError as e:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
@@ -71,70 +82,186 @@ async def get(username: str, db: Session = Depends(get_db), current_user: Option
 @router.post("/create", response_model=CreatorProfileOut, status_code=HTTP_201_CREATED)
 async def create(
     profile_in: CreatorProfileCreate,
-    current_user: Creator = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Creator = Depends(get_current_user_with_profile_async),
+    db: AsyncSession = Depends(get_async_db),
     ):
     if current_user.has_profile:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=CREATOR_PROFILE_ALREADY_EXISTS)
     try:
-        creator_profile = crud_creator_profile.create_user_profile(
+        creator_profile = await crud_creator_profile.create_user_profile_async(
             db=db,
             user_id=current_user.id,
+            username=current_user.username,
             creator_profile_in=profile_in,
         )
-        db.commit()
-        return creator_profile
+        await db.commit()
+        # Built explicitly: serializing the model would load its dynamic tips relationship synchronously.
+        return CreatorProfileOut(
+            id=creator_profile.id,
+            display_name=creator_profile.display_name,
+            bio=creator_profile.bio,
+            created_at=creator_profile.created_at,
+            is_bank_connected=creator_profile.is_bank_connected,
+            currency=creator_profile.get_currency,
+            tube_tip_value=creator_profile.get_tube_tip_value,
+            tips=[],
+            number_of_tips=creator_profile.number_of_tips,
+            youtube_channel_name=creator_profile.youtube_channel_name,
+            profile_picture_url=creator_profile.profile_picture_url,
+            profile_banner_url=creator_profile.profile_banner_url
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         Logger.log(LogLevel.ERROR, f"Error creating profile: {str(e)}")
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating profile",
         )
 
-@router.put("/profile-pictures")
-async def upload_profile_pictures(
-    profile_picture: UploadFile = File(None),
-    profile_banner: UploadFile = File(None),
-    current_user: Creator = Depends(get_current_user),
-    db: Session = Depends(get_db)
+# The image endpoints parse their multipart body themselves (see stream_image_form), so the form is
+# described here for the OpenAPI docs instead of through File()/Form() parameters.
+PROFILE_IMAGES_FORM_PROPERTIES = {
+    "profile_picture": {"type": "string", "format": "binary"},
+    "profile_banner": {"type": "string", "format": "binary"},
+}
+
+def profile_images_openapi(extra_properties: Optional[dict] = None) -> dict:
+    return {
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {**PROFILE_IMAGES_FORM_PROPERTIES, **(extra_properties or {})},
+                    }
+                }
+            }
+        }
+    }
+
+def profile_image_object_names(user_id: int) -> dict[str, Callable[[str], str]]:
+    return {
+        "profile_picture": lambda filename: build_profile_picture_key(user_id, filename),
+        "profile_banner": lambda filename: build_profile_banner_key(user_id, filename),
+    }
+
+def build_profile_pictures_update(form: StreamedForm) -> CreatorProfileUploadPictures:
+    # Form fields profile_picture/profile_banner map onto the profile_picture_key/profile_banner_key columns.
+    return CreatorProfileUploadPictures(**{f"{field}_key": key for field, key in form.uploaded_keys.items()})
+
+def is_own_upload_key(user_id: int, field: str, key: str) -> bool:
+    # Keys are only ever issued as <user id>/<field>/<filename>, so anything else is not the caller's upload.
+    # A ".." segment would be resolved away in the image URL, pointing it at someone else's prefix.
+    prefix = f"{user_id}/{field}/"
+    filename = key[len(prefix):]
+    return key.startswith(prefix) and "/" not in filename and filename not in ("", ".", "..")
+
+async def enqueue_profile_image_processing(creator_profile_id: int, update_in: CreatorProfileUploadPictures):
+    # Until the variants exist the profile keeps serving the original, so a lost task only costs bandwidth.
+    for key_column, key in update_in.model_dump(exclude_unset=True).items():
+        try:
+            await run_in_threadpool(
+                task_process_profile_image.delay,
+                creator_profile_id=creator_profile_id,
+                key_column=key_column,
+                key=key
+            )
+        except Exception as e:
+            Logger.log(LogLevel.ERROR, f"Could not enqueue image processing for {key}: {str(e)}")
+
+def profile_image_keys(key: Optional[str], variants: Optional[dict]) -> list[str]:
+    # An image is stored as its original plus the resized variants generated from it.
+    return [key, *(variants or {}).values()] if key else []
+
+async def delete_profile_images(s3_client: AwsS3Client, object_names: list[str]):
+    if object_names and not await run_in_threadpool(s3_client.delete_objects, object_names):
+        Logger.log(LogLevel.ERROR, "Error deleting profile images")
+
+@router.post("/image-uploads", response_model=ProfileImageUploadOut, status_code=HTTP_201_CREATED)
+async def create_profile_image_upload(
+    upload_in: ProfileImageUploadCreate,
+    current_user: Principal = Depends(get_current_principal)
 ):
+    """Presigned POST for uploading a profile image straight to S3; finish with /image-uploads/confirm."""
     if not current_user.has_profile:
         raise HTTPException(status_code=400, detail=CREATOR_PROFILE_DOES_NOT_EXIST)
+    if upload_in.content_type not in ALLOWED_TYPES:
+        raise FieldValidationError(field=upload_in.field, message="Invalid file type. Allowed types: JPEG, PNG, WEBP.")
+
+    build_key = profile_image_object_names(current_user.id)[upload_in.field]
+    key = build_key(os.path.basename(upload_in.filename) or upload_in.field)
+    presigned_post = await run_in_threadpool(
+        get_s3_client().create_presigned_post,
+        object_name=key,
+        content_type=upload_in.content_type,
+        max_size=MAX_FILE_SIZE,
+        expires_in=settings.presigned_upload_expires_seconds
+    )
+    return ProfileImageUploadOut(
+        url=presigned_post["url"],
+        fields=presigned_post["fields"],
+        key=key,
+        expires_in=settings.presigned_upload_expires_seconds
+    )
+
+@router.post("/image-uploads/confirm")
+async def confirm_profile_image_upload(
+    confirm_in: ProfileImageUploadConfirm,
+    current_user: Creator = Depends(get_current_user_with_profile_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Point the profile at an image uploaded through /image-uploads, replacing the previous one."""
+    if not current_user.has_profile:
+        raise HTTPException(status_code=400, detail=CREATOR_PROFILE_DOES_NOT_EXIST)
+    if not is_own_upload_key(current_user.id, confirm_in.field, confirm_in.key):
+        raise FieldValidationError(field=confirm_in.field, message="Upload not found, please try again.")
 
     profile = current_user.profile
-    s3_client = AwsS3Client()
-    args = {}
+    key_column = f"{confirm_in.field}_key"
+    old_key = getattr(profile, key_column)
+    old_variants = getattr(profile, crud_creator_profile.PROFILE_IMAGE_VARIANT_COLUMNS[key_column])
 
-    try:
-        if profile_picture:
-            await validate_uploaded_image(image=profile_picture, field="profile_picture")
-        if profile_banner:
-            await validate_uploaded_image(image=profile_banner, field="profile_banner")
-    except FieldValidationError as e:
-        raise e
-
-    if profile_picture:
-        profile_picture_key = upload_profile_picture_to_s3(
-            s3_client=s3_client,
-            user_id=current_user.id,
-            filename=profile_picture.filename,
-            file=profile_picture.file
-        )
-        args["profile_picture_key"] = profile_picture_key
+    if old_key != confirm_in.key:
+        s3_client = get_s3_client()
+        await run_in_threadpool(verify_presigned_upload, s3_client, confirm_in.field, confirm_in.key)
 
-    if profile_banner:
-        profile_banner_key = upload_profile_banner_to_s3(
-            s3_client=s3_client,
-            user_id=current_user.id,
-            filename=profile_banner.filename,
-            file=profile_banner.file
+        update_in = CreatorProfileUploadPictures(**{key_column: confirm_in.key})
+        profile = await crud_creator_profile.update_creator_profile_pictures_async(db, profile, update_in)
+        await db.commit()
+        # An upload can land on a key one of the old variants used; never delete the image just confirmed.
+        replaced_keys = [key for key in profile_image_keys(old_key, old_variants) if key != confirm_in.key]
+        await asyncio.gather(
+            enqueue_profile_image_processing(profile.id, update_in),
+            delete_profile_images(s3_client, replaced_keys)
         )
-        args["profile_banner_key"] = profile_banner_key
 
-    update_in = CreatorProfileUploadPictures(**args)
-    updated_profile = crud_creator_profile.update_creator_profile_pictures(db, profile, update_in)
-    db.commit()
+    return {
+        "profile_picture_url": profile.profile_picture_url,
+        "profile_banner_url": profile.profile_banner_url
+    }
+
+@router.put("/profile-pictures", openapi_extra=profile_images_openapi())
+async def upload_profile_pictures(
+    request: Request,
+    current_user: Creator = Depends(get_current_user_with_profile_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user.has_profile:
+        raise HTTPException(status_code=400, detail=CREATOR_PROFILE_DOES_NOT_EXIST)
+
+    profile = current_user.profile
+    s3_client = get_s3_client()
+
+    form = await stream_image_form(
+        request=request,
+        s3_client=s3_client,
+        image_object_names=profile_image_object_names(current_user.id)
+    )
+
+    update_in = build_profile_pictures_update(form)
+    updated_profile = await crud_creator_profile.update_creator_profile_pictures_async(db, profile, update_in)
+    await db.commit()
+    await enqueue_profile_image_processing(updated_profile.id, update_in)
 
     return {
         "profile_picture_url": updated_profile.profile_picture_url,
@@ -142,27 +269,38 @@ async def upload_profile_pictures(
     }
 
 
-@router.patch("/update")
+@router.patch("/update", openapi_extra=profile_images_openapi({
+    "display_name": {"type": "string"},
+    "bio": {"type": "string"},
+}))
 async def update_profile(
-    display_name: str = Form(None),
-    bio: str = Form(None),
-    profile_picture: UploadFile = File(None),
-    profile_banner: UploadFile = File(None),
-    current_user: Creator = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Creator = Depends(get_current_user_with_profile_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.has_profile:
         raise HTTPException(status_code=400, detail=CREATOR_PROFILE_DOES_NOT_EXIST)
 
-    if not display_name and not bio and not profile_picture and not profile_banner:
-        return {}
-
     profile = current_user.profile
     old_picture_key = profile.profile_picture_key
     old_banner_key = profile.profile_banner_key
-    new_picture_key = None
-    new_banner_key = None
-    s3_client = AwsS3Client()
+    old_picture_variants = profile.profile_picture_variants
+    old_banner_variants = profile.profile_banner_variants
+    s3_client = get_s3_client()
+
+    form = await stream_image_form(
+        request=request,
+        s3_client=s3_client,
+        image_object_names=profile_image_object_names(current_user.id),
+        text_fields=frozenset({"display_name", "bio"})
+    )
+    display_name = form.fields.get("display_name")
+    bio = form.fields.get("bio")
+    new_picture_key = form.uploaded_keys.get("profile_picture")
+    new_banner_key = form.uploaded_keys.get("profile_banner")
+
+    if not display_name and not bio and not new_picture_key and not new_banner_key:
+        return {}
 
     try:
         update_text_args = {}
@@ -173,82 +311,35 @@ async def update_profile(
         update_text_data = CreatorProfileUpdate(
             **update_text_args
         )
-    except ValueError as e:
-        raise e
-
-    try:
-        if profile_picture:
-            await validate_uploaded_image(image=profile_picture, field="profile_picture")
-        if profile_banner:
-            await validate_uploaded_image(image=profile_banner, field="profile_banner")
-    except FieldValidationError as e:
-        raise e
-
-    try:
-        update_pictures_args = {}
-        if profile_picture:
-            #Upload new profile picture
-            new_picture_key = upload_profile_picture_to_s3(
-                s3_client=s3_client,
-                user_id=current_user.id,
-                filename=profile_picture.filename,
-                file=profile_picture.file
-            )
-            update_pictures_args['profile_picture_key'] = new_picture_key
-        if profile_banner:
-            # Upload new profile banner
-            new_banner_key = upload_profile_banner_to_s3(
-                s3_client=s3_client,
-                user_id=current_user.id,
-                filename=profile_banner.filename,
-                file=profile_banner.file
-            )
-            update_pictures_args['profile_banner_key'] = new_banner_key
-
-        update_upload_data = CreatorProfileUploadPictures(
-            **update_pictures_args
-        )
 
-        updated_profile_text = crud_creator_profile.update_creator_profile(db, profile, update_text_data)
-        updated_profile_uploads= crud_creator_profile.update_creator_profile_pictures(db, profile, update_upload_data)
+        update_upload_data = build_profile_pictures_update(form)
 
-        db.commit()
-
-        if new_picture_key and old_picture_key:
-            #Delete old profile picture
-            delete_profile_picture_from_s3(
-                s3_client=s3_client,
-                key=old_picture_key,
-            )
-        if new_banner_key and old_picture_key:
-            # Delete old profile banner
-            delete_profile_banner_from_s3(
-                s3_client=s3_client,
-                key=old_banner_key,
-            )
+        updated_profile_text = await crud_creator_profile.update_creator_profile_async(db, profile, update_text_data)
+        updated_profile_uploads = await crud_creator_profile.update_creator_profile_pictures_async(db, profile, update_upload_data)
 
-        profile_picture_url = None
-        profile_banner_url = None
+        await db.commit()
 
-        if updated_profile_uploads.profile_picture_key:
-            profile_picture_url=build_s3_url(updated_profile_uploads.profile_picture_key)
-        if updated_profile_uploads.profile_banner_key:
-            profile_banner_url = build_s3_url(updated_profile_uploads.profile_banner_key)
+        replaced_keys = []
+        if new_picture_key:
+            replaced_keys += profile_image_keys(old_picture_key, old_picture_variants)
+        if new_banner_key:
+            replaced_keys += profile_image_keys(old_banner_key, old_banner_variants)
+        await asyncio.gather(
+            enqueue_profile_image_processing(updated_profile_uploads.id, update_upload_data),
+            delete_profile_images(s3_client, replaced_keys)
+        )
 
         return CreatorProfileOut(
             id=updated_profile_text.id,
             display_name=updated_profile_text.display_name,
             bio=updated_profile_text.bio,
-            profile_picture_url=profile_picture_url,
-            profile_banner_url=profile_banner_url,
+            profile_picture_url=updated_profile_uploads.profile_picture_url,
+            profile_banner_url=updated_profile_uploads.profile_banner_url,
         )
 
     except Exception as e:
-        if new_picture_key:
-            delete_profile_picture_from_s3(s3_client, new_picture_key)
-        if new_banner_key:
-            delete_profile_banner_from_s3(s3_client, new_banner_key)
-        db.rollback()
+        await delete_profile_images(s3_client, list(form.uploaded_keys.values()))
+        await db.rollback()
         Logger.log(LogLevel.ERROR, str(e))
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
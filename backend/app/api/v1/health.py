@@ -1,7 +1,19 @@
-from fastapi import APIRouter
+import redis
+from fastapi import APIRouter, HTTPException
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
+
+from app.core.redis import ping_redis
 
 router = APIRouter()
 
 @router.get("/status")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/status/redis")
+async def redis_health():
+    try:
+        latency_seconds = await ping_redis()
+    except redis.RedisError:
+        raise HTTPException(status_code=HTTP_503_SERVICE_UNAVAILABLE, detail="Redis unavailable")
+    return {"status": "ok", "latency_ms": round(latency_seconds * 1000, 3)}
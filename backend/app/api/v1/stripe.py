@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Optional
+import json
 import stripe
 
-from app.celery.tasks import task_send_payment_success_to_supporter_email, task_send_payment_success_to_creator_email
+from app.celery.tasks import task_process_stripe_webhook_events
 from app.core import settings
-from app.crud.creator_profile import get_creator_profile_by_username, get_creator_profile_by_id
+from app.crud.creator_profile import get_creator_profile_by_username_async
+from app.crud.stripe_webhook_event import store_stripe_webhook_event_async
 from app.external_services import stripe as stripe_functions 
-from app.crud.tip import create_tip
-from app.schemas.tip import TipCreate
-from app.schemas.stripe import BankConnectPayload, StripeCheckoutPayload
-from app.utils.auth import get_current_user, get_current_user_with_profile
-from app.db.session import get_db
+from app.schemas.creator import Principal
+from app.schemas.stripe import BankConnectPayload, StripeCheckoutPayload, CheckoutProfile
+from app.utils.auth import get_current_user, get_current_principal
+from app.utils.cache import invalidate_creator_profile_cache, get_or_load_checkout_profile
+from app.db.session import get_db, get_async_db, AsyncSessionLocal
 from app.db.base import Creator, CreatorProfile, Tip
 from app.utils.constants.http_codes import (
     HTTP_400_BAD_REQUEST,
@@ -22,6 +27,7 @@ from app.utils.constants.http_error_details import (
     CREATOR_PROFILE_NOT_FOUND_ERROR
 )
 from app.utils.logging import Logger, LogLevel
+from app.utils.rate_limit import limit_checkout
 from app.external_services.stripe import calculate_payment_amount
 
 stripe.api_key = settings.stripe_api_key
@@ -55,6 +61,7 @@ def connect_bank_account(
         email=current_user.email,
         country_code=country_code,
         youtube_url=f"https://www.youtube.com/@{profile.youtube_channel_name}",
+        idempotency_key=f"connect-account-{profile.id}",
     )
     account_link = stripe_functions.create_stripe_account_link(
         connected_account_id=account_id,
@@ -63,35 +70,64 @@ def connect_bank_account(
     )
     profile.stripe_account_id = account_id
     profile.country = payload.country
+    invalidate_creator_profile_cache(db, profile.id)
     db.commit()
     db.refresh(profile)
     return {"url": account_link}
 
 @router.get('/connect/callback')
-async def connect_bank_account_callback(current_user: Creator = Depends(get_current_user)):
+async def connect_bank_account_callback(current_user: Principal = Depends(get_current_principal)):
     if current_user.is_bank_connected:
         return RedirectResponse(url=settings.stripe_connect_success_url)
     else:
         return RedirectResponse(url=settings.stripe_connect_failed_url)
 
-@router.post("/checkout")
-async def create_stripe_account_link(payload: StripeCheckoutPayload, db: Session = Depends(get_db)):
+async def load_checkout_profile(username: str) -> Optional[CheckoutProfile]:
+    async with AsyncSessionLocal() as db:
+        profile = await get_creator_profile_by_username_async(username=username, db=db)
+    if not profile:
+        return None
+    return CheckoutProfile(
+        creator_profile_id=profile.id,
+        stripe_account_id=profile.stripe_account_id,
+        currency=profile.get_currency,
+        tube_tip_value=profile.get_tube_tip_value,
+        display_name=profile.display_name
+    )
+
+@router.post("/checkout", dependencies=[Depends(limit_checkout)])
+async def create_stripe_account_link(payload: StripeCheckoutPayload):
     try:
         username = payload.username
-        profile = get_creator_profile_by_username(username=username, db=db)
+        profile = await get_or_load_checkout_profile(username, lambda: load_checkout_profile(username))
+        if not profile:
+            raise HTTPException(
+                status_code=HTTP_404_NOT_FOUND,
+                detail=CREATOR_PROFILE_NOT_FOUND_ERROR
+            )
+
+        payment_amount = calculate_payment_amount(payload.number_of_tube_tips, profile.tube_tip_value)
 
-        payment_amount = calculate_payment_amount(payload.number_of_tube_tips, profile.get_tube_tip_value)
+        price_id = None
+        if settings.stripe_reuse_prices:
+            price_id = await stripe_functions.get_or_create_tip_price_async(
+                creator_profile_id=profile.creator_profile_id,
+                display_name=profile.display_name,
+                currency=profile.currency,
+                payment_amount=payment_amount
+            )
 
-        session_url = stripe_functions.create_stripe_checkout_session_link(
-            creator_profile_id=profile.id,
+        session_url = await stripe_functions.create_stripe_checkout_session_link_async(
+            creator_profile_id=profile.creator_profile_id,
             username=username,
             name=payload.name,
             message=payload.message,
             connected_account_id=profile.stripe_account_id,
             display_name=profile.display_name,
-            currency=profile.get_currency,
+            currency=profile.currency,
             payment_amount=payment_amount,
-            application_fee_percentage=settings.application_fee_percentage
+            application_fee_percentage=settings.application_fee_percentage,
+            price_id=price_id
         )
         return {"url": session_url}
 
@@ -102,103 +138,39 @@ async def create_stripe_account_link(payload: StripeCheckoutPayload, db: Session
             detail=str(e)
         )
     
-@router.post('/webhook/checkout')
-async def webhook_checkout(request: Request, db: Session = Depends(get_db)):
+async def store_stripe_webhook_event(request: Request, db: AsyncSession, endpoint: str, secret: Optional[str]):
     payload = await request.body()
     sig_header = request.headers.get("Stripe-Signature")
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.stripe_webhook_secret_checkout
-        )
+        event = stripe.Webhook.construct_event(payload, sig_header, secret)
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid payload")
 
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        if db.query(Tip).filter_by(stripe_session_id=session["id"]).first():
-            return {"status": "duplicate"}
-
-        customer = stripe.Customer.retrieve(session["customer"])
-        email = customer.get("email")
-        creator_profile_id = int(session["metadata"].get("creator_profile_id"))
-        amount = int(session["amount_total"])
-        currency=session["currency"]
-        message = None
-        if session["metadata"].get("message"):
-            message = session["metadata"].get("message")
-        name = None
-        if session["metadata"].get("name"):
-            name = session["metadata"].get("name")
-
-        tip_data = TipCreate(
-            creator_profile_id=creator_profile_id,
-            amount=amount,
-            name=name,
-            message=message,
-            stripe_session_id=session["id"]
-        )
-        create_tip(db=db, tip_data=tip_data)
-
-        profile = get_creator_profile_by_id(db, creator_profile_id)
-        creator_email = profile.creator.email
-
-        task_send_payment_success_to_supporter_email.delay(
-            to_email=email,
-            display_name=profile.display_name,
-            amount=str(amount/100),
-            currency=currency
-        )
-
-        task_send_payment_success_to_creator_email.delay(
-            to_email=creator_email,
-            display_name=profile.display_name,
-            supporter_email=creator_email,
-            amount=str(amount/100),
-            currency=currency
-        )
-
-    return {"status": "success"}
-
-@router.post("/webhook/connect")
-async def webhook_connect(request: Request, db: Session = Depends(get_db)):
-    payload = await request.body()
-    sig_header = request.headers.get("Stripe-Signature")
-
-    Logger.log(LogLevel.DEBUG, "Webhook call")
-
+    Logger.log(LogLevel.DEBUG, f"Stripe {endpoint} webhook {event['id']} ({event['type']})")
+    stored = await store_stripe_webhook_event_async(
+        db,
+        event_id=event["id"],
+        endpoint=endpoint,
+        event_type=event["type"],
+        payload=json.loads(payload)
+    )
+    if not stored:
+        return {"status": "duplicate"}
 
+    # Processing happens in Celery; the beat schedule drains the inbox anyway if this nudge is lost.
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.stripe_webhook_secret_connect
-        )
-    except stripe.error.SignatureVerificationError:
-        raise HTTPException(status_code=400, detail="Invalid signature")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid payload")
-
-    Logger.log(LogLevel.DEBUG, "Webhook call")
-    Logger.log(LogLevel.DEBUG, event["type"])
-
-
-    if event["type"] == "account.updated":
-        account = event["data"]["object"]
-        stripe_account_id = account["id"]
-        charges_enabled = account["charges_enabled"]
-        payouts_enabled = account["payouts_enabled"]
-
-        Logger.log(LogLevel.DEBUG, charges_enabled)
+        await run_in_threadpool(task_process_stripe_webhook_events.delay)
+    except Exception as e:
+        Logger.log(LogLevel.ERROR, f"Could not enqueue Stripe webhook processing: {str(e)}")
+    return {"status": "success"}
 
-        if charges_enabled:
-            profile = (
-                db.query(CreatorProfile)
-                .filter_by(stripe_account_id=stripe_account_id)
-                .first()
-            )
-            if profile:
-                profile.is_bank_connected = True
-                db.commit()
+@router.post('/webhook/checkout')
+async def webhook_checkout(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await store_stripe_webhook_event(request, db, "checkout", settings.stripe_webhook_secret_checkout)
 
-    return {"status": "success"}
+@router.post("/webhook/connect")
+async def webhook_connect(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await store_stripe_webhook_event(request, db, "connect", settings.stripe_webhook_secret_connect)
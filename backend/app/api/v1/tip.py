@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.crud import tip as tip_crud
 from app.schemas.tip import TipOut
 from app.utils.constants.http_codes import (
     HTTP_400_BAD_REQUEST
 )
+from app.utils.pagination import encode_tip_cursor, decode_tip_cursor
 
 router = APIRouter()
 
 @router.get("/{creator_profile_id}")
-async def get_creator_and_tips(creator_profile_id: int, limit: int = Query(10, ge=1, le=50), offset: int = Query(0, ge=0), db: Session = Depends(get_db)):
+async def get_creator_and_tips(
+    creator_profile_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
     if limit < 1 or limit > 20:
         raise HTTPException(
             status_code=HTTP_400_BAD_REQUEST,
@@ -23,11 +30,35 @@ async def get_creator_and_tips(creator_profile_id: int, limit: int = Query(10, g
             status_code=HTTP_400_BAD_REQUEST,
             detail="Offset must be 0 or greater."
         )
+    if cursor and offset:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail="Use either cursor or offset, not both."
+        )
+
+    # Fetch one extra row to know whether another page exists.
+    if offset:
+        # Offset paging is kept for older clients only, new clients should follow next_cursor.
+        tips = await tip_crud.get_tips_by_creator_async(
+            db=db,
+            creator_profile_id=creator_profile_id,
+            limit=limit + 1,
+            offset=offset,
+        )
+    else:
+        try:
+            before = decode_tip_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+        tips = await tip_crud.get_tips_by_creator_before_async(
+            db=db,
+            creator_profile_id=creator_profile_id,
+            limit=limit + 1,
+            before=before,
+        )
 
-    tips = tip_crud.get_tips_by_creator(
-        db=db,
-        creator_profile_id=creator_profile_id,
-        limit=limit,
-        offset=offset,
-    )
-    return {"tips": tips}
+    next_cursor = None
+    if len(tips) > limit:
+        tips = tips[:limit]
+        next_cursor = encode_tip_cursor(tips[-1].created_at, tips[-1].id)
+    return {"tips": tips, "next_cursor": next_cursor}
\ No newline at end of file
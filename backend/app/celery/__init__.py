@@ -1,12 +1,106 @@
+import time
+from datetime import datetime
+
 from celery import Celery
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_process_shutdown, worker_ready
+from kombu import Queue
+from prometheus_client import start_http_server
 
 from app.core import settings
+from app.utils.email import get_email_handler
+from app.utils.logging import Logger, LogLevel, request_id_var
+from app.utils.metrics import CELERY_TASK_QUEUE_SECONDS, CELERY_TASK_SECONDS, get_metrics_registry
 
 redis_url = f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}"
 
+# Each queue has its own workers (see docker-compose.yaml), so a backlog in one never delays another:
+# an email storm or a batch of big uploads cannot hold up tip ingestion.
+WEBHOOKS_QUEUE = "webhooks"
+EMAILS_QUEUE = "emails"
+IMAGES_QUEUE = "images"
+MAINTENANCE_QUEUE = "maintenance"
+
 celery_task_queue = Celery(
     "worker",
     broker=redis_url,
-    backend=redis_url,
     include=["app.celery.tasks"]
-)
\ No newline at end of file
+)
+
+celery_task_queue.conf.update(
+    # Declared so a worker started without -Q (a single all-in-one worker) consumes every queue.
+    task_queues=[Queue(name) for name in (WEBHOOKS_QUEUE, EMAILS_QUEUE, IMAGES_QUEUE, MAINTENANCE_QUEUE)],
+    task_routes={
+        "task_process_stripe_webhook_events": {"queue": WEBHOOKS_QUEUE},
+        "task_send_templated_emails": {"queue": EMAILS_QUEUE},
+        "task_send_payment_success_to_supporter_email": {"queue": EMAILS_QUEUE},
+        "task_send_payment_success_to_creator_email": {"queue": EMAILS_QUEUE},
+        "task_process_profile_image": {"queue": IMAGES_QUEUE},
+        "task_reconcile_tip_totals": {"queue": MAINTENANCE_QUEUE},
+    },
+    # Anything left unrouted still has a consumer.
+    task_default_queue=MAINTENANCE_QUEUE,
+    # Every task is fire-and-forget and nothing reads results, so there is no result backend to write to.
+    task_ignore_result=True,
+    # Reserve one task per pool process so a long image job never sits on messages another process could run.
+    # The I/O-bound email and webhook workers raise this with --prefetch-multiplier.
+    worker_prefetch_multiplier=1,
+)
+
+celery_task_queue.conf.beat_schedule = {
+    # Picks up events whose immediate drain was missed (worker down, broker hiccup) and retries failures.
+    "drain-stripe-webhook-events": {
+        "task": "task_process_stripe_webhook_events",
+        "schedule": settings.stripe_webhook_drain_interval_seconds,
+    },
+    "reconcile-tip-totals": {
+        "task": "task_reconcile_tip_totals",
+        "schedule": settings.tip_totals_reconcile_interval_seconds,
+    },
+}
+
+
+# Log lines written by a task carry its task id, the way request logs carry the request id.
+task_request_id_tokens = {}
+# Start times for celery_task_duration_seconds, by task id.
+task_started_at = {}
+
+def task_ready_at(request) -> float:
+    # A countdown or retry is not queue latency: measure from its ETA instead.
+    eta = request.eta
+    if isinstance(eta, str):
+        eta = datetime.fromisoformat(eta)
+    return max(request.get("published_at"), eta.timestamp() if eta else 0.0)
+
+@before_task_publish.connect
+def stamp_published_at(headers: dict, **kwargs):
+    # Wall clock, as it is compared on another host; keep producer and worker clocks in sync (NTP).
+    headers["published_at"] = time.time()
+
+@task_prerun.connect
+def bind_task_request_id(task_id: str, task, **kwargs):
+    task_request_id_tokens[task_id] = request_id_var.set(task_id)
+    task_started_at[task_id] = time.perf_counter()
+
+    if task.request.get("published_at") is not None:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "unknown"
+        CELERY_TASK_QUEUE_SECONDS.labels(task.name, queue).observe(max(0.0, time.time() - task_ready_at(task.request)))
+
+@task_postrun.connect
+def unbind_task_request_id(task_id: str, task, state: str = None, **kwargs):
+    started_at = task_started_at.pop(task_id, None)
+    if started_at is not None:
+        CELERY_TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started_at)
+    token = task_request_id_tokens.pop(task_id, None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@worker_ready.connect
+def serve_worker_metrics(**kwargs):
+    if settings.celery_metrics_port:
+        start_http_server(settings.celery_metrics_port, registry=get_metrics_registry())
+        Logger.log(LogLevel.INFO, f"Serving worker metrics on port {settings.celery_metrics_port}")
+
+@worker_process_shutdown.connect
+def close_email_handler(**kwargs):
+    if get_email_handler.cache_info().currsize:
+        get_email_handler().close()
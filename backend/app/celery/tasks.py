@@ -1,12 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import BotoCoreError, ClientError
+from celery.utils.time import get_exponential_backoff_interval
+from PIL import Image, UnidentifiedImageError
+
 from app.celery import celery_task_queue
-from app.utils.email import EmailHandler
+from app.core import settings
+from app.crud.creator_profile import reconcile_tip_totals, set_creator_profile_image_variants
+from app.db.session import SessionLocal
+from app.external_services.aws_s3_client import get_s3_client
+from app.utils.email import SEND_GRID_MAX_PERSONALIZATIONS, BatchRejectedError, EmailTemplatesId, TransientEmailError, \
+    get_email_handler, payment_success_to_creator_personalization, payment_success_to_supporter_personalization
+from app.utils.images import PROFILE_IMAGE_VARIANTS, build_variant_key, generate_image_variants
+from app.utils.logging import Logger, LogLevel
+from app.utils.webhooks import PaymentNotification, process_stripe_webhook_events
+
+@celery_task_queue.task(
+    name="task_send_templated_emails",
+    bind=True,
+    max_retries=settings.send_grid_max_retries
+)
+def task_send_templated_emails(self, template_id: str, personalizations: list[dict]):
+    """Send one SendGrid request; a transient failure retries this request alone, after SendGrid's
+    Retry-After when throttled and with exponential backoff otherwise."""
+    try:
+        return get_email_handler().send_templated_emails(template_id, personalizations)
+    except TransientEmailError as e:
+        countdown = e.retry_after
+        if countdown is None:
+            countdown = get_exponential_backoff_interval(factor=1, retries=self.request.retries, maximum=600, full_jitter=True)
+        raise self.retry(exc=e, countdown=countdown)
+    except BatchRejectedError:
+        # Split the batch so one bad address only costs its own email.
+        for personalization in personalizations:
+            task_send_templated_emails.delay(template_id, [personalization])
+        return False
 
+# Still registered so messages queued before emails were batched get delivered.
 @celery_task_queue.task(name="task_send_payment_success_to_supporter_email")
 def task_send_payment_success_to_supporter_email(to_email: str, display_name: str, amount: str, currency: str):
-    EmailHandler().send_payment_success_to_supporter_email(to_email, display_name, amount, currency)
-    print(f"Sent send_payment_success_to_supporter_email to {to_email}")
+    task_send_templated_emails.delay(
+        EmailTemplatesId.PAYMENT_SUCCESS_TO_SUPPORTER_TEMPLATE_ID.value,
+        [payment_success_to_supporter_personalization(to_email, display_name, amount, currency)]
+    )
 
 @celery_task_queue.task(name="task_send_payment_success_to_creator_email")
 def task_send_payment_success_to_creator_email(to_email: str, display_name: str, supporter_email: str, amount: str, currency: str):
-    EmailHandler().send_payment_success_to_creator_email(to_email, display_name, supporter_email, amount, currency)
-    print(f"Sent send_payment_success_to_creator_email to {to_email}")
\ No newline at end of file
+    task_send_templated_emails.delay(
+        EmailTemplatesId.PAYMENT_SUCCESS_TO_CREATOR_TEMPLATE_ID.value,
+        [payment_success_to_creator_personalization(to_email, display_name, supporter_email, amount, currency)]
+    )
+
+def send_payment_notifications(notifications: list[PaymentNotification]):
+    """Email supporters and creators about a batch of payments, one SendGrid request per template and 1000 recipients.
+
+    Called with each webhook drain batch, so a burst of tips (which drains in bigger batches) costs a
+    handful of requests instead of two per tip.
+    """
+    emails: dict[str, list[dict]] = {
+        EmailTemplatesId.PAYMENT_SUCCESS_TO_SUPPORTER_TEMPLATE_ID.value: [],
+        EmailTemplatesId.PAYMENT_SUCCESS_TO_CREATOR_TEMPLATE_ID.value: [],
+    }
+    for notification in notifications:
+        if notification.supporter_email:
+            emails[EmailTemplatesId.PAYMENT_SUCCESS_TO_SUPPORTER_TEMPLATE_ID.value].append(
+                payment_success_to_supporter_personalization(
+                    notification.supporter_email, notification.display_name, notification.amount, notification.currency
+                )
+            )
+        emails[EmailTemplatesId.PAYMENT_SUCCESS_TO_CREATOR_TEMPLATE_ID.value].append(
+            payment_success_to_creator_personalization(
+                notification.creator_email, notification.display_name, notification.supporter_email,
+                notification.amount, notification.currency
+            )
+        )
+    for template_id, personalizations in emails.items():
+        for start in range(0, len(personalizations), SEND_GRID_MAX_PERSONALIZATIONS):
+            task_send_templated_emails.delay(template_id, personalizations[start:start + SEND_GRID_MAX_PERSONALIZATIONS])
+
+@celery_task_queue.task(name="task_process_stripe_webhook_events")
+def task_process_stripe_webhook_events():
+    """Drain the Stripe webhook inbox. Safe to run on several workers at once (rows are claimed with SKIP LOCKED)."""
+    processed = 0
+    while True:
+        with SessionLocal() as db:
+            claimed, failed, notifications = process_stripe_webhook_events(
+                db, settings.stripe_webhook_batch_size, settings.stripe_webhook_max_attempts
+            )
+        if notifications:
+            send_payment_notifications(notifications)
+        processed += claimed - failed
+        # Stop on a short or failing batch; failed events wait for the next scheduled drain rather than retrying hot.
+        if claimed < settings.stripe_webhook_batch_size or failed:
+            break
+    if processed:
+        Logger.log(LogLevel.INFO, f"Processed {processed} Stripe webhook events.")
+    return processed
+
+@celery_task_queue.task(
+    name="task_process_profile_image",
+    autoretry_for=(BotoCoreError, ClientError),
+    retry_backoff=True,
+    max_retries=5
+)
+def task_process_profile_image(creator_profile_id: int, key_column: str, key: str):
+    """Generate the WebP variants of an uploaded profile image and point the profile at them."""
+    s3_client = get_s3_client()
+    try:
+        data = s3_client.get_object_bytes(key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        Logger.log(LogLevel.INFO, f"Skipping variants of {key}, it was deleted before processing.")
+        return None
+    try:
+        variants = generate_image_variants(data, PROFILE_IMAGE_VARIANTS[key_column])
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # The original is still served, so a file Pillow can't handle only costs the resize.
+        Logger.log(LogLevel.ERROR, f"Could not generate variants of {key}: {e}")
+        return None
+
+    variant_keys = {name: build_variant_key(key, name) for name in variants}
+    with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+        # list() re-raises the first failed upload, which autoretry then handles.
+        list(executor.map(
+            lambda name: s3_client.put_object(variant_keys[name], variants[name], "image/webp"),
+            variants
+        ))
+
+    with SessionLocal() as db:
+        stored = set_creator_profile_image_variants(db, creator_profile_id, key_column, key, variant_keys)
+        db.commit()
+    if not stored:
+        # The image was replaced while we worked; its variants would never be referenced.
+        s3_client.delete_objects(list(variant_keys.values()))
+        return None
+    return variant_keys
+
+@celery_task_queue.task(name="task_reconcile_tip_totals")
+def task_reconcile_tip_totals():
+    """Scheduled run of app.scripts.reconcile_tip_totals, so drifted profile totals repair themselves."""
+    with SessionLocal() as db:
+        repaired_ids = reconcile_tip_totals(db)
+        db.commit()
+    if repaired_ids:
+        Logger.log(LogLevel.WARN, f"Reconciled tip totals for {len(repaired_ids)} creator profiles: {repaired_ids}")
+    return len(repaired_ids)
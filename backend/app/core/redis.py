@@ -1,11 +1,126 @@
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Sequence
+
 import redis
+import redis.asyncio
+from redis.exceptions import NoScriptError
+
 from app.core import settings
+from app.utils.metrics import time_redis_command
+
+def connection_kwargs() -> dict:
+    return {
+        "host": settings.redis_host,
+        "port": settings.redis_port,
+        "db": settings.redis_db,
+        "password": settings.redis_password,
+        "max_connections": settings.redis_max_connections,
+        "socket_timeout": settings.redis_socket_timeout_seconds,
+        "socket_connect_timeout": settings.redis_socket_connect_timeout_seconds,
+        "health_check_interval": settings.redis_health_check_interval_seconds,
+        # How long a command waits for a free pooled connection before raising.
+        "timeout": settings.redis_socket_timeout_seconds,
+        "decode_responses": True,
+    }
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+
+    def execute(self, raise_on_error=True):
+        with time_redis_command("PIPELINE"):
+            return super().execute(raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Times every command, and every pipeline as a whole, into redis_command_duration_seconds."""
+
+    def execute_command(self, *args, **options):
+        with time_redis_command(str(args[0])):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+
+    async def execute(self, raise_on_error: bool = True):
+        with time_redis_command("PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
 
+    async def execute_command(self, *args, **options):
+        with time_redis_command(str(args[0])):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedAsyncPipeline:
+        return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+@lru_cache
 def get_redis() -> redis.Redis:
-    return redis.Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        db=settings.REDIS_DB,
-        password=settings.REDIS_PASSWORD,
-        decode_responses=True
-    )
\ No newline at end of file
+    """Process-wide client for sync code (after-commit hooks, scripts); the pool is thread-safe and fork-aware."""
+    return InstrumentedRedis(connection_pool=redis.BlockingConnectionPool(**connection_kwargs()))
+
+@lru_cache
+def get_async_redis() -> redis.asyncio.Redis:
+    """Process-wide client for async handlers. Its connections belong to the running event loop,
+    so it is created during app startup and released by close_redis on shutdown."""
+    return InstrumentedAsyncRedis(connection_pool=redis.asyncio.BlockingConnectionPool(**connection_kwargs()))
+
+async def close_redis():
+    if get_async_redis.cache_info().currsize:
+        await get_async_redis().aclose(close_connection_pool=True)
+        get_async_redis.cache_clear()
+    if get_redis.cache_info().currsize:
+        get_redis().connection_pool.disconnect()
+
+@asynccontextmanager
+async def async_redis_pipeline() -> AsyncIterator[redis.asyncio.client.Pipeline]:
+    """Queue commands on the async client and send them in one round trip when the block exits cleanly."""
+    async with get_async_redis().pipeline(transaction=False) as pipe:
+        yield pipe
+        await pipe.execute()
+
+async def ping_redis() -> float:
+    """Round trip time of a PING on the shared async client, in seconds. Raises redis.RedisError when down."""
+    started = time.perf_counter()
+    await get_async_redis().ping()
+    return time.perf_counter() - started
+
+
+class AsyncRedisScript:
+    """A Lua script run with EVALSHA on the shared async client, loaded on the first NOSCRIPT reply.
+
+    Unlike redis-py's register_script, it is not bound to a client, so module-level scripts keep
+    working after close_redis replaces the client.
+    """
+
+    def __init__(self, script: str):
+        self.script = script
+        self.sha = hashlib.sha1(script.encode()).hexdigest()
+
+    async def __call__(self, keys: Sequence = (), args: Sequence = ()):
+        client = get_async_redis()
+        try:
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            self.sha = await client.script_load(self.script)
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+
+
+class RedisScript(AsyncRedisScript):
+    """AsyncRedisScript for the shared sync client."""
+
+    def __call__(self, keys: Sequence = (), args: Sequence = ()):
+        client = get_redis()
+        try:
+            return client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            self.sha = client.script_load(self.script)
+            return client.evalsha(self.sha, len(keys), *keys, *args)
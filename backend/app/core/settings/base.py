@@ -18,7 +18,20 @@ except ValueError:
 class BaseAppSettings(BaseSettings):
     app_env: AppEnvTypes = selected_env
     debug: Optional[bool] = None
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+    # Per call site: at most log_sample_burst debug/info records every log_sample_window_seconds, 0 disables sampling.
+    log_sample_burst: int = 20
+    log_sample_window_seconds: float = 10.0
     database_url: Optional[str] = None
+    async_database_url: Optional[str] = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Requests running more SQL statements than this are logged as likely N+1s.
+    request_db_queries_warning_threshold: int = 20
     frontend_url: Optional[str] = None
     access_secret_key: Optional[str] = None
     refresh_secret_key: Optional[str] = None
@@ -31,17 +44,69 @@ class BaseAppSettings(BaseSettings):
     application_fee_percentage: float = 0.15
     stripe_webhook_secret_checkout: Optional[str] = None
     stripe_webhook_secret_connect: Optional[str] = None
+    stripe_webhook_batch_size: int = 100
+    stripe_webhook_drain_interval_seconds: float = 5.0
+    stripe_webhook_max_attempts: int = 5
+    stripe_api_base: Optional[str] = None
+    stripe_timeout_seconds: float = 10.0
+    stripe_max_network_retries: int = 2
+    stripe_max_connections: int = 50
+    stripe_max_keepalive_connections: int = 20
+    stripe_reuse_prices: bool = False
+    stripe_price_cache_size: int = 10000
     redis_host: Optional[str] = None
     redis_port: Optional[int] = None
     redis_db: Optional[int] = None
     redis_password: Optional[str] = None
+    redis_max_connections: int = 50
+    redis_socket_timeout_seconds: float = 1.0
+    redis_socket_connect_timeout_seconds: float = 1.0
+    redis_health_check_interval_seconds: int = 30
+    creator_profile_cache_ttl_seconds: int = 300
+    # Usernames without a profile, so repeated lookups of one do not each reach the database.
+    creator_profile_not_found_cache_ttl_seconds: int = 30
+    checkout_profile_cache_ttl_seconds: int = 60
+    checkout_profile_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 300
+    principal_local_cache_ttl_seconds: int = 5
+    principal_local_cache_size: int = 10000
     send_grid_api_key: Optional[str] = None
+    # Overridden to point at benchmarks/stubs/sendgrid_stub.py for local load tests.
+    send_grid_api_host: str = "https://api.sendgrid.com"
+    send_grid_timeout_seconds: float = 10.0
+    send_grid_max_retries: int = 6
+    tip_totals_reconcile_interval_seconds: int = 24 * 60 * 60
+    # Serves task metrics from the worker's main process; set PROMETHEUS_MULTIPROC_DIR so pool processes are included.
+    celery_metrics_port: Optional[int] = None
+    bcrypt_rounds: int = 12
+    password_hash_workers: Optional[int] = None
+    password_hash_max_pending: int = 64
+    password_hash_retry_after_seconds: int = 1
+    # Token buckets written "<burst>/<second|minute|hour|day>", refilled evenly over the period.
+    rate_limit_enabled: bool = True
+    login_rate_limit_per_ip: str = "30/minute"
+    login_rate_limit_per_email: str = "10/minute"
+    signup_rate_limit_per_ip: str = "10/hour"
+    signup_rate_limit_per_email: str = "5/hour"
+    checkout_rate_limit_per_ip: str = "30/minute"
+    checkout_rate_limit_per_username: str = "300/minute"
+    # Peers (CIDRs) whose X-Forwarded-For is believed when finding the client address, e.g. the nginx and load balancer subnet.
+    trusted_proxies: list[str] = []
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 30
+    refresh_token_reuse_grace_seconds: int = 10
     jwt_encryption_algorithm: str = "HS256"
     from_email: str = "noreply@tubetip.co"
     aws_region: str = "eu-west-2"
     bucket_name: str = "tubetip-dev"
     cloud_front_url: str = "d357a07t61on3p.cloudfront.net"
+    # Point boto3 at an S3 stand-in (moto server, MinIO) for local runs; None means real S3.
+    aws_s3_endpoint_url: Optional[str] = None
+    aws_s3_max_pool_connections: int = 50
+    aws_s3_connect_timeout_seconds: float = 2.0
+    aws_s3_read_timeout_seconds: float = 10.0
+    aws_s3_max_attempts: int = 3
+    aws_s3_transfer_max_concurrency: int = 4
+    presigned_upload_expires_seconds: int = 300
 
 
@@ -3,6 +3,7 @@ from pydantic_settings import SettingsConfigDict
 
 class DevelopmentSettings(AppSettings):
     debug: bool = True
+    log_level: str = "DEBUG"
     allow_origins: list[str] = ['http://localhost:3000', 'http://localhost:80', 'http://localhost']
     frontend_url: str = "http://localhost:80"
     stripe_connect_return_url: str = "http://localhost:8000/api/v1/stripe/connect/callback"
@@ -12,6 +13,8 @@ class DevelopmentSettings(AppSettings):
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
+    # The docker compose networks, where the frontend nginx proxies to the backend.
+    trusted_proxies: list[str] = ["172.16.0.0/12"]
 
     model_config = SettingsConfigDict(
         env_file='.env',
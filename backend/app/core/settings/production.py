@@ -2,6 +2,7 @@ from app.core.settings.app import AppSettings
 
 class ProductionSettings(AppSettings):
     debug: bool = False
+    log_level: str = "INFO"
     allow_origins: list[str] = ["https://tubetip.co", "https://www.tubetip.co"]
     frontend_url: str = "https://www.tubetip.co"
     stripe_connect_return_url: str = "https://www.tubetip.co/api/v1/stripe/connect/callback"
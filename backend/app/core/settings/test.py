@@ -3,7 +3,10 @@ from pydantic_settings import SettingsConfigDict
 
 class TestSettings(AppSettings):
     debug: bool = True
+    log_level: str = "WARN"
     database_url: str = "postgresql://postgres:password@db:5432/guitardb"
+    access_secret_key: str = "test-access-secret"
+    refresh_secret_key: str = "test-refresh-secret"
     model_config = SettingsConfigDict(
         env_file='.env'
     )
\ No newline at end of file
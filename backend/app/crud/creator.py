@@ -1,10 +1,13 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from fastapi import HTTPException
 
 from app.schemas.creator import CreatorCreate
 from app.models.creator import Creator
 from app.utils.auth import hash_password
+from app.utils.password_hashing import hash_password_async
 from app.utils.constants.http_codes import (
     HTTP_400_BAD_REQUEST
 )
@@ -43,7 +46,39 @@ def get_user_with_profile(db: Session, user_id: int):
         .filter(Creator.id == user_id)
         .first()
     )
-    
+
+async def get_user_by_id_async(db: AsyncSession, id: int):
+    creator = await db.scalar(select(Creator).filter(Creator.id == id))
+    if not creator:
+        Logger.log(LogLevel.ERROR, f"Could not find the creator with id {id} on get request.")
+        return None
+    return creator
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    creator = await db.scalar(
+        select(Creator)
+        .options(selectinload(Creator.profile))
+        .filter(Creator.email == email)
+    )
+    if not creator:
+        Logger.log(LogLevel.ERROR, f"Could not find the creator with email {email} on get request.")
+        return None
+    return creator
+
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    creator = await db.scalar(select(Creator).filter(Creator.username == username))
+    if not creator:
+        Logger.log(LogLevel.ERROR, f"Could not find the creator with username {username} on get request.")
+        return None
+    return creator
+
+async def get_user_with_profile_async(db: AsyncSession, user_id: int):
+    return await db.scalar(
+        select(Creator)
+        .options(joinedload(Creator.profile))
+        .filter(Creator.id == user_id)
+    )
+
 def create_user(db: Session, creator_in: CreatorCreate):
     existing = db.query(Creator).filter(
         (Creator.email == creator_in.email.lower()) | 
@@ -64,6 +99,28 @@ def create_user(db: Session, creator_in: CreatorCreate):
     db.flush()
     return creator
 
+async def create_user_async(db: AsyncSession, creator_in: CreatorCreate):
+    existing = await db.scalar(
+        select(Creator).filter(
+            (Creator.email == creator_in.email.lower()) |
+            (Creator.username == creator_in.username)
+        )
+    )
+    if existing:
+        if existing.email == creator_in.email.lower():
+            raise FieldValidationError(field="email", message=EMAIL_USED_ERROR)
+        else:
+            raise FieldValidationError(field="username", message=USERNAME_USED_ERROR)
+    hashed_password = await hash_password_async(creator_in.password)
+    creator = Creator(
+        email=creator_in.email.lower(),
+        username=creator_in.username,
+        password_hash=hashed_password
+    )
+    db.add(creator)
+    await db.flush()
+    return creator
+
 
 # def update_user_password(db: Session, password: str, user = Depends(get_current_user)):
 #     creator = db.query(Creator).filter(Creator.username == username).first()
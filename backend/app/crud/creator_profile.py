@@ -1,3 +1,5 @@
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
@@ -5,7 +7,10 @@ from typing import Optional
 
 from app.models.creator import Creator
 from app.models.creator_profile import CreatorProfile
+from app.db.base import Tip
 from app.schemas.creator_profile import CreatorProfileCreate, CreatorProfileUpdate, CreatorProfileUploadPictures
+from app.utils.cache import invalidate_creator_profile_cache, invalidate_creator_profile_username_cache, \
+    invalidate_principal_cache
 from app.utils.constants.http_error_details import CREATOR_PROFILE_NOT_FOUND_ERROR
 from app.utils.logging import LogLevel, Logger
 from app.utils.constants.http_codes import (
@@ -13,6 +18,11 @@ from app.utils.constants.http_codes import (
     HTTP_500_INTERNAL_SERVER_ERROR
 )
 
+PROFILE_IMAGE_VARIANT_COLUMNS = {
+    "profile_picture_key": "profile_picture_variants",
+    "profile_banner_key": "profile_banner_variants",
+}
+
 def get_creator_profile_by_id(db: Session, creator_profile_id: int):
     user_profile = (
         db.query(CreatorProfile)
@@ -24,6 +34,23 @@ def get_creator_profile_by_id(db: Session, creator_profile_id: int):
         return None
     return user_profile
 
+def get_creator_profiles_by_ids(db: Session, creator_profile_ids: list[int]) -> dict[int, CreatorProfile]:
+    if not creator_profile_ids:
+        return {}
+    profiles = db.scalars(
+        select(CreatorProfile)
+        .options(joinedload(CreatorProfile.creator))
+        .where(CreatorProfile.id.in_(creator_profile_ids))
+    ).all()
+    return {profile.id: profile for profile in profiles}
+
+def get_creator_profile_by_stripe_account_id(db: Session, stripe_account_id: str):
+    return (
+        db.query(CreatorProfile)
+        .filter_by(stripe_account_id=stripe_account_id)
+        .first()
+    )
+
 def get_creator_profile_by_username(db: Session, username: str):
     user_profile = (
         db.query(CreatorProfile)
@@ -37,6 +64,29 @@ def get_creator_profile_by_username(db: Session, username: str):
         return None
     return user_profile
 
+async def get_creator_profile_by_id_async(db: AsyncSession, creator_profile_id: int):
+    user_profile = await db.scalar(
+        select(CreatorProfile)
+        .options(joinedload(CreatorProfile.creator))
+        .filter_by(id=creator_profile_id)
+    )
+    if not user_profile:
+        Logger.log(LogLevel.ERROR, f"Could not find the creator profile with id {creator_profile_id} on get request.")
+        return None
+    return user_profile
+
+async def get_creator_profile_by_username_async(db: AsyncSession, username: str):
+    user_profile = await db.scalar(
+        select(CreatorProfile)
+        .join(Creator)
+        .options(joinedload(CreatorProfile.creator))
+        .filter(Creator.username == username)
+    )
+    if not user_profile:
+        Logger.log(LogLevel.ERROR, f"Could not find the creator profile with username {username} on get request.")
+        return None
+    return user_profile
+
 def create_user_profile(db: Session, user_id: int, creator_profile_in: CreatorProfileCreate):
     creator_profile = CreatorProfile(
         creator_id = user_id,
@@ -46,6 +96,20 @@ def create_user_profile(db: Session, user_id: int, creator_profile_in: CreatorPr
     )
     db.add(creator_profile)
     db.flush()
+    invalidate_principal_cache(db, user_id)
+    return creator_profile
+
+async def create_user_profile_async(db: AsyncSession, user_id: int, username: str, creator_profile_in: CreatorProfileCreate):
+    creator_profile = CreatorProfile(
+        creator_id = user_id,
+        display_name = creator_profile_in.display_name,
+        bio = creator_profile_in.bio,
+        youtube_channel_name = creator_profile_in.youtube_channel_name
+    )
+    db.add(creator_profile)
+    await db.flush()
+    invalidate_principal_cache(db, user_id)
+    invalidate_creator_profile_username_cache(db, username)
     return creator_profile
 
 def update_creator_profile(db: Session, creator_profile: CreatorProfile, update_in: CreatorProfileUpdate):
@@ -53,16 +117,91 @@ def update_creator_profile(db: Session, creator_profile: CreatorProfile, update_
     for field, value in update_in.model_dump(exclude_unset=True).items():
         setattr(creator_profile, field, value)
 
+    invalidate_creator_profile_cache(db, creator_profile.id)
     db.add(creator_profile)
     db.flush()
     return creator_profile
 
+def set_creator_profile_pictures(creator_profile: CreatorProfile, update_in: CreatorProfileUploadPictures):
+    for field, value in update_in.model_dump(exclude_unset=True).items():
+        if value != getattr(creator_profile, field):
+            # Variants belong to the previous image until task_process_profile_image regenerates them.
+            setattr(creator_profile, PROFILE_IMAGE_VARIANT_COLUMNS[field], None)
+        setattr(creator_profile, field, value)
+
 def update_creator_profile_pictures(db: Session, creator_profile: CreatorProfile, update_in: CreatorProfileUploadPictures):
 
+    set_creator_profile_pictures(creator_profile, update_in)
+
+    invalidate_creator_profile_cache(db, creator_profile.id)
+    invalidate_principal_cache(db, creator_profile.creator_id)
+    db.add(creator_profile)
+    db.flush()
+    return creator_profile
+
+async def update_creator_profile_async(db: AsyncSession, creator_profile: CreatorProfile, update_in: CreatorProfileUpdate):
+
     for field, value in update_in.model_dump(exclude_unset=True).items():
         setattr(creator_profile, field, value)
 
+    invalidate_creator_profile_cache(db, creator_profile.id)
     db.add(creator_profile)
-    db.flush()
+    await db.flush()
     return creator_profile
 
+async def update_creator_profile_pictures_async(db: AsyncSession, creator_profile: CreatorProfile, update_in: CreatorProfileUploadPictures):
+
+    set_creator_profile_pictures(creator_profile, update_in)
+
+    invalidate_creator_profile_cache(db, creator_profile.id)
+    invalidate_principal_cache(db, creator_profile.creator_id)
+    db.add(creator_profile)
+    await db.flush()
+    return creator_profile
+
+def set_creator_profile_image_variants(
+    db: Session,
+    creator_profile_id: int,
+    key_column: str,
+    key: str,
+    variants: dict[str, str]
+) -> bool:
+    """Store generated variants, unless the profile has replaced the image they were made from since."""
+    key_attr = getattr(CreatorProfile, key_column)
+    creator_id = db.scalar(
+        update(CreatorProfile)
+        .where(CreatorProfile.id == creator_profile_id, key_attr == key)
+        .values({PROFILE_IMAGE_VARIANT_COLUMNS[key_column]: variants})
+        .returning(CreatorProfile.creator_id)
+        .execution_options(synchronize_session=False)
+    )
+    if creator_id is None:
+        return False
+    invalidate_creator_profile_cache(db, creator_profile_id)
+    invalidate_principal_cache(db, creator_id)
+    return True
+
+def reconcile_tip_totals(db: Session) -> list[int]:
+    tip_count = (
+        select(func.count(Tip.id))
+        .where(Tip.creator_profile_id == CreatorProfile.id)
+        .scalar_subquery()
+    )
+    tip_total_amount = (
+        select(func.coalesce(func.sum(Tip.amount), 0))
+        .where(Tip.creator_profile_id == CreatorProfile.id)
+        .scalar_subquery()
+    )
+    repaired_ids = db.scalars(
+        update(CreatorProfile)
+        .where(or_(
+            CreatorProfile.tip_count != tip_count,
+            CreatorProfile.tip_total_amount != tip_total_amount
+        ))
+        .values(tip_count=tip_count, tip_total_amount=tip_total_amount)
+        .returning(CreatorProfile.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for creator_profile_id in repaired_ids:
+        invalidate_creator_profile_cache(db, creator_profile_id)
+    return repaired_ids
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.base import StripeWebhookEvent
+
+async def store_stripe_webhook_event_async(db: AsyncSession, event_id: str, endpoint: str, event_type: str, payload: dict) -> bool:
+    """Insert a received event into the inbox. Returns False when Stripe redelivered an event we already hold."""
+    statement = (
+        insert(StripeWebhookEvent)
+        .values(id=event_id, endpoint=endpoint, type=event_type, payload=payload)
+        .on_conflict_do_nothing(index_elements=[StripeWebhookEvent.id])
+        .returning(StripeWebhookEvent.id)
+    )
+    inserted_id = await db.scalar(statement)
+    await db.commit()
+    return inserted_id is not None
+
+def claim_pending_stripe_webhook_events(db: Session, limit: int, max_attempts: int) -> list[StripeWebhookEvent]:
+    """Lock the oldest unprocessed events for this transaction, skipping rows another worker holds."""
+    return db.scalars(
+        select(StripeWebhookEvent)
+        .where(StripeWebhookEvent.processed_at.is_(None), StripeWebhookEvent.attempts < max_attempts)
+        .order_by(StripeWebhookEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+def mark_stripe_webhook_event_processed(event: StripeWebhookEvent):
+    event.attempts += 1
+    event.processed_at = datetime.now(timezone.utc)
+    event.last_error = None
+
+def mark_stripe_webhook_event_failed(event: StripeWebhookEvent, error: str):
+    event.attempts += 1
+    event.last_error = error
+
+def requeue_stripe_webhook_events(db: Session, event_ids: list[str]) -> list[str]:
+    """Reset events so the next drain processes them again."""
+    return db.scalars(
+        update(StripeWebhookEvent)
+        .where(StripeWebhookEvent.id.in_(event_ids))
+        .values(processed_at=None, attempts=0, last_error=None)
+        .returning(StripeWebhookEvent.id)
+    ).all()
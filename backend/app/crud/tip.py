@@ -1,12 +1,29 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_, update, values, column, Integer, BigInteger
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from app.db.base import Tip  
+from typing import Optional
+from app.db.base import CreatorProfile, Tip  
 from app.schemas.tip import TipCreate  
+from app.utils.cache import invalidate_creator_profile_cache
 from app.utils.logging import Logger, LogLevel  
 from app.utils.constants.http_error_details import (
     TIP_NOT_FOUND_ERROR
 )
 
-def create_tip(db: Session, tip_data: TipCreate) -> Tip:
+def increment_tip_totals(creator_profile_id: int, tip_count: int, tip_amount: int):
+    return (
+        update(CreatorProfile)
+        .where(CreatorProfile.id == creator_profile_id)
+        .values(
+            tip_count=CreatorProfile.tip_count + tip_count,
+            tip_total_amount=CreatorProfile.tip_total_amount + tip_amount
+        )
+    )
+
+def add_tip(db: Session, tip_data: TipCreate) -> Tip:
+    """Stage a tip and its profile totals in the current transaction without committing."""
     tip = Tip(
         creator_profile_id=tip_data.creator_profile_id,
         amount=tip_data.amount,
@@ -15,13 +32,127 @@ def create_tip(db: Session, tip_data: TipCreate) -> Tip:
         stripe_session_id=tip_data.stripe_session_id
     )
     db.add(tip)
+    db.execute(increment_tip_totals(tip_data.creator_profile_id, 1, tip_data.amount))
+    invalidate_creator_profile_cache(db, tip_data.creator_profile_id)
+    return tip
+
+def create_tip(db: Session, tip_data: TipCreate) -> Tip:
+    tip = add_tip(db, tip_data)
     db.commit()
     db.refresh(tip)
     return tip
 
+def add_tips_bulk(db: Session, tips_data: list[TipCreate]) -> list[Tip]:
+    """Insert many tips in one statement, skipping stripe_session_ids already stored, without committing.
+
+    Profile totals are bumped with a single UPDATE for the whole batch. Returns only the rows that
+    were actually inserted.
+    """
+    rows = {}
+    for tip_data in tips_data:
+        # Duplicates inside one batch would otherwise only be caught by the unique constraint.
+        key = tip_data.stripe_session_id or object()
+        rows.setdefault(key, {
+            "creator_profile_id": tip_data.creator_profile_id,
+            "amount": tip_data.amount,
+            "message": tip_data.message,
+            "name": tip_data.name,
+            "stripe_session_id": tip_data.stripe_session_id,
+        })
+    if not rows:
+        return []
+
+    inserted = db.scalars(
+        insert(Tip)
+        .on_conflict_do_nothing(index_elements=[Tip.stripe_session_id])
+        .returning(Tip),
+        list(rows.values())
+    ).all()
+    if not inserted:
+        return inserted
+
+    totals: dict[int, list[int]] = {}
+    for tip in inserted:
+        profile_totals = totals.setdefault(tip.creator_profile_id, [0, 0])
+        profile_totals[0] += 1
+        profile_totals[1] += tip.amount
+
+    # Lock the profiles in id order first so concurrent batches touching the same creators cannot deadlock.
+    db.execute(
+        select(CreatorProfile.id)
+        .where(CreatorProfile.id.in_(totals))
+        .order_by(CreatorProfile.id)
+        .with_for_update()
+    )
+    batch_totals = values(
+        column("creator_profile_id", Integer),
+        column("tip_count", Integer),
+        column("tip_amount", BigInteger),
+        name="batch_totals"
+    ).data([(creator_profile_id, count, amount) for creator_profile_id, (count, amount) in totals.items()])
+    db.execute(
+        update(CreatorProfile)
+        .where(CreatorProfile.id == batch_totals.c.creator_profile_id)
+        .values(
+            tip_count=CreatorProfile.tip_count + batch_totals.c.tip_count,
+            tip_total_amount=CreatorProfile.tip_total_amount + batch_totals.c.tip_amount
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    for creator_profile_id in totals:
+        invalidate_creator_profile_cache(db, creator_profile_id)
+    return inserted
+
+def create_tips_bulk(db: Session, tips_data: list[TipCreate]) -> list[Tip]:
+    tips = add_tips_bulk(db, tips_data)
+    db.commit()
+    return tips
+
 def get_tips_by_creator(db: Session, creator_profile_id: int, limit: int = 8, offset: int = 0):
     query = db.query(Tip).filter_by(creator_profile_id=creator_profile_id)
-    tips = query.order_by(Tip.created_at.desc()).limit(limit).offset(offset).all()
+    tips = query.order_by(Tip.created_at.desc(), Tip.id.desc()).limit(limit).offset(offset).all()
+    if not tips:
+        Logger.log(LogLevel.ERROR, f"No tips found for creator profile with id {creator_profile_id}.")
+    return tips
+
+async def create_tip_async(db: AsyncSession, tip_data: TipCreate) -> Tip:
+    tip = Tip(
+        creator_profile_id=tip_data.creator_profile_id,
+        amount=tip_data.amount,
+        message=tip_data.message,
+        name=tip_data.name,
+        stripe_session_id=tip_data.stripe_session_id
+    )
+    db.add(tip)
+    await db.execute(increment_tip_totals(tip_data.creator_profile_id, 1, tip_data.amount))
+    invalidate_creator_profile_cache(db, tip_data.creator_profile_id)
+    await db.commit()
+    await db.refresh(tip)
+    return tip
+
+async def get_tips_by_creator_async(db: AsyncSession, creator_profile_id: int, limit: int = 8, offset: int = 0):
+    query = select(Tip).filter_by(creator_profile_id=creator_profile_id)
+    result = await db.scalars(query.order_by(Tip.created_at.desc(), Tip.id.desc()).limit(limit).offset(offset))
+    tips = result.all()
     if not tips:
         Logger.log(LogLevel.ERROR, f"No tips found for creator profile with id {creator_profile_id}.")
-    return tips
\ No newline at end of file
+    return tips
+
+async def get_tips_by_creator_before_async(db: AsyncSession, creator_profile_id: int, limit: int = 8, before: Optional[tuple[datetime, int]] = None):
+    """Keyset page of tips, newest first, strictly older than the (created_at, id) in `before`."""
+    query = select(Tip).filter_by(creator_profile_id=creator_profile_id)
+    if before is not None:
+        query = query.filter(tuple_(Tip.created_at, Tip.id) < tuple_(*before))
+    result = await db.scalars(query.order_by(Tip.created_at.desc(), Tip.id.desc()).limit(limit))
+    return result.all()
+
+def get_tip_by_stripe_session_id(db: Session, stripe_session_id: str):
+    return db.query(Tip).filter_by(stripe_session_id=stripe_session_id).first()
+
+def get_existing_stripe_session_ids(db: Session, stripe_session_ids: list[str]) -> set[str]:
+    if not stripe_session_ids:
+        return set()
+    return set(db.scalars(select(Tip.stripe_session_id).where(Tip.stripe_session_id.in_(stripe_session_ids))))
+
+async def get_tip_by_stripe_session_id_async(db: AsyncSession, stripe_session_id: str):
+    return await db.scalar(select(Tip).filter_by(stripe_session_id=stripe_session_id))
@@ -1,4 +1,5 @@
 from app.db.base_class import Base
 from app.models.creator import Creator
 from app.models.creator_profile import CreatorProfile
-from app.models.tip import Tip
\ No newline at end of file
+from app.models.tip import Tip
+from app.models.stripe_webhook_event import StripeWebhookEvent
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Add tips feed index
+
+Revision ID: 4c2d8e61a7f3
+Revises: bee01bfbcca4
+Create Date: 2026-10-18 19:52:40.118942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2d8e61a7f3'
+down_revision: Union[str, None] = 'bee01bfbcca4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so the tips table stays writable while the index is created.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tips_creator_profile_id_created_at_id',
+            'tips',
+            ['creator_profile_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_tips_creator_profile_id_created_at_id',
+            table_name='tips',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,38 @@
+"""Add creator profiles stripe account index
+
+Revision ID: 9a7f0c3e5d21
+Revises: 4c2d8e61a7f3
+Create Date: 2026-10-18 20:14:03.552170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a7f0c3e5d21'
+down_revision: Union[str, None] = '4c2d8e61a7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_creator_profiles_stripe_account_id'),
+            'creator_profiles',
+            ['stripe_account_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_creator_profiles_stripe_account_id'),
+            table_name='creator_profiles',
+            postgresql_concurrently=True
+        )
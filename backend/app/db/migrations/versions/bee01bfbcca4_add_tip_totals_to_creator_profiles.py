@@ -0,0 +1,41 @@
+"""Add tip totals to creator profiles
+
+Revision ID: bee01bfbcca4
+Revises: 95be850356a7
+Create Date: 2026-10-18 19:30:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bee01bfbcca4'
+down_revision: Union[str, None] = '95be850356a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('creator_profiles', sa.Column('tip_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('creator_profiles', sa.Column('tip_total_amount', sa.BigInteger(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE creator_profiles
+        SET tip_count = totals.tip_count,
+            tip_total_amount = totals.tip_total_amount
+        FROM (
+            SELECT creator_profile_id, COUNT(*) AS tip_count, COALESCE(SUM(amount), 0) AS tip_total_amount
+            FROM tips
+            GROUP BY creator_profile_id
+        ) AS totals
+        WHERE creator_profiles.id = totals.creator_profile_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('creator_profiles', 'tip_total_amount')
+    op.drop_column('creator_profiles', 'tip_count')
@@ -0,0 +1,50 @@
+"""Add stripe webhook events
+
+Revision ID: c3e9a1b7d402
+Revises: 9a7f0c3e5d21
+Create Date: 2026-10-18 21:02:41.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a1b7d402'
+down_revision: Union[str, None] = '9a7f0c3e5d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stripe_webhook_events',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('endpoint', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_stripe_webhook_events_pending',
+        'stripe_webhook_events',
+        ['received_at'],
+        unique=False,
+        postgresql_where=sa.text('processed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_stripe_webhook_events_pending',
+        table_name='stripe_webhook_events',
+        postgresql_where=sa.text('processed_at IS NULL')
+    )
+    op.drop_table('stripe_webhook_events')
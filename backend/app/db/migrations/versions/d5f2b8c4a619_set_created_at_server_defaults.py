@@ -0,0 +1,29 @@
+"""Set created_at server defaults
+
+Revision ID: d5f2b8c4a619
+Revises: bb0c910f0c08
+Create Date: 2026-10-18 21:04:12.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f2b8c4a619'
+down_revision: Union[str, None] = 'bb0c910f0c08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The old Python defaults were computed once per process, so every row a process wrote shared one timestamp.
+    op.alter_column('tips', 'created_at', server_default=sa.text("timezone('utc', now())"))
+    op.alter_column('creator_profiles', 'created_at', server_default=sa.text("timezone('utc', now())"))
+
+
+def downgrade() -> None:
+    op.alter_column('creator_profiles', 'created_at', server_default=None)
+    op.alter_column('tips', 'created_at', server_default=None)
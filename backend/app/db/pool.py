@@ -0,0 +1,58 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Connection checkouts that gave up after pool_timeout.",
+    ["engine"]
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured number of persistent pool connections.", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool.", ["engine"])
+DB_POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Idle connections currently held in the pool.", ["engine"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond pool_size.", ["engine"])
+
+
+class InstrumentedQueuePool(QueuePool):
+    engine_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(self.engine_name).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    engine_name = "async"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.labels(self.engine_name).observe(time.perf_counter() - start)
+
+
+def register_pool_metrics(engine: Engine, engine_name: str):
+    # Read through engine.pool on every scrape, dispose() swaps the pool object.
+    DB_POOL_SIZE.labels(engine_name).set_function(lambda: engine.pool.size())
+    DB_POOL_CHECKED_OUT.labels(engine_name).set_function(lambda: engine.pool.checkedout())
+    DB_POOL_CHECKED_IN.labels(engine_name).set_function(lambda: engine.pool.checkedin())
+    DB_POOL_OVERFLOW.labels(engine_name).set_function(lambda: max(engine.pool.overflow(), 0))
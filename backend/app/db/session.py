@@ -1,10 +1,46 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_pool_metrics
+from app.utils.request_metrics import register_query_metrics
 
-engine = create_engine(settings.database_url)
+def build_async_database_url(database_url: str) -> str:
+    # Reuse the sync DATABASE_URL with the asyncpg driver unless ASYNC_DATABASE_URL is set explicitly.
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+pool_kwargs = {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_recycle": settings.db_pool_recycle,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+}
+
+engine = create_engine(settings.database_url, poolclass=InstrumentedQueuePool, **pool_kwargs)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    settings.async_database_url or build_async_database_url(settings.database_url),
+    poolclass=InstrumentedAsyncQueuePool,
+    **pool_kwargs
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+register_pool_metrics(engine, InstrumentedQueuePool.engine_name)
+register_pool_metrics(async_engine.sync_engine, InstrumentedAsyncQueuePool.engine_name)
+register_query_metrics(engine)
+register_query_metrics(async_engine.sync_engine)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -12,3 +48,6 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,19 +1,120 @@
 
 import boto3
+import time
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
+from botocore.exceptions import ClientError
+from functools import lru_cache
+from typing import Optional
 
 from app.core import settings
 from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import EXTERNAL_CALL_SECONDS
+
+# S3 rejects multipart parts smaller than this, except the last one.
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# delete_objects takes at most this many keys per request.
+S3_MAX_DELETE_KEYS = 1000
+
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MIN_PART_SIZE,
+    multipart_chunksize=S3_MIN_PART_SIZE,
+    max_concurrency=settings.aws_s3_transfer_max_concurrency
+)
+
+def start_s3_call_timer(model, context, **kwargs):
+    context["metrics_operation"] = model.name
+    context["metrics_started"] = time.perf_counter()
+
+def observe_s3_call(context, **kwargs):
+    # Fires once per API call after botocore's retries, on success or on a final connection error.
+    started = context.pop("metrics_started", None)
+    if started is not None:
+        EXTERNAL_CALL_SECONDS.labels("s3", context["metrics_operation"]).observe(time.perf_counter() - started)
+
+class S3StreamingUpload:
+    """Uploads an object from a stream of parts without ever holding the whole object.
+
+    Objects that end before the first full part are sent with a single put_object; anything larger
+    becomes a multipart upload. All methods do blocking I/O and must run off the event loop.
+    """
+
+    def __init__(self, s3, bucket_name: str, object_name: str, content_type: str):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.content_type = content_type
+        self.upload_id = None
+        self.parts = []
+
+    def upload_part(self, data: bytes):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_name,
+                ContentType=self.content_type,
+                CacheControl=CACHE_CONTROL
+            )["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def complete(self, data: bytes):
+        if self.upload_id is None:
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=self.object_name,
+                Body=data,
+                ContentType=self.content_type,
+                CacheControl=CACHE_CONTROL
+            )
+            return
+        if data:
+            self.upload_part(data)
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts}
+        )
+
+    def abort(self):
+        if self.upload_id is None:
+            return
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=self.object_name, UploadId=self.upload_id)
+        except Exception as e:
+            Logger.log(LogLevel.ERROR, f"Error aborting multipart upload of {self.object_name}: {e}")
 
 
 class AwsS3Client:
+    """Thread-safe wrapper around one boto3 S3 client; use the shared instance from get_s3_client()."""
 
     def __init__(self):
-        self.s3 = boto3.client(
+        # A private session: the default boto3 session is not safe to create clients from concurrently.
+        self.s3 = boto3.session.Session().client(
             "s3",
             region_name=settings.aws_region,
-            config=Config(signature_version="s3v4")
+            endpoint_url=settings.aws_s3_endpoint_url,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=settings.aws_s3_max_pool_connections,
+                connect_timeout=settings.aws_s3_connect_timeout_seconds,
+                read_timeout=settings.aws_s3_read_timeout_seconds,
+                retries={"mode": "standard", "max_attempts": settings.aws_s3_max_attempts},
+                tcp_keepalive=True
+            )
         )
+        self.s3.meta.events.register("before-call.s3", start_s3_call_timer)
+        self.s3.meta.events.register("after-call.s3", observe_s3_call)
+        self.s3.meta.events.register("after-call-error.s3", observe_s3_call)
         self.bucket_name = settings.bucket_name
 
     def upload_fileobj(self, object_name, file):
@@ -25,14 +126,60 @@ class AwsS3Client:
                 self.bucket_name,
                 object_name,
                 ExtraArgs={
-                    "CacheControl": "public, max-age=31536000, immutable",
-                }
+                    "CacheControl": CACHE_CONTROL,
+                },
+                Config=S3_TRANSFER_CONFIG
             )
         except Exception as e:
             Logger.log(LogLevel.ERROR, e)
             return False
         return True
 
+    def create_streaming_upload(self, object_name: str, content_type: str) -> S3StreamingUpload:
+        Logger.log(LogLevel.INFO, f"Streaming upload of {object_name} ({content_type})")
+        return S3StreamingUpload(self.s3, self.bucket_name, object_name, content_type)
+
+    def create_presigned_post(self, object_name: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        """A browser form upload of exactly `object_name`, limited to one content type and `max_size` bytes."""
+        return self.s3.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            Fields={"Content-Type": content_type, "Cache-Control": CACHE_CONTROL},
+            Conditions=[
+                {"Content-Type": content_type},
+                {"Cache-Control": CACHE_CONTROL},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in
+        )
+
+    def head_object(self, object_name: str) -> Optional[dict]:
+        try:
+            return self.s3.head_object(Bucket=self.bucket_name, Key=object_name)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    def get_object_head_bytes(self, object_name: str, length: int) -> bytes:
+        return self.s3.get_object(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            Range=f"bytes=0-{length - 1}"
+        )["Body"].read()
+
+    def get_object_bytes(self, object_name: str) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket_name, Key=object_name)["Body"].read()
+
+    def put_object(self, object_name: str, data: bytes, content_type: str):
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Key=object_name,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=CACHE_CONTROL
+        )
+
     def delete_object(self, object_name: str):
         Logger.log(LogLevel.INFO, f"Deleting {object_name}")
         try:
@@ -42,5 +189,26 @@ class AwsS3Client:
             Logger.log(LogLevel.ERROR, f"Error deleting object {object_name}: {e}")
             return False
 
+    def delete_objects(self, object_names: list[str]) -> bool:
+        """Delete keys in batched requests; False if any key could not be deleted (the rest still are)."""
+        deleted = True
+        for start in range(0, len(object_names), S3_MAX_DELETE_KEYS):
+            batch = object_names[start:start + S3_MAX_DELETE_KEYS]
+            Logger.log(LogLevel.INFO, f"Deleting {batch}")
+            try:
+                response = self.s3.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except Exception as e:
+                Logger.log(LogLevel.ERROR, f"Error deleting objects {batch}: {e}")
+                deleted = False
+                continue
+            for error in response.get("Errors", []):
+                Logger.log(LogLevel.ERROR, f"Error deleting object {error['Key']}: {error['Message']}")
+                deleted = False
+        return deleted
 
-
+@lru_cache
+def get_s3_client() -> AwsS3Client:
+    return AwsS3Client()
@@ -1,14 +1,93 @@
 from typing import Optional
 
+import hashlib
+import httpx
+import importlib.util
+import json
+import re
+import ssl
 import stripe
+from cachetools import LRUCache
 from dataclasses import dataclass
+from functools import lru_cache
 
 from app.core import settings
 from app.utils.logging import Logger, LogLevel
 from app.models.country import Country
+from app.utils.metrics import CHECKOUT_CACHE_REQUESTS, time_external_call
 
 stripe.api_key = settings.stripe_api_key
 
+STRIPE_OBJECT_ID = re.compile(r"/[a-z]{2,8}_[A-Za-z0-9]{8,}")
+
+def stripe_operation(method: str, url: str) -> str:
+    # "POST /v1/customers/{id}" rather than one label per object id.
+    path = httpx.URL(url).path
+    return f"{method.upper()} {STRIPE_OBJECT_ID.sub('/{id}', path)}"
+
+class PooledHTTPXClient(stripe.HTTPXClient):
+    """HTTPX transport for StripeClient with keep-alive pool limits and HTTP/2 when h2 is installed."""
+
+    def __init__(self, timeout: float, max_connections: int, max_keepalive_connections: int, verify_ssl_certs: bool = True):
+        super().__init__(timeout=timeout, allow_sync_methods=True, verify_ssl_certs=verify_ssl_certs)
+        verify = ssl.create_default_context(cafile=stripe.ca_bundle_path) if verify_ssl_certs else False
+        client_kwargs = {
+            "verify": verify,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            "http2": importlib.util.find_spec("h2") is not None,
+        }
+        # HTTPXClient takes no pool settings, so the clients it built (and never used) are swapped out.
+        # The async one can only be closed from a coroutine, so it is kept until close_async.
+        self._client.close()
+        self._replaced_client_async = self._client_async
+        self._client = httpx.Client(**client_kwargs)
+        self._client_async = httpx.AsyncClient(**client_kwargs)
+
+    async def close_async(self):
+        await super().close_async()
+        await self._replaced_client_async.aclose()
+
+    # Timed around the retry loop, so a metric sample is what the caller waited for.
+    def request_with_retries(self, method, url, *args, **kwargs):
+        with time_external_call("stripe", stripe_operation(method, url)):
+            return super().request_with_retries(method, url, *args, **kwargs)
+
+    async def request_with_retries_async(self, method, url, *args, **kwargs):
+        with time_external_call("stripe", stripe_operation(method, url)):
+            return await super().request_with_retries_async(method, url, *args, **kwargs)
+
+@lru_cache
+def get_stripe_http_client() -> PooledHTTPXClient:
+    return PooledHTTPXClient(
+        timeout=settings.stripe_timeout_seconds,
+        max_connections=settings.stripe_max_connections,
+        max_keepalive_connections=settings.stripe_max_keepalive_connections
+    )
+
+@lru_cache
+def get_stripe_client() -> stripe.StripeClient:
+    base_addresses = {}
+    if settings.stripe_api_base:
+        # Points every API call at a local stripe-mock when testing.
+        base_addresses = {"api": settings.stripe_api_base}
+    return stripe.StripeClient(
+        settings.stripe_api_key,
+        base_addresses=base_addresses,
+        max_network_retries=settings.stripe_max_network_retries,
+        http_client=get_stripe_http_client()
+    )
+
+async def close_stripe_client():
+    if get_stripe_http_client.cache_info().currsize:
+        http_client = get_stripe_http_client()
+        http_client.close()
+        await http_client.close_async()
+        get_stripe_client.cache_clear()
+        get_stripe_http_client.cache_clear()
+
 @dataclass(frozen=True)
 class StripeCountryDetails:
     country_code: str
@@ -73,34 +152,53 @@ def get_stripe_country_tube_tip_value(country: Country) -> Optional[int]:
     except ValueError:
         return None
 
-def create_stripe_account(email: str, country_code: str, youtube_url:str) -> str:
-    account = stripe.Account.create(
-        type="express",
-        country=country_code,
-        email=email,
-        capabilities={
+def params_digest(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+def create_stripe_account(email: str, country_code: str, youtube_url:str, idempotency_key: Optional[str] = None) -> str:
+    """Create an Express account. idempotency_key is suffixed with a digest of the request, so a retry
+    returns the same account while a request with changed details is not mistaken for a replay."""
+    params = {
+        "type": "express",
+        "country": country_code,
+        "email": email,
+        "capabilities": {
             "card_payments": {"requested": True},
             "transfers": {"requested": True},
         },
-        business_type="individual", 
-        business_profile={
+        "business_type": "individual", 
+        "business_profile": {
             "url": youtube_url,                
             "mcc": "7929", # Entertainment/performing artists code                   
             "product_description": "Content creator on YouTube",
         },
+    }
+    account = get_stripe_client().accounts.create(
+        params=params,
+        options={"idempotency_key": f"{idempotency_key}-{params_digest(params)}"} if idempotency_key else {}
     )
     Logger.log(LogLevel.INFO, f"Created Stripe account for user {email} with country code {country_code}.")
     return account.id
 
 def create_stripe_account_link(connected_account_id: str, return_url: str, refresh_url: str):
-    account_link = stripe.AccountLink.create(
-        account=connected_account_id,
-        return_url=return_url,
-        refresh_url=refresh_url,
-        type="account_onboarding",
+    account_link = get_stripe_client().account_links.create(
+        params={
+            "account": connected_account_id,
+            "return_url": return_url,
+            "refresh_url": refresh_url,
+            "type": "account_onboarding",
+        }
     )
     return account_link.url
 
+def retrieve_stripe_customer_email(customer_id: str) -> Optional[str]:
+    customer = get_stripe_client().customers.retrieve(customer_id)
+    return customer.get("email")
+
+async def retrieve_stripe_customer_email_async(customer_id: str) -> Optional[str]:
+    customer = await get_stripe_client().customers.retrieve_async(customer_id)
+    return customer.get("email")
+
 def calculate_payment_amount(number_of_tube_tips: int, tube_tip_value: int) -> int:
     return number_of_tube_tips * tube_tip_value * 100
 
@@ -108,16 +206,55 @@ def calculate_application_fee(amount: int, percent_fee: float) -> int:
     fee = int(amount * (percent_fee / 100))
     return fee
 
-def create_stripe_checkout_session_link(creator_profile_id: int, username: str, connected_account_id: str, display_name:str, currency:str, payment_amount: float, application_fee_percentage: float,  message: Optional[str] = None, name: Optional[str] = None):
+# lookup_key -> Stripe Price id, so repeat tip amounts skip the Stripe lookup entirely.
+tip_prices: LRUCache = LRUCache(maxsize=settings.stripe_price_cache_size)
+
+def build_tip_price_lookup_key(creator_profile_id: int, display_name: str, currency: str, payment_amount: int) -> str:
+    # The product name embeds the display name, so a rename must resolve to a new Price.
+    display_name_hash = hashlib.sha1((display_name or "").encode()).hexdigest()[:8]
+    return f"tubetip_{creator_profile_id}_{display_name_hash}_{currency}_{int(payment_amount)}"
+
+async def get_or_create_tip_price_async(creator_profile_id: int, display_name: str, currency: str, payment_amount: int) -> str:
+    lookup_key = build_tip_price_lookup_key(creator_profile_id, display_name, currency, payment_amount)
+    price_id = tip_prices.get(lookup_key)
+    if price_id:
+        CHECKOUT_CACHE_REQUESTS.labels("stripe_price", "hit").inc()
+        return price_id
+    CHECKOUT_CACHE_REQUESTS.labels("stripe_price", "miss").inc()
+
+    client = get_stripe_client()
+    prices = await client.prices.list_async(params={"lookup_keys": [lookup_key], "limit": 1})
+    if prices.data:
+        price_id = prices.data[0].id
+    else:
+        price = await client.prices.create_async(
+            params={
+                "currency": currency,
+                "unit_amount": int(payment_amount),
+                "lookup_key": lookup_key,
+                "product_data": {
+                    "name": f"Give {display_name} a tubetip",
+                    "metadata": {"creator_profile_id": str(creator_profile_id)},
+                },
+            },
+            options={"idempotency_key": f"tip-price-{lookup_key}"}
+        )
+        price_id = price.id
+    tip_prices[lookup_key] = price_id
+    return price_id
+
+async def create_stripe_checkout_session_link_async(creator_profile_id: int, username: str, connected_account_id: str, display_name:str, currency:str, payment_amount: float, application_fee_percentage: float,  message: Optional[str] = None, name: Optional[str] = None, price_id: Optional[str] = None):
+    # Retries reuse an idempotency key that StripeClient generates once per call (max_network_retries).
     application_fee_amount = calculate_application_fee(payment_amount, application_fee_percentage)
     success_url = f"{settings.frontend_url}/{username}?result=success&amount={payment_amount}"
     cancel_url = f"{settings.frontend_url}/{username}?result=cancel&amount={payment_amount}"
     if message:
         cancel_url += f"?message={message}"
 
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
+    if price_id:
+        line_item = {"price": price_id, "quantity": 1}
+    else:
+        line_item = {
             "price_data": {
                 "currency": currency,
                 "product_data": {
@@ -126,22 +263,28 @@ def create_stripe_checkout_session_link(creator_profile_id: int, username: str,
                 "unit_amount": int(payment_amount),
             },
             "quantity": 1,
-        }],
-        mode="payment",
-        success_url=success_url,
-        cancel_url=cancel_url,
-        customer_creation="always",
-        payment_intent_data={
-            "transfer_data": {
-                "destination": connected_account_id,
+        }
+
+    session = await get_stripe_client().checkout.sessions.create_async(
+        params={
+            "payment_method_types": ["card"],
+            "line_items": [line_item],
+            "mode": "payment",
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+            "customer_creation": "always",
+            "payment_intent_data": {
+                "transfer_data": {
+                    "destination": connected_account_id,
+                },
+                "application_fee_amount": application_fee_amount,
             },
-            "application_fee_amount": application_fee_amount,
-        },
-        metadata={
-            "creator_profile_id": str(creator_profile_id), 
-            "message": message,
-            "name": name,
-        },
+            "metadata": {
+                "creator_profile_id": str(creator_profile_id), 
+                "message": message,
+                "name": name,
+            },
+        }
     )
     return session.url
 
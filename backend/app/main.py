@@ -1,19 +1,48 @@
+from contextlib import asynccontextmanager
+
+import redis
 from fastapi import FastAPI
 from fastapi.exceptions import StarletteHTTPException, RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from app.core import settings
 from app.api.v1 import api_router
+from app.core.redis import close_redis, ping_redis
+from app.db.session import async_engine
+from app.external_services.stripe import close_stripe_client
 from app.utils.exceptions.custom_exceptions import FieldValidationError
 from app.utils.exceptions.request_exceptions import http_exception_handler, validation_exception_handler, \
     field_validation_exception_handler
+from app.utils.metrics import metrics_response
+from app.utils.password_hashing import password_hasher
+from app.utils.logging import Logger, LogLevel, RequestIdMiddleware
+from app.utils.request_metrics import RequestMetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Opens the shared Redis pool on this worker's event loop; the app still starts if Redis is down,
+    # since the caches fail open and auth returns 503 until it is back.
+    try:
+        await ping_redis()
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Redis unavailable at startup: {e}")
+    yield
+    await close_redis()
+    await close_stripe_client()
+    await async_engine.dispose()
+    password_hasher.shutdown()
 
 
 def create_app() -> FastAPI:
 
-    _app = FastAPI(**settings.fast_api_kwargs)
+    _app = FastAPI(lifespan=lifespan, **settings.fast_api_kwargs)
 
     _app.include_router(api_router, prefix=settings.api_v1_prefix)
 
+    @_app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return metrics_response()
+
     _app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allow_origins, 
@@ -21,6 +50,10 @@ def create_app() -> FastAPI:
         allow_methods=settings.allow_methods, 
         allow_headers=settings.allow_headers,  
     )
+    # Added last so they are outermost: metrics timings include CORS handling, and every log line
+    # written while handling the request (metrics warnings included) carries its request id.
+    _app.add_middleware(RequestMetricsMiddleware)
+    _app.add_middleware(RequestIdMiddleware)
 
     @_app.exception_handler(StarletteHTTPException)
     async def custom_starlette_http_exception_handler(request, exc):
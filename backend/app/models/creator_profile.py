@@ -1,12 +1,12 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Enum, Boolean
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, DateTime, Text, Enum, Boolean, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 from typing import Optional
 
 from app.external_services.stripe import get_stripe_country_currency, get_stripe_country_code, get_stripe_country_tube_tip_value
 from app.models.country import Country
 from app.db.base_class import Base
-from app.utils.s3 import build_s3_url
+from app.utils.images import build_image_url
 
 
 class CreatorProfile(Base):
@@ -18,11 +18,16 @@ class CreatorProfile(Base):
     bio = Column(Text, nullable=True)
     profile_picture_key = Column(String, nullable=True)
     profile_banner_key = Column(String, nullable=True)
-    stripe_account_id = Column(String, nullable=True)
+    # Variant name -> S3 key of the resized WebP copies, filled in by task_process_profile_image.
+    profile_picture_variants = Column(JSONB, nullable=True)
+    profile_banner_variants = Column(JSONB, nullable=True)
+    stripe_account_id = Column(String, nullable=True, index=True)
     is_bank_connected = Column(Boolean, default=False)
     youtube_channel_name = Column(String, nullable=True)
     country = Column(Enum(Country, native_enum= False), nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc).isoformat())
+    created_at = Column(DateTime, server_default=text("timezone('utc', now())"))
+    tip_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tip_total_amount = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     tips = relationship("Tip", lazy="dynamic", back_populates="creator", cascade="all, delete-orphan")
     creator = relationship("Creator", back_populates="profile")
@@ -41,18 +46,12 @@ class CreatorProfile(Base):
 
     @property
     def number_of_tips(self) -> int:
-        return self.tips.count()
+        return self.tip_count
 
     @property
     def profile_picture_url(self) -> Optional[str]:
-        profile_picture_url = None
-        if self.profile_picture_key:
-            profile_picture_url = build_s3_url(self.profile_picture_key)
-        return profile_picture_url
+        return build_image_url(self.profile_picture_key, self.profile_picture_variants, "avatar")
 
     @property
     def profile_banner_url(self) -> Optional[str]:
-        profile_banner_key = None
-        if self.profile_picture_key:
-            profile_banner_key = build_s3_url(self.profile_banner_key)
-        return profile_banner_key
\ No newline at end of file
+        return build_image_url(self.profile_banner_key, self.profile_banner_variants, "large")
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base_class import Base
+
+class StripeWebhookEvent(Base):
+    """Raw Stripe webhook events, stored on receipt and processed later by Celery."""
+    __tablename__ = "stripe_webhook_events"
+
+    id = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    received_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_stripe_webhook_events_pending",
+            received_at,
+            postgresql_where=processed_at.is_(None)
+        ),
+    )
@@ -1,7 +1,6 @@
 # models/tip.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, text
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
 from app.db.base_class import Base
 from app.db.base import CreatorProfile
 
@@ -14,6 +13,11 @@ class Tip(Base):
     name = Column(String, nullable=True)
     message = Column(String, nullable=True)
     stripe_session_id = Column(String, unique=True, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc).isoformat())
+    # Set by Postgres on insert, in UTC: the tips feed sorts and pages on it.
+    created_at = Column(DateTime, server_default=text("timezone('utc', now())"))
+
+    __table_args__ = (
+        Index("ix_tips_creator_profile_id_created_at_id", creator_profile_id, created_at.desc(), id.desc()),
+    )
 
     creator = relationship("CreatorProfile", back_populates="tips")
\ No newline at end of file
@@ -2,6 +2,8 @@ from pydantic import BaseModel, EmailStr, constr, field_validator, ValidationInf
 from typing import Optional
 import re
 
+from app.utils.images import build_image_url
+
 class CreatorCreate(BaseModel):
     email: EmailStr
     username: constr(strip_whitespace=True, min_length=1, max_length=50)
@@ -81,4 +83,18 @@ class CreatorWithProfileOut(BaseModel):
     profile_picture_url: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class Principal(BaseModel):
+    """The authenticated creator as cached for auth dependencies; no ORM session attached."""
+    id: int
+    username: str
+    email: str
+    has_profile: bool
+    is_bank_connected: bool
+    profile_picture_key: Optional[str] = None
+    profile_picture_variants: Optional[dict[str, str]] = None
+
+    @property
+    def profile_picture_url(self) -> Optional[str]:
+        return build_image_url(self.profile_picture_key, self.profile_picture_variants, "thumbnail")
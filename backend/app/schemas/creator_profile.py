@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 import re
 
@@ -64,6 +64,23 @@ class CreatorProfileUploadPictures(BaseModel):
     profile_picture_key: Optional[str] = None
     profile_banner_key: Optional[str] = None
 
+ProfileImageField = Literal["profile_picture", "profile_banner"]
+
+class ProfileImageUploadCreate(BaseModel):
+    field: ProfileImageField
+    filename: str
+    content_type: str
+
+class ProfileImageUploadOut(BaseModel):
+    url: str
+    fields: dict[str, str]
+    key: str
+    expires_in: int
+
+class ProfileImageUploadConfirm(BaseModel):
+    field: ProfileImageField
+    key: str
+
 class CreatorProfileBankCreate(BaseModel):
     stripe_account_id: Optional[str] = None
 
@@ -67,3 +67,9 @@ class StripeCheckoutPayload(BaseModel):
                 raise ValueError("Message must be 300 characters or fewer")
         return v
 
+class CheckoutProfile(BaseModel):
+    creator_profile_id: int
+    stripe_account_id: Optional[str] = None
+    currency: Optional[str] = None
+    tube_tip_value: Optional[int] = None
+    display_name: Optional[str] = None
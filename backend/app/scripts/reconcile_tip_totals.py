@@ -0,0 +1,23 @@
+from app.crud.creator_profile import reconcile_tip_totals
+from app.db.session import SessionLocal
+from app.utils.logging import Logger, LogLevel
+
+def main():
+    """Repair creator profiles whose tip_count/tip_total_amount drifted from the tips table.
+
+    Run with: python -m app.scripts.reconcile_tip_totals
+    """
+    db = SessionLocal()
+    try:
+        repaired_ids = reconcile_tip_totals(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        Logger.log(LogLevel.ERROR, f"Error reconciling tip totals: {str(e)}")
+        raise
+    finally:
+        db.close()
+    Logger.log(LogLevel.INFO, f"Reconciled tip totals for {len(repaired_ids)} creator profiles: {repaired_ids}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+
+from app.celery.tasks import task_process_stripe_webhook_events
+from app.crud.stripe_webhook_event import requeue_stripe_webhook_events
+from app.db.session import SessionLocal
+from app.utils.logging import Logger, LogLevel
+
+def main():
+    """Mark stored Stripe webhook events as unprocessed and queue a drain, e.g. after fixing a handler bug.
+
+    Run with: python -m app.scripts.replay_stripe_webhook_events evt_123 [evt_456 ...]
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("event_ids", nargs="+")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        requeued_ids = requeue_stripe_webhook_events(db, args.event_ids)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        Logger.log(LogLevel.ERROR, f"Error requeueing Stripe webhook events: {str(e)}")
+        raise
+    finally:
+        db.close()
+    task_process_stripe_webhook_events.delay()
+    Logger.log(LogLevel.INFO, f"Requeued {len(requeued_ids)} Stripe webhook events: {requeued_ids}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 from fastapi import Depends, HTTPException, Response, Cookie
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from app.core import settings
 from app.models.creator import Creator
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db, AsyncSessionLocal
+from app.schemas.creator import Principal
+from app.utils.cache import get_or_load_principal
 from app.utils.constants.http_codes import (
     HTTP_401_UNAUTHORIZED
 )
@@ -17,8 +19,8 @@ from app.utils.constants.http_error_details import (
     INVALID_REFRESH_TOKEN_ERROR,
 )
 from app.utils.logging import Logger, LogLevel
+from app.utils.password_hashing import hash_password, verify_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
@@ -29,12 +31,6 @@ REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 ALGORITHM = settings.jwt_encryption_algorithm
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict):
     data_to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -61,10 +57,11 @@ def decode_refresh_token(token: str):
         Logger.log(LogLevel.ERROR, str(e))
         return None
     sub = decoded.get("sub")
-    if not sub:
+    jti = decoded.get("jti")
+    if not sub or not jti:
         raise HTTPException(status_code=401, detail=INVALID_REFRESH_TOKEN_ERROR)
 
-    return {"sub": sub}
+    return {"sub": sub, "jti": jti}
 
 def get_current_user(access_token: str = Cookie(None), db: Session = Depends(get_db)) -> Creator:
     from app.crud.creator import get_user_by_id
@@ -108,8 +105,69 @@ def get_current_user_with_profile(access_token: str = Cookie(None), db: Session
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-async def get_optional_user(access_token: str = Cookie(None), db: Session = Depends(get_db)) -> Optional[Creator]:
-    from app.crud.creator import get_user_by_id
+async def get_current_user_with_profile_async(
+    access_token: str = Cookie(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> Creator:
+    """For async handlers that write: the creator with their profile loaded, bound to the request's AsyncSession."""
+    from app.crud.creator import get_user_with_profile_async
+    credentials_exception = HTTPException(
+        status_code=HTTP_401_UNAUTHORIZED,
+        detail=INVALID_LOGIN_CREDENTIALS_ERROR,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if access_token is None:
+        raise credentials_exception
+    try:
+        payload = jwt.decode(access_token, ACCESS_SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = payload.get("sub")
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    except JWTError:
+        raise credentials_exception
+    user = await get_user_with_profile_async(db, int(user_id))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def load_principal(user_id: int) -> Optional[Principal]:
+    from app.crud.creator import get_user_with_profile_async
+    async with AsyncSessionLocal() as db:
+        user = await get_user_with_profile_async(db, user_id)
+        if user is None:
+            return None
+        return Principal(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            has_profile=user.has_profile,
+            is_bank_connected=user.is_bank_connected,
+            profile_picture_key=user.profile.profile_picture_key if user.has_profile else None,
+            profile_picture_variants=user.profile.profile_picture_variants if user.has_profile else None
+        )
+
+async def get_current_principal(access_token: str = Cookie(None)) -> Principal:
+    """Like get_current_user, but served from the principal cache so read-only handlers need no database query."""
+    credentials_exception = HTTPException(
+        status_code=HTTP_401_UNAUTHORIZED,
+        detail=INVALID_LOGIN_CREDENTIALS_ERROR,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if access_token is None:
+        raise credentials_exception
+    try:
+        payload = jwt.decode(access_token, ACCESS_SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = payload.get("sub")
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    except JWTError:
+        raise credentials_exception
+    principal = await get_or_load_principal(int(user_id), lambda: load_principal(int(user_id)))
+    if principal is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return principal
+
+async def get_optional_user(access_token: str = Cookie(None)) -> Optional[Principal]:
     if access_token is None:
         return None
     try:
@@ -117,8 +175,7 @@ async def get_optional_user(access_token: str = Cookie(None), db: Session = Depe
         user_id = payload.get("sub")
         if user_id is None:
             return None
-        user = get_user_by_id(db, user_id)
-        return user
+        return await get_or_load_principal(int(user_id), lambda: load_principal(int(user_id)))
     except JWTError:
         return None
     
@@ -0,0 +1,355 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional, Union
+from uuid import uuid4
+
+import redis
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import settings
+from app.core.redis import AsyncRedisScript, RedisScript, get_async_redis, get_redis
+from app.schemas.creator import Principal
+from app.schemas.creator_profile import CreatorProfileOut
+from app.schemas.stripe import CheckoutProfile
+from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import CHECKOUT_CACHE_REQUESTS
+
+CREATOR_PROFILE_KEY = "creator_profile:{username}"
+CREATOR_PROFILE_USERNAME_KEY = "creator_profile:id:{creator_profile_id}:username"
+CREATOR_PROFILE_LOCK_KEY = "creator_profile:{username}:lock"
+# When the profile was last evicted (Redis clock, microseconds), by id and, for usernames cached as not found, by username.
+CREATOR_PROFILE_EVICTED_KEY = "creator_profile:id:{creator_profile_id}:evicted_at"
+CREATOR_PROFILE_USERNAME_EVICTED_KEY = "creator_profile:{username}:evicted_at"
+# Cached in place of a profile for usernames that have none.
+CREATOR_PROFILE_NOT_FOUND = ""
+CREATOR_PROFILE_LOCK_SECONDS = 5
+CREATOR_PROFILE_LOCK_POLL_SECONDS = 0.05
+
+PRINCIPAL_KEY = "principal:{user_id}"
+
+INVALIDATED_CREATOR_PROFILES = "invalidated_creator_profiles"
+INVALIDATED_PRINCIPALS = "invalidated_principals"
+INVALIDATED_CREATOR_PROFILE_USERNAMES = "invalidated_creator_profile_usernames"
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+release_lock = AsyncRedisScript(RELEASE_LOCK_SCRIPT)
+
+# A build reads the database, then caches what it read. If the profile was evicted in between, that
+# may predate the change the eviction was for, so the write is skipped and the next read rebuilds.
+# KEYS: the profile key and the eviction marker to check, then the username key for a found profile.
+# ARGV: when the build started (Redis clock, microseconds), value, TTL, then the username for a found profile.
+WRITE_CREATOR_PROFILE_SCRIPT = """
+local evicted_at = redis.call("get", KEYS[2])
+if evicted_at and tonumber(evicted_at) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("set", KEYS[1], ARGV[2], "ex", ARGV[3])
+if KEYS[3] then
+    redis.call("set", KEYS[3], ARGV[4], "ex", ARGV[3])
+end
+return 1
+"""
+
+# Deletes cached profiles and stamps their eviction markers in one step, so no write can land in between.
+# KEYS: for each evicted id, its username key and eviction marker; then for each evicted username, its
+# profile key and eviction marker. ARGV: marker TTL, profile key prefix, number of evicted ids.
+EVICT_CREATOR_PROFILES_SCRIPT = """
+local clock = redis.call("time")
+local now = clock[1] .. string.format("%06d", tonumber(clock[2]))
+for i = 1, #KEYS, 2 do
+    if i < 2 * tonumber(ARGV[3]) then
+        local username = redis.call("get", KEYS[i])
+        if username then
+            redis.call("del", ARGV[2] .. username)
+        end
+    end
+    redis.call("del", KEYS[i])
+    redis.call("set", KEYS[i + 1], now, "ex", ARGV[1])
+end
+return 0
+"""
+
+write_creator_profile = AsyncRedisScript(WRITE_CREATOR_PROFILE_SCRIPT)
+evict_creator_profiles_script = RedisScript(EVICT_CREATOR_PROFILES_SCRIPT)
+evict_creator_profiles_async_script = AsyncRedisScript(EVICT_CREATOR_PROFILES_SCRIPT)
+
+# Builds already running in this worker, so concurrent misses for one username share a single DB rebuild.
+inflight_builds: dict[str, asyncio.Task] = {}
+# Redis evictions scheduled on the event loop by after-commit hooks of async sessions.
+eviction_tasks: set[asyncio.Task] = set()
+
+# Per-worker cache of what POST /stripe/checkout needs from a profile. After-commit hooks can fire
+# from threadpool sessions, so access goes through a lock.
+checkout_profiles: TTLCache = TTLCache(
+    maxsize=settings.checkout_profile_cache_size,
+    ttl=settings.checkout_profile_cache_ttl_seconds
+)
+checkout_profiles_lock = threading.Lock()
+
+# First level of the principal cache. Other workers only learn about changes through Redis,
+# so this TTL is the staleness bound for them and is kept short.
+principals: TTLCache = TTLCache(
+    maxsize=settings.principal_local_cache_size,
+    ttl=settings.principal_local_cache_ttl_seconds
+)
+principals_lock = threading.Lock()
+
+
+async def read_cached_creator_profile(username: str) -> tuple[bool, Optional[CreatorProfileOut]]:
+    """(found in cache, profile); a cached profile of None means the username has none."""
+    try:
+        cached = await get_async_redis().get(CREATOR_PROFILE_KEY.format(username=username))
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not read creator profile {username} from cache: {e}")
+        return False, None
+    if cached is None:
+        return False, None
+    if cached == CREATOR_PROFILE_NOT_FOUND:
+        return True, None
+    return True, CreatorProfileOut.model_validate_json(cached)
+
+async def redis_clock() -> Optional[str]:
+    """The Redis clock in microseconds, the unit of the eviction markers."""
+    try:
+        seconds, microseconds = await get_async_redis().time()
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not read the Redis clock: {e}")
+        return None
+    return f"{seconds}{microseconds:06d}"
+
+async def write_cached_creator_profile(username: str, creator_profile_out: Optional[CreatorProfileOut], build_started: str):
+    """Cache a build, or that the username has no profile, unless it was evicted since build_started."""
+    profile_key = CREATOR_PROFILE_KEY.format(username=username)
+    if creator_profile_out is None:
+        keys = [profile_key, CREATOR_PROFILE_USERNAME_EVICTED_KEY.format(username=username)]
+        args = [build_started, CREATOR_PROFILE_NOT_FOUND, settings.creator_profile_not_found_cache_ttl_seconds]
+    else:
+        keys = [
+            profile_key,
+            CREATOR_PROFILE_EVICTED_KEY.format(creator_profile_id=creator_profile_out.id),
+            CREATOR_PROFILE_USERNAME_KEY.format(creator_profile_id=creator_profile_out.id),
+        ]
+        args = [build_started, creator_profile_out.model_dump_json(), settings.creator_profile_cache_ttl_seconds, username]
+    try:
+        await write_creator_profile(keys=keys, args=args)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not write creator profile {username} to cache: {e}")
+
+async def get_or_build_creator_profile(
+    username: str,
+    build: Callable[[], Awaitable[Optional[CreatorProfileOut]]]
+) -> Optional[CreatorProfileOut]:
+    found, cached = await read_cached_creator_profile(username)
+    if found:
+        return cached
+
+    task = inflight_builds.get(username)
+    if task is None:
+        task = asyncio.ensure_future(rebuild_creator_profile(username, build))
+        inflight_builds[username] = task
+        task.add_done_callback(lambda _: inflight_builds.pop(username, None))
+    return await asyncio.shield(task)
+
+async def lock_is_held(lock_key: str) -> bool:
+    try:
+        return bool(await get_async_redis().exists(lock_key))
+    except redis.RedisError:
+        return False
+
+async def rebuild_creator_profile(
+    username: str,
+    build: Callable[[], Awaitable[Optional[CreatorProfileOut]]]
+) -> Optional[CreatorProfileOut]:
+    lock_key = CREATOR_PROFILE_LOCK_KEY.format(username=username)
+    lock_token = uuid4().hex
+    try:
+        has_lock = await get_async_redis().set(lock_key, lock_token, nx=True, ex=CREATOR_PROFILE_LOCK_SECONDS)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not lock creator profile {username} for rebuild: {e}")
+        return await build()
+
+    if not has_lock:
+        # Another worker is rebuilding, wait for it to fill the cache before going to the database ourselves.
+        for _ in range(int(CREATOR_PROFILE_LOCK_SECONDS / CREATOR_PROFILE_LOCK_POLL_SECONDS)):
+            await asyncio.sleep(CREATOR_PROFILE_LOCK_POLL_SECONDS)
+            found, cached = await read_cached_creator_profile(username)
+            if found:
+                return cached
+            if not await lock_is_held(lock_key):
+                break
+        return await build()
+
+    try:
+        # Taken before the build reads the database, to compare with evictions that happen meanwhile.
+        build_started = await redis_clock()
+        creator_profile_out = await build()
+        if build_started is not None:
+            await write_cached_creator_profile(username, creator_profile_out, build_started)
+        return creator_profile_out
+    finally:
+        try:
+            await release_lock(keys=[lock_key], args=[lock_token])
+        except redis.RedisError as e:
+            Logger.log(LogLevel.ERROR, f"Could not release creator profile lock for {username}: {e}")
+
+async def get_or_load_checkout_profile(
+    username: str,
+    load: Callable[[], Awaitable[Optional[CheckoutProfile]]]
+) -> Optional[CheckoutProfile]:
+    with checkout_profiles_lock:
+        checkout_profile = checkout_profiles.get(username)
+    if checkout_profile is not None:
+        CHECKOUT_CACHE_REQUESTS.labels("checkout_profile", "hit").inc()
+        return checkout_profile
+    CHECKOUT_CACHE_REQUESTS.labels("checkout_profile", "miss").inc()
+    checkout_profile = await load()
+    if checkout_profile is not None:
+        with checkout_profiles_lock:
+            checkout_profiles[username] = checkout_profile
+    return checkout_profile
+
+def evict_checkout_profiles(creator_profile_ids: set[int]):
+    with checkout_profiles_lock:
+        stale_usernames = [
+            username for username, checkout_profile in checkout_profiles.items()
+            if checkout_profile.creator_profile_id in creator_profile_ids
+        ]
+        for username in stale_usernames:
+            checkout_profiles.pop(username, None)
+
+def creator_profile_eviction(creator_profile_ids: set[int], usernames: set[str]) -> tuple[list[str], list]:
+    """Keys and args of EVICT_CREATOR_PROFILES_SCRIPT."""
+    keys = []
+    for creator_profile_id in creator_profile_ids:
+        keys += [
+            CREATOR_PROFILE_USERNAME_KEY.format(creator_profile_id=creator_profile_id),
+            CREATOR_PROFILE_EVICTED_KEY.format(creator_profile_id=creator_profile_id),
+        ]
+    for username in usernames:
+        keys += [CREATOR_PROFILE_KEY.format(username=username), CREATOR_PROFILE_USERNAME_EVICTED_KEY.format(username=username)]
+    # Outlives any build that could have started before the eviction.
+    args = [settings.creator_profile_cache_ttl_seconds, CREATOR_PROFILE_KEY.format(username=""), len(creator_profile_ids)]
+    return keys, args
+
+def evict_creator_profiles(creator_profile_ids: set[int], usernames: set[str]):
+    keys, args = creator_profile_eviction(creator_profile_ids, usernames)
+    try:
+        evict_creator_profiles_script(keys=keys, args=args)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not evict creator profiles {creator_profile_ids or usernames} from cache: {e}")
+
+async def evict_creator_profiles_async(creator_profile_ids: set[int], usernames: set[str]):
+    keys, args = creator_profile_eviction(creator_profile_ids, usernames)
+    try:
+        await evict_creator_profiles_async_script(keys=keys, args=args)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not evict creator profiles {creator_profile_ids or usernames} from cache: {e}")
+
+async def get_or_load_principal(user_id: int, load: Callable[[], Awaitable[Optional[Principal]]]) -> Optional[Principal]:
+    with principals_lock:
+        principal = principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    principal_key = PRINCIPAL_KEY.format(user_id=user_id)
+    try:
+        cached = await get_async_redis().get(principal_key)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not read principal {user_id} from cache: {e}")
+        cached = None
+    if cached is not None:
+        principal = Principal.model_validate_json(cached)
+    else:
+        principal = await load()
+        if principal is None:
+            return None
+        try:
+            await get_async_redis().set(principal_key, principal.model_dump_json(), ex=settings.principal_cache_ttl_seconds)
+        except redis.RedisError as e:
+            Logger.log(LogLevel.ERROR, f"Could not write principal {user_id} to cache: {e}")
+
+    with principals_lock:
+        principals[user_id] = principal
+    return principal
+
+def evict_principals(user_ids: set[int]):
+    try:
+        get_redis().delete(*[PRINCIPAL_KEY.format(user_id=user_id) for user_id in user_ids])
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not evict principals {user_ids} from cache: {e}")
+
+async def evict_principals_async(user_ids: set[int]):
+    try:
+        await get_async_redis().delete(*[PRINCIPAL_KEY.format(user_id=user_id) for user_id in user_ids])
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Could not evict principals {user_ids} from cache: {e}")
+
+def evict_local_principals(user_ids: set[int]):
+    with principals_lock:
+        for user_id in user_ids:
+            principals.pop(user_id, None)
+
+def invalidate_principal_cache(db: Union[Session, AsyncSession], user_id: int):
+    """Evict the cached auth principal once the current transaction commits."""
+    db.info.setdefault(INVALIDATED_PRINCIPALS, set()).add(user_id)
+
+def invalidate_creator_profile_cache(db: Union[Session, AsyncSession], creator_profile_id: int):
+    """Evict the cached public profile once the current transaction commits."""
+    db.info.setdefault(INVALIDATED_CREATOR_PROFILES, set()).add(creator_profile_id)
+
+def invalidate_creator_profile_username_cache(db: Union[Session, AsyncSession], username: str):
+    """Forget that a username has no profile once the current transaction, which creates it, commits."""
+    db.info.setdefault(INVALIDATED_CREATOR_PROFILE_USERNAMES, set()).add(username)
+
+async def evict_from_redis(creator_profile_ids: set[int], usernames: set[str], user_ids: set[int]):
+    if creator_profile_ids or usernames:
+        await evict_creator_profiles_async(creator_profile_ids, usernames)
+    if user_ids:
+        await evict_principals_async(user_ids)
+
+def track_eviction(task: asyncio.Task):
+    # The loop only keeps a weak reference to tasks, so hold each one until it finishes.
+    eviction_tasks.add(task)
+    task.add_done_callback(eviction_tasks.discard)
+
+@event.listens_for(Session, "after_commit")
+def evict_invalidated_creator_profiles(session: Session):
+    creator_profile_ids = session.info.pop(INVALIDATED_CREATOR_PROFILES, set())
+    usernames = session.info.pop(INVALIDATED_CREATOR_PROFILE_USERNAMES, set())
+    user_ids = session.info.pop(INVALIDATED_PRINCIPALS, set())
+    if creator_profile_ids:
+        evict_checkout_profiles(creator_profile_ids)
+    if user_ids:
+        evict_local_principals(user_ids)
+    if not creator_profile_ids and not usernames and not user_ids:
+        return
+
+    # After-commit hooks are sync. An AsyncSession commit fires them on the event loop, where a sync
+    # Redis call would stall every request, so there the eviction runs as a task on the async client.
+    # Threadpool sessions and workers have no running loop and use the sync client.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        track_eviction(loop.create_task(evict_from_redis(creator_profile_ids, usernames, user_ids)))
+        return
+    if creator_profile_ids or usernames:
+        evict_creator_profiles(creator_profile_ids, usernames)
+    if user_ids:
+        evict_principals(user_ids)
+
+@event.listens_for(Session, "after_rollback")
+def discard_invalidated_creator_profiles(session: Session):
+    session.info.pop(INVALIDATED_CREATOR_PROFILES, None)
+    session.info.pop(INVALIDATED_CREATOR_PROFILE_USERNAMES, None)
+    session.info.pop(INVALIDATED_PRINCIPALS, None)
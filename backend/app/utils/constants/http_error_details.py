@@ -9,3 +9,5 @@ EMAIL_USED_ERROR="Email already in use."
 USERNAME_USED_ERROR="Username already in use."
 TIP_NOT_FOUND_ERROR = "Tip not found."
 BANK_ALREADY_CONNECTED_ERROR = "Bank already connected."
+SERVER_BUSY_ERROR = "Server is busy, please try again shortly."
+TOO_MANY_REQUESTS_ERROR = "Too many requests, please try again later."
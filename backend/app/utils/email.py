@@ -1,48 +1,124 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from typing import Optional
 import enum
 
+import httpx
+
 from app.core import settings
 from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import time_external_call
+
+# SendGrid's limit on personalizations (recipients with their own template data) per mail send request.
+SEND_GRID_MAX_PERSONALIZATIONS = 1000
 
 class EmailTemplatesId(enum.Enum):
     PAYMENT_SUCCESS_TO_SUPPORTER_TEMPLATE_ID = "d-22be8b6cfbf44476bf1c0a004b1937d2"
     PAYMENT_SUCCESS_TO_CREATOR_TEMPLATE_ID = "d-4fa394cb59684950a01f7dbf5b34e607"
 
+class TransientEmailError(Exception):
+    """A send that may succeed if retried: network errors, 429 and 5xx responses."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        # Seconds SendGrid asked us to wait, when it said.
+        self.retry_after = retry_after
+
+class BatchRejectedError(Exception):
+    """SendGrid rejected a request for several recipients as invalid, which one bad address is enough to cause."""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def build_personalization(to_email: str, data: Optional[dict[str, str]] = None) -> dict:
+    personalization = {"to": [{"email": to_email}]}
+    if data:
+        personalization["dynamic_template_data"] = data
+    return personalization
+
+def payment_success_to_supporter_personalization(to_email: str, display_name: str, amount: str, currency: str) -> dict:
+    return build_personalization(to_email, {
+        "display_name": display_name,
+        "amount": amount,
+        "currency": currency
+    })
+
+def payment_success_to_creator_personalization(
+    to_email: str,
+    display_name: str,
+    supporter_email: Optional[str],
+    amount: str,
+    currency: str
+) -> dict:
+    return build_personalization(to_email, {
+        "display_name": display_name,
+        "supporter_email": supporter_email,
+        "amount": amount,
+        "currency": currency
+    })
+
 class EmailHandler:
+    """Sends SendGrid dynamic template emails over a keep-alive connection pool.
+
+    The sendgrid package opens a new HTTPS connection per call, so requests are posted with httpx instead.
+    """
+
     def __init__(self):
-        self.sg = SendGridAPIClient(settings.send_grid_api_key)
+        self.client = httpx.Client(
+            base_url=settings.send_grid_api_host,
+            headers={"Authorization": f"Bearer {settings.send_grid_api_key}"},
+            timeout=settings.send_grid_timeout_seconds
+        )
         self.from_email = settings.from_email
 
-    def send_payment_success_to_supporter_email(self, to_email: str, display_name: str, amount: str, currency: str):
-        data = {
-            "display_name": display_name,
-            "amount": amount,
-            "currency": currency
-        }
-        self.send_email(template_id=EmailTemplatesId.PAYMENT_SUCCESS_TO_SUPPORTER_TEMPLATE_ID.value, to_email=to_email , data=data)
-
-    def send_payment_success_to_creator_email(self, to_email: str, display_name: str, supporter_email: str, amount: str, currency: str):
-        data = {
-            "display_name": display_name,
-            "supporter_email": supporter_email,
-            "amount": amount,
-            "currency": currency
-        }
-        self.send_email(template_id=EmailTemplatesId.PAYMENT_SUCCESS_TO_CREATOR_TEMPLATE_ID.value, to_email=to_email , data=data)
+    def send_templated_emails(self, template_id: str, personalizations: list[dict]) -> bool:
+        """Send one template to many recipients in a single request.
 
-    def send_email(self, template_id: str, to_email: str, data: Optional[dict[str, str]] = None):
-        message = Mail(
-            from_email=self.from_email,
-            to_emails=to_email
-        )
-        message.template_id = template_id
-        if data:
-            message.dynamic_template_data = data
+        Raises TransientEmailError when retrying may help, and BatchRejectedError when SendGrid found a request
+        for several recipients invalid; returns False when it rejected the request otherwise.
+        """
+        if len(personalizations) > SEND_GRID_MAX_PERSONALIZATIONS:
+            raise ValueError(f"At most {SEND_GRID_MAX_PERSONALIZATIONS} personalizations per request")
+        message = {
+            "from": {"email": self.from_email},
+            "template_id": template_id,
+            "personalizations": personalizations
+        }
         try:
-            response = self.sg.send(message)
-            Logger.log(LogLevel.INFO, f"status code: {response.status_code}, body: {response.body}, headers: {response.headers}")
-        except Exception as e:
-            Logger.log(LogLevel.ERROR, str(e))
+            with time_external_call("sendgrid", "mail.send"):
+                response = self.client.post("/v3/mail/send", json=message)
+        except httpx.TransportError as e:
+            raise TransientEmailError(f"SendGrid request failed: {e}") from e
+        if response.status_code == 429:
+            raise TransientEmailError(f"SendGrid returned {response.status_code}: {response.text}",
+                                      retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        if response.status_code >= 500:
+            raise TransientEmailError(f"SendGrid returned {response.status_code}: {response.text}")
+        if response.status_code == 400 and len(personalizations) > 1:
+            Logger.log(LogLevel.WARN, f"SendGrid rejected {template_id} for {len(personalizations)} recipients, "
+                                      f"sending them one by one: {response.text}")
+            raise BatchRejectedError(response.text)
+        if response.status_code >= 400:
+            Logger.log(LogLevel.ERROR, f"SendGrid rejected {template_id} for {len(personalizations)} recipients: "
+                                       f"{response.status_code} {response.text}")
+            return False
+        Logger.log(LogLevel.INFO, f"Sent {template_id} to {len(personalizations)} recipients",
+                   status_code=response.status_code, message_id=response.headers.get("X-Message-Id"))
+        return True
+
+    def close(self):
+        self.client.close()
 
+@lru_cache
+def get_email_handler() -> EmailHandler:
+    """One pooled handler per worker process, created on first use so it is never shared across a fork."""
+    return EmailHandler()
@@ -21,7 +21,7 @@ def format_error_response(request: Request, status_code: int, detail: List[dict[
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
     body = format_error_response(request, exc.status_code, [{"field": None, "message": exc.detail}])
-    return JSONResponse(content=body, status_code=exc.status_code)
+    return JSONResponse(content=body, status_code=exc.status_code, headers=getattr(exc, "headers", None))
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
     errors = []
@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from PIL import Image, ImageOps
+from typing import Optional
+
+from app.utils.s3 import build_s3_url
+
+WEBP_QUALITY = 80
+# Refuse to decode anything bigger than 40 megapixels; a 5 MB upload can still expand to gigabytes.
+# Pillow only raises above twice its MAX_IMAGE_PIXELS (and merely warns below), so the limit is checked explicitly.
+MAX_IMAGE_PIXELS = 40_000_000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+@dataclass(frozen=True)
+class ImageVariant:
+    width: int
+    square: bool = False
+
+PROFILE_PICTURE_VARIANTS = {
+    "thumbnail": ImageVariant(width=64, square=True),
+    "avatar": ImageVariant(width=256, square=True),
+}
+
+PROFILE_BANNER_VARIANTS = {
+    "small": ImageVariant(width=640),
+    "medium": ImageVariant(width=1280),
+    "large": ImageVariant(width=1920),
+}
+
+# CreatorProfile key column -> variants generated for the image it points at.
+PROFILE_IMAGE_VARIANTS = {
+    "profile_picture_key": PROFILE_PICTURE_VARIANTS,
+    "profile_banner_key": PROFILE_BANNER_VARIANTS,
+}
+
+def build_variant_key(key: str, variant: str) -> str:
+    name, _ = os.path.splitext(key)
+    return f"{name}_{variant}.webp"
+
+def generate_image_variants(data: bytes, variants: dict[str, ImageVariant]) -> dict[str, bytes]:
+    """Decode an upload once and encode every variant as WebP, without EXIF/ICC metadata.
+
+    Variants are never upscaled; a banner narrower than a variant width is kept at its own width.
+    """
+    with Image.open(BytesIO(data)) as image:
+        # Opening only reads the header, so this runs before any pixel is decoded.
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image size ({image.width * image.height} pixels) exceeds limit of {MAX_IMAGE_PIXELS} pixels"
+            )
+        largest = max(variant.width for variant in variants.values())
+        # JPEG only: let libjpeg decode at a reduced scale that still covers the largest variant.
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        encoded = {}
+        for name, variant in variants.items():
+            if variant.square:
+                resized = ImageOps.fit(image, (variant.width, variant.width), Image.Resampling.LANCZOS)
+            else:
+                resized = image.copy()
+                resized.thumbnail((variant.width, resized.height), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+            encoded[name] = buffer.getvalue()
+        return encoded
+
+def build_image_url(key: Optional[str], variants: Optional[dict[str, str]], preferred: str) -> Optional[str]:
+    """URL of the preferred variant, falling back to the original until the variants are generated."""
+    if variants and variants.get(preferred):
+        return build_s3_url(variants[preferred])
+    return build_s3_url(key) if key else None
@@ -1,5 +1,24 @@
+import atexit
 import enum
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from uuid import uuid4
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import settings
+from app.utils.metrics import LOG_RECORDS_DROPPED
 
 class LogLevel(enum.Enum):
     DEBUG = "DEBUG"
@@ -7,8 +26,166 @@ class LogLevel(enum.Enum):
     ERROR = "ERROR"
     WARN = "WARN"
 
+STDLIB_LEVELS = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARN: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+}
+
+REQUEST_ID_HEADER = b"x-request-id"
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs on the listener thread, off the request path."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id and samples repetitive records, in the calling thread.
+
+    Each call site may log `burst` records per `window_seconds`; the rest are dropped and the next
+    record that gets through reports how many were suppressed. Warnings and errors are never sampled.
+    """
+
+    def __init__(self, burst: int, window_seconds: float):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.windows: dict[tuple[str, int], list] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        site = (record.pathname, record.lineno)
+        with self.lock:
+            window = self.windows.get(site)
+            if window is None or now - window[0] >= self.window_seconds:
+                record.suppressed = window[2] if window else 0
+                self.windows[site] = [now, 1, 0]
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                record.suppressed, window[2] = window[2], 0
+                return True
+            window[2] += 1
+            return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; a full queue drops the record instead of blocking the caller."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread, so skip QueueHandler's eager format/copy.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def build_stream_handler() -> logging.Handler:
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    return stream_handler
+
+
+def configure_logging() -> logging.Logger:
+    app_logger = logging.getLogger("tubetip")
+    level_name = settings.log_level.upper()
+    app_logger.setLevel("WARNING" if level_name == "WARN" else level_name)
+    app_logger.propagate = False
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    queue_handler.addFilter(ContextFilter(settings.log_sample_burst, settings.log_sample_window_seconds))
+    app_logger.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, build_stream_handler(), respect_handler_level=True)
+    listener.start()
+
+    def restart_in_child():
+        # Forked workers (uvicorn, Celery prefork) inherit the queue but not the listener thread.
+        nonlocal listener
+        queue_handler.queue = queue.Queue(maxsize=settings.log_queue_size)
+        listener = QueueListener(queue_handler.queue, build_stream_handler(), respect_handler_level=True)
+        listener.start()
+
+    os.register_at_fork(after_in_child=restart_in_child)
+    # Flush whatever is still queued on interpreter exit.
+    atexit.register(lambda: listener.stop())
+    return app_logger
+
+
+app_logger = configure_logging()
+
+
 class Logger:
-    
+
     @staticmethod
-    def log(log_level: LogLevel, msg: str):
-        print(f"({datetime.now(timezone.utc).isoformat()}) {log_level.value}: {msg}")
\ No newline at end of file
+    def log(log_level: LogLevel, msg: str, **fields):
+        """Queue a structured log record; extra keyword arguments become JSON fields."""
+        level = STDLIB_LEVELS[log_level]
+        if app_logger.isEnabledFor(level):
+            app_logger.log(level, msg, extra={"fields": fields}, stacklevel=2)
+
+
+class RequestIdMiddleware:
+    """Binds a request id to every log record of a request and echoes it in the X-Request-ID header.
+
+    A well-formed X-Request-ID from the caller (e.g. the load balancer) is kept so logs correlate across hops.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,126 @@
+import os
+import time
+from contextlib import contextmanager
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+
+CHECKOUT_CACHE_REQUESTS = Counter(
+    "checkout_cache_requests_total",
+    "Checkout fast-path cache lookups by cache and result (hit or miss).",
+    ["cache", "result"]
+)
+
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "bcrypt calls queued or running on the password hashing pool.",
+    multiprocess_mode="livesum"
+)
+
+PASSWORD_HASH_REJECTIONS = Counter(
+    "password_hash_rejections_total",
+    "bcrypt calls rejected with 503 because the password hashing pool was saturated."
+)
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected with 429 by route and the key whose bucket was empty (ip, email, username).",
+    ["route", "key"]
+)
+
+STRIPE_WEBHOOK_EVENTS_EXHAUSTED = Counter(
+    "stripe_webhook_events_exhausted_total",
+    "Stripe webhook events that failed stripe_webhook_max_attempts times and will not be retried, by event type.",
+    ["type"]
+)
+
+EXTERNAL_CALL_SECONDS = Histogram(
+    "external_call_duration_seconds",
+    "Time spent in calls to external services, including retries, by service and operation.",
+    ["service", "operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte, by route template.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed while handling one request, by route template.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+
+DB_SECONDS_PER_REQUEST = Histogram(
+    "http_request_db_seconds",
+    "Total time spent executing SQL statements while handling one request, by route template.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds",
+    "Round trip time of Redis commands by command name; a pipeline is observed once as PIPELINE.",
+    ["command"],
+    buckets=(0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors_total",
+    "Redis commands that raised, by command name.",
+    ["command"]
+)
+
+@contextmanager
+def time_external_call(service: str, operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        EXTERNAL_CALL_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+
+@contextmanager
+def time_redis_command(command: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REDIS_COMMAND_ERRORS.labels(command).inc()
+        raise
+    finally:
+        REDIS_COMMAND_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+CELERY_TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Time a Celery task spent running, by task name and final state.",
+    ["task", "state"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+CELERY_TASK_QUEUE_SECONDS = Histogram(
+    "celery_task_queue_seconds",
+    "Time from publishing (or the ETA of a countdown or retry) until a worker started the task, by task and queue.",
+    ["task", "queue"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the background logging queue was full."
+)
+
+def get_metrics_registry() -> CollectorRegistry:
+    # With several uvicorn workers, PROMETHEUS_MULTIPROC_DIR lets any worker report for all of them.
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(get_metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from typing import Callable, Optional, TypeVar
+
+from app.core import settings
+from app.utils.constants.http_codes import HTTP_503_SERVICE_UNAVAILABLE
+from app.utils.constants.http_error_details import SERVER_BUSY_ERROR
+from app.utils.metrics import PASSWORD_HASH_PENDING, PASSWORD_HASH_REJECTIONS
+
+T = TypeVar("T")
+
+# Hashes made with any other cost are flagged by verify_and_update, so changing BCRYPT_ROUNDS
+# migrates users on their next login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a fixed-size thread pool.
+
+    bcrypt releases the GIL while hashing, so threads scale across cores. At most `max_pending`
+    calls may be queued or running per worker process; past that callers get a 503 with
+    Retry-After instead of piling up behind a credential-stuffing burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after_seconds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after_seconds = retry_after_seconds
+        self.pending = 0
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTIONS.inc()
+            raise HTTPException(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                detail=SERVER_BUSY_ERROR,
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers or os.cpu_count() or 1,
+    max_pending=settings.password_hash_max_pending,
+    retry_after_seconds=settings.password_hash_retry_after_seconds
+)
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await password_hasher.run(verify_and_update_password, plain_password, hashed_password)
@@ -0,0 +1,155 @@
+import hashlib
+import ipaddress
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import redis
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.core import settings
+from app.core.redis import AsyncRedisScript
+from app.schemas.creator import CreatorCreate
+from app.schemas.stripe import StripeCheckoutPayload
+from app.utils.constants.http_codes import HTTP_429_TOO_MANY_REQUESTS
+from app.utils.constants.http_error_details import TOO_MANY_REQUESTS_ERROR
+from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import RATE_LIMIT_REJECTIONS
+
+RATE_LIMIT_KEY = "rate_limit:{route}:{kind}:{value}"
+RATE_LIMIT_PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+# Token buckets, one hash per key holding its token level and when that was computed. Uses the Redis
+# clock so every worker agrees on refill time.
+# KEYS: one bucket per limit. ARGV: capacity and refill rate (tokens per second) of each bucket, in order.
+# Takes a token from every bucket, or from none if any is empty. Returns {0, "0"} when allowed, otherwise
+# {index of the bucket with the longest wait (1-based), seconds until it holds a token}.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call("time")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local denied, wait = 0, 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local bucket = redis.call("hmget", key, "tokens", "updated_at")
+    local tokens = capacity
+    if bucket[1] then
+        tokens = math.min(capacity, tonumber(bucket[1]) + math.max(0, now - tonumber(bucket[2])) * rate)
+    end
+    levels[i] = tokens
+    if tokens < 1 and (1 - tokens) / rate > wait then
+        denied, wait = i, (1 - tokens) / rate
+    end
+end
+if denied > 0 then
+    return {denied, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call("hset", key, "tokens", tostring(levels[i] - 1), "updated_at", tostring(now))
+    redis.call("expire", key, math.ceil(capacity / rate))
+end
+return {0, "0"}
+"""
+
+token_bucket_script = AsyncRedisScript(TOKEN_BUCKET_SCRIPT)
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Allows bursts of `capacity` requests, refilled evenly over `period_seconds`."""
+    capacity: int
+    period_seconds: int
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+@lru_cache
+def parse_rate_limit(limit: str) -> RateLimit:
+    """Parse a limit setting such as "5/minute"."""
+    capacity, _, period = limit.partition("/")
+    if period not in RATE_LIMIT_PERIODS or not capacity.isdigit() or int(capacity) < 1:
+        raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '5/minute'")
+    return RateLimit(int(capacity), RATE_LIMIT_PERIODS[period])
+
+def rate_limit_key(route: str, kind: str, value: str) -> str:
+    # Hashed so emails stay out of Redis and long values cannot bloat key names.
+    digest = hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+    return RATE_LIMIT_KEY.format(route=route, kind=kind, value=digest)
+
+@lru_cache
+def trusted_proxy_networks(proxies: tuple[str, ...]) -> tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]:
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxy_networks(tuple(settings.trusted_proxies)))
+
+def client_ip(request: Request) -> Optional[str]:
+    """The address the request came from, looking through trusted proxies.
+
+    Behind nginx (and the load balancer in front of it) the peer is always a proxy, so walk
+    X-Forwarded-For from the right, past the proxies' own entries, to the first address a proxy
+    recorded for someone else. Entries to the left of that were written by the client and cannot be trusted.
+    """
+    peer = request.client.host if request.client else None
+    if peer is None or not is_trusted_proxy(peer):
+        return peer
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    for address in reversed(forwarded):
+        if not is_trusted_proxy(address):
+            return address
+    return forwarded[0] if forwarded else request.headers.get("x-real-ip", peer)
+
+async def enforce_rate_limits(route: str, limits: list[tuple[str, Optional[str], str]]):
+    """Take a token for each (key kind, key value, limit setting) in one round trip, or raise 429.
+
+    Keys without a value are skipped. Fails open if Redis is unavailable, like the caches.
+    """
+    if not settings.rate_limit_enabled:
+        return
+    limits = [(kind, value, parse_rate_limit(limit)) for kind, value, limit in limits if value]
+    if not limits:
+        return
+    keys = [rate_limit_key(route, kind, value) for kind, value, _ in limits]
+    args = []
+    for _, _, rate_limit in limits:
+        args += [rate_limit.capacity, rate_limit.refill_per_second]
+    try:
+        denied, wait = await token_bucket_script(keys=keys, args=args)
+    except redis.RedisError as e:
+        Logger.log(LogLevel.ERROR, f"Rate limiter unavailable, allowing {route} request: {e}")
+        return
+    if int(denied):
+        kind = limits[int(denied) - 1][0]
+        RATE_LIMIT_REJECTIONS.labels(route, kind).inc()
+        raise HTTPException(
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            detail=TOO_MANY_REQUESTS_ERROR,
+            headers={"Retry-After": str(max(1, math.ceil(float(wait))))}
+        )
+
+async def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    await enforce_rate_limits("login", [
+        ("ip", client_ip(request), settings.login_rate_limit_per_ip),
+        ("email", form_data.username, settings.login_rate_limit_per_email),
+    ])
+
+async def limit_signup(request: Request, creator_in: CreatorCreate):
+    await enforce_rate_limits("signup", [
+        ("ip", client_ip(request), settings.signup_rate_limit_per_ip),
+        ("email", creator_in.email, settings.signup_rate_limit_per_email),
+    ])
+
+async def limit_checkout(request: Request, payload: StripeCheckoutPayload):
+    await enforce_rate_limits("checkout", [
+        ("ip", client_ip(request), settings.checkout_rate_limit_per_ip),
+        ("username", payload.username, settings.checkout_rate_limit_per_username),
+    ])
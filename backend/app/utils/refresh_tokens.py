@@ -0,0 +1,113 @@
+import time
+from enum import Enum
+
+from app.core import settings
+from app.core.redis import AsyncRedisScript
+
+# refresh_token:{jti} holds the owning user id while the token is live, and "used:{user_id}:{rotated_at}"
+# once it has been rotated, until its original expiry. refresh_tokens:user:{user_id} is a sorted set of the
+# user's jtis scored by expiry, used for bulk revocation and pruned as entries expire.
+REFRESH_TOKEN_KEY = "refresh_token:{jti}"
+USER_REFRESH_TOKENS_KEY = "refresh_tokens:user:{user_id}"
+
+REGISTER_SCRIPT = """
+redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[3])
+redis.call("zremrangebyscore", KEYS[2], "-inf", ARGV[4])
+redis.call("zadd", KEYS[2], ARGV[5], ARGV[2])
+redis.call("expire", KEYS[2], ARGV[3])
+return 1
+"""
+
+# KEYS: old token, new token, user set. ARGV: user id, old jti, new jti, ttl, now, new expiry, grace seconds.
+# Returns 1 rotated, 0 unknown or expired, -1 reuse of an already rotated token, -2 reuse within the
+# grace window (concurrent refreshes from one browser).
+ROTATE_SCRIPT = """
+local owner = redis.call("get", KEYS[1])
+if not owner then
+    return 0
+end
+local used = "used:" .. ARGV[1] .. ":"
+if string.sub(owner, 1, #used) == used then
+    if tonumber(ARGV[5]) - tonumber(string.sub(owner, #used + 1)) <= tonumber(ARGV[7]) then
+        return -2
+    end
+    return -1
+end
+if owner ~= ARGV[1] then
+    return 0
+end
+redis.call("set", KEYS[1], used .. ARGV[5], "KEEPTTL")
+redis.call("zrem", KEYS[3], ARGV[2])
+redis.call("set", KEYS[2], ARGV[1], "EX", ARGV[4])
+redis.call("zremrangebyscore", KEYS[3], "-inf", ARGV[5])
+redis.call("zadd", KEYS[3], ARGV[6], ARGV[3])
+redis.call("expire", KEYS[3], ARGV[4])
+return 1
+"""
+
+REVOKE_SCRIPT = """
+local owner = redis.call("get", KEYS[1])
+if owner == ARGV[1] then
+    redis.call("del", KEYS[1])
+end
+redis.call("zrem", KEYS[2], ARGV[2])
+return 1
+"""
+
+# Token keys are derived from the set members inside the script, so this assumes a single Redis node.
+REVOKE_ALL_SCRIPT = """
+local jtis = redis.call("zrange", KEYS[1], 0, -1)
+for _, jti in ipairs(jtis) do
+    redis.call("del", ARGV[1] .. jti)
+end
+redis.call("del", KEYS[1])
+return #jtis
+"""
+
+class RotationResult(Enum):
+    ROTATED = 1
+    INVALID = 0
+    REUSED = -1
+    RACED = -2
+
+register_script = AsyncRedisScript(REGISTER_SCRIPT)
+rotate_script = AsyncRedisScript(ROTATE_SCRIPT)
+revoke_script = AsyncRedisScript(REVOKE_SCRIPT)
+revoke_all_script = AsyncRedisScript(REVOKE_ALL_SCRIPT)
+
+def refresh_token_ttl_seconds() -> int:
+    return settings.refresh_token_expire_days * 24 * 60 * 60
+
+async def register_refresh_token(user_id: int, jti: str):
+    ttl = refresh_token_ttl_seconds()
+    now = int(time.time())
+    await register_script(
+        keys=[REFRESH_TOKEN_KEY.format(jti=jti), USER_REFRESH_TOKENS_KEY.format(user_id=user_id)],
+        args=[user_id, jti, ttl, now, now + ttl]
+    )
+
+async def rotate_refresh_token(user_id: int, old_jti: str, new_jti: str) -> RotationResult:
+    """Swap old_jti for new_jti in one round trip, refusing tokens that are unknown, expired or already rotated."""
+    ttl = refresh_token_ttl_seconds()
+    now = int(time.time())
+    result = await rotate_script(
+        keys=[
+            REFRESH_TOKEN_KEY.format(jti=old_jti),
+            REFRESH_TOKEN_KEY.format(jti=new_jti),
+            USER_REFRESH_TOKENS_KEY.format(user_id=user_id)
+        ],
+        args=[user_id, old_jti, new_jti, ttl, now, now + ttl, settings.refresh_token_reuse_grace_seconds]
+    )
+    return RotationResult(int(result))
+
+async def revoke_refresh_token(user_id: int, jti: str):
+    await revoke_script(
+        keys=[REFRESH_TOKEN_KEY.format(jti=jti), USER_REFRESH_TOKENS_KEY.format(user_id=user_id)],
+        args=[user_id, jti]
+    )
+
+async def revoke_user_refresh_tokens(user_id: int) -> int:
+    return await revoke_all_script(
+        keys=[USER_REFRESH_TOKENS_KEY.format(user_id=user_id)],
+        args=[REFRESH_TOKEN_KEY.format(jti="")]
+    )
@@ -0,0 +1,85 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import settings
+from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import DB_QUERIES_PER_REQUEST, DB_SECONDS_PER_REQUEST, HTTP_REQUEST_SECONDS
+
+QUERY_STARTED_KEY = "request_metrics_query_started"
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+
+# Shared by reference with threadpool calls and tasks spawned by the request, which get a copy of the context.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(QUERY_STARTED_KEY, []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[QUERY_STARTED_KEY].pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+def handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(QUERY_STARTED_KEY):
+        connection.info[QUERY_STARTED_KEY].pop()
+
+def register_query_metrics(engine: Engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+def route_label(scope: Scope) -> str:
+    # The route template, not the raw path, so /username/{username} is one series rather than one per creator.
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+class RequestMetricsMiddleware:
+    """Records latency and SQL statement count/time for every HTTP request, labelled by route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            method = scope["method"]
+            route = route_label(scope)
+            HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(stats.db_queries)
+            DB_SECONDS_PER_REQUEST.labels(method, route).observe(stats.db_seconds)
+            if stats.db_queries > settings.request_db_queries_warning_threshold:
+                Logger.log(
+                    LogLevel.WARN,
+                    f"{method} {route} ran {stats.db_queries} SQL statements "
+                    f"({stats.db_seconds * 1000:.1f} ms), check for N+1 queries."
+                )
@@ -8,14 +8,20 @@ from app.utils.logging import Logger, LogLevel
 def build_s3_url(key: str) -> str:
     return f"https://{settings.cloud_front_url}/{key}"
 
+def build_profile_picture_key(user_id, filename) -> str:
+    return f"{user_id}/profile_picture/{unify_filename(filename)}"
+
+def build_profile_banner_key(user_id, filename) -> str:
+    return f"{user_id}/profile_banner/{unify_filename(filename)}"
+
 def upload_profile_picture_to_s3(s3_client, user_id, filename, file):
-    profile_picture_key = f"{user_id}/profile_picture/{unify_filename(filename)}"
+    profile_picture_key = build_profile_picture_key(user_id, filename)
     if not s3_client.upload_fileobj(profile_picture_key, file):
         raise ValueError("Error uploading profile picture")
     return profile_picture_key
 
 def upload_profile_banner_to_s3(s3_client, user_id, filename, file):
-    profile_banner_key = f"{user_id}/profile_banner/{unify_filename(filename)}"
+    profile_banner_key = build_profile_banner_key(user_id, filename)
     if not s3_client.upload_fileobj(profile_banner_key, file):
         raise ValueError("Error uploading profile banner")
     return profile_banner_key
@@ -1,22 +1,214 @@
-from fastapi import UploadFile, HTTPException, status
+import asyncio
+from dataclasses import dataclass, field
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.multipart import MultipartParser, parse_options_header
+from typing import Callable, Optional
 
+from app.external_services.aws_s3_client import AwsS3Client, S3StreamingUpload, S3_MIN_PART_SIZE
 from app.utils.exceptions.custom_exceptions import FieldValidationError
+from app.utils.logging import Logger, LogLevel
 
 MAX_FILE_SIZE = 5 * 1024 * 1024
+MAX_TEXT_FIELD_SIZE = 16 * 1024
 ALLOWED_TYPES = ["image/jpeg", "image/png", "image/webp"]
+SNIFF_BYTES = 12
 
-async def validate_uploaded_image(image: UploadFile, field: str):
-    if not image:
-        return
-    if image.content_type not in ALLOWED_TYPES:
-        raise FieldValidationError(
-            field=field,
-            message=f"Invalid file type: {image.content_type}. Allowed types: JPEG, PNG, WEBP."
-        )
-    contents = await image.read()
-    if len(contents) > MAX_FILE_SIZE:
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type from the file's magic bytes; the client's Content-Type header is not trusted."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+class ImageUploadStream:
+    """Validates one image field while its bytes arrive and forwards them to S3 a part at a time."""
+
+    def __init__(self, s3_client: AwsS3Client, field: str, object_name: str):
+        self.s3_client = s3_client
+        self.field = field
+        self.object_name = object_name
+        self.size = 0
+        self.buffer = bytearray()
+        self.upload: Optional[S3StreamingUpload] = None
+
+    def start_upload(self):
+        content_type = sniff_image_type(bytes(self.buffer[:SNIFF_BYTES]))
+        if content_type not in ALLOWED_TYPES:
+            raise FieldValidationError(
+                field=self.field,
+                message="Invalid file type. Allowed types: JPEG, PNG, WEBP."
+            )
+        self.upload = self.s3_client.create_streaming_upload(self.object_name, content_type)
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > MAX_FILE_SIZE:
+            raise FieldValidationError(
+                field=self.field,
+                message=f"File too large. Max size is {MAX_FILE_SIZE // (1024 * 1024)} MB."
+            )
+        self.buffer.extend(data)
+        if self.upload is None and len(self.buffer) >= SNIFF_BYTES:
+            self.start_upload()
+        if len(self.buffer) >= S3_MIN_PART_SIZE:
+            part = bytes(self.buffer)
+            self.buffer.clear()
+            await run_in_threadpool(self.upload.upload_part, part)
+
+    async def finish(self) -> Optional[str]:
+        """Complete the upload and return its key, or None for an empty part (no file chosen)."""
+        if self.size == 0:
+            return None
+        if self.upload is None:
+            self.start_upload()
+        await run_in_threadpool(self.upload.complete, bytes(self.buffer))
+        self.buffer.clear()
+        return self.object_name
+
+    async def abort(self):
+        if self.upload is not None:
+            await run_in_threadpool(self.upload.abort)
+
+class TextFieldStream:
+
+    def __init__(self, field: str):
+        self.field = field
+        self.buffer = bytearray()
+
+    async def write(self, data: bytes):
+        self.buffer.extend(data)
+        if len(self.buffer) > MAX_TEXT_FIELD_SIZE:
+            raise FieldValidationError(field=self.field, message="Field too large.")
+
+@dataclass
+class StreamedForm:
+    fields: dict[str, str] = field(default_factory=dict)
+    uploaded_keys: dict[str, str] = field(default_factory=dict)
+
+async def stream_image_form(
+    request: Request,
+    s3_client: AwsS3Client,
+    image_object_names: dict[str, Callable[[str], str]],
+    text_fields: frozenset[str] = frozenset()
+) -> StreamedForm:
+    """Parse a multipart body straight from the socket, streaming image fields to S3.
+
+    `image_object_names` maps each accepted image field to a function building its S3 key from the
+    uploaded filename. Unknown fields are skipped. On any error, finished uploads are deleted and the
+    one in flight is aborted before the error propagates.
+    """
+    form = StreamedForm()
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        return form
+
+    events: list[tuple[str, object]] = []
+    headers: dict[bytes, bytes] = {}
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("begin", dict(headers)))
+        headers.clear()
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", bytes(data[start:end])))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    current = None
+    # Each image's final part/put runs while the rest of the body is still being read.
+    finishing: list[tuple[ImageUploadStream, asyncio.Task]] = []
+
+    async def settle_finishing() -> Optional[BaseException]:
+        results = await asyncio.gather(*[task for _, task in finishing], return_exceptions=True)
+        error = None
+        for (stream, _), result in zip(finishing, results):
+            if isinstance(result, BaseException):
+                await stream.abort()
+                error = error or result
+            elif result:
+                form.uploaded_keys[stream.field] = result
+        finishing.clear()
+        return error
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, payload in events:
+                if kind == "begin":
+                    _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode()
+                    filename = disposition.get(b"filename")
+                    if name in image_object_names and filename is not None:
+                        current = ImageUploadStream(s3_client, name, image_object_names[name](filename.decode()))
+                    elif name in text_fields and filename is None:
+                        current = TextFieldStream(name)
+                    else:
+                        current = None
+                elif kind == "data" and current is not None:
+                    await current.write(payload)
+                elif kind == "end" and current is not None:
+                    if isinstance(current, ImageUploadStream):
+                        finishing.append((current, asyncio.ensure_future(current.finish())))
+                    else:
+                        form.fields[current.field] = current.buffer.decode()
+                    current = None
+            events.clear()
+        parser.finalize()
+        error = await settle_finishing()
+        if error is not None:
+            raise error
+    except BaseException:
+        if isinstance(current, ImageUploadStream):
+            await current.abort()
+        await settle_finishing()
+        uploaded_keys = list(form.uploaded_keys.values())
+        if uploaded_keys and not await run_in_threadpool(s3_client.delete_objects, uploaded_keys):
+            Logger.log(LogLevel.ERROR, f"Could not clean up {uploaded_keys} after a failed upload")
+        raise
+    return form
+
+def verify_presigned_upload(s3_client: AwsS3Client, field: str, object_name: str):
+    """Check an object the browser uploaded with a presigned POST, deleting it if it is not an allowed image.
+
+    The POST policy already bounds size and Content-Type, but only the magic bytes prove the type. Blocking.
+    """
+    head = s3_client.head_object(object_name)
+    if head is None:
+        raise FieldValidationError(field=field, message="Upload not found, please try again.")
+    content_type = sniff_image_type(s3_client.get_object_head_bytes(object_name, SNIFF_BYTES))
+    if content_type not in ALLOWED_TYPES or content_type != head.get("ContentType"):
+        s3_client.delete_object(object_name)
+        raise FieldValidationError(field=field, message="Invalid file type. Allowed types: JPEG, PNG, WEBP.")
+    if head["ContentLength"] > MAX_FILE_SIZE:
+        s3_client.delete_object(object_name)
         raise FieldValidationError(
             field=field,
             message=f"File too large. Max size is {MAX_FILE_SIZE // (1024 * 1024)} MB."
         )
-    image.file.seek(0)
\ No newline at end of file
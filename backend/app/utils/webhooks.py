@@ -0,0 +1,203 @@
+from dataclasses import dataclass, replace
+from sqlalchemy.orm import Session
+from typing import Callable, Optional
+
+from app.crud.creator_profile import get_creator_profiles_by_ids, get_creator_profile_by_stripe_account_id
+from app.crud.stripe_webhook_event import claim_pending_stripe_webhook_events, mark_stripe_webhook_event_failed, \
+    mark_stripe_webhook_event_processed
+from app.crud.tip import add_tips_bulk, get_existing_stripe_session_ids
+from app.db.base import StripeWebhookEvent
+from app.external_services.stripe import retrieve_stripe_customer_email
+from app.schemas.tip import TipCreate
+from app.utils.cache import invalidate_creator_profile_cache, invalidate_principal_cache
+from app.utils.logging import Logger, LogLevel
+from app.utils.metrics import STRIPE_WEBHOOK_EVENTS_EXHAUSTED
+
+CHECKOUT_SESSION_COMPLETED = "checkout.session.completed"
+
+@dataclass(frozen=True)
+class PaymentNotification:
+    supporter_email: Optional[str]
+    creator_email: str
+    display_name: str
+    amount: str
+    currency: str
+    # Set when the session carried no email: the supporter is looked up once the batch has committed.
+    supporter_customer_id: Optional[str] = None
+
+@dataclass
+class PendingTip:
+    event: StripeWebhookEvent
+    tip_data: TipCreate
+    notification: PaymentNotification
+
+def fail_stripe_webhook_event(event: StripeWebhookEvent, error: Exception):
+    Logger.log(LogLevel.ERROR, f"Error processing Stripe webhook event {event.id} ({event.type}): {str(error)}")
+    mark_stripe_webhook_event_failed(event, str(error))
+
+def get_supporter_email(session: dict) -> Optional[str]:
+    """The supporter's email as Stripe sent it in the session."""
+    return (session.get("customer_details") or {}).get("email")
+
+def resolve_supporter_emails(notifications: list[PaymentNotification]) -> list[PaymentNotification]:
+    """Fill in the emails sessions did not carry from their Stripe Customer.
+
+    Runs after the batch has committed, so the API calls never hold the claimed events' or the profiles'
+    row locks. The tip is recorded by then, so a failed lookup only costs the supporter's email.
+    """
+    resolved = []
+    for notification in notifications:
+        if notification.supporter_email is None and notification.supporter_customer_id:
+            try:
+                email = retrieve_stripe_customer_email(notification.supporter_customer_id)
+            except Exception as e:
+                Logger.log(LogLevel.ERROR, f"Could not retrieve Stripe customer {notification.supporter_customer_id}: {str(e)}")
+                email = None
+            notification = replace(notification, supporter_email=email, supporter_customer_id=None)
+        resolved.append(notification)
+    return resolved
+
+def build_tip_data(event: StripeWebhookEvent) -> TipCreate:
+    session = event.payload["data"]["object"]
+    return TipCreate(
+        creator_profile_id=int(session["metadata"].get("creator_profile_id")),
+        amount=int(session["amount_total"]),
+        name=session["metadata"].get("name") or None,
+        message=session["metadata"].get("message") or None,
+        stripe_session_id=session["id"]
+    )
+
+def insert_pending_tips(db: Session, pending_tips: list[PendingTip]) -> tuple[set[str], int]:
+    """Insert the batch in one statement, falling back to one savepoint per tip if the batch is rejected."""
+    try:
+        with db.begin_nested():
+            inserted = add_tips_bulk(db, [pending.tip_data for pending in pending_tips])
+        for pending in pending_tips:
+            mark_stripe_webhook_event_processed(pending.event)
+        return {tip.stripe_session_id for tip in inserted}, 0
+    except Exception as e:
+        Logger.log(LogLevel.ERROR, f"Bulk tip insert failed, retrying {len(pending_tips)} tips one by one: {str(e)}")
+
+    inserted_session_ids = set()
+    failed = 0
+    for pending in pending_tips:
+        try:
+            with db.begin_nested():
+                inserted = add_tips_bulk(db, [pending.tip_data])
+        except Exception as e:
+            failed += 1
+            fail_stripe_webhook_event(pending.event, e)
+            continue
+        mark_stripe_webhook_event_processed(pending.event)
+        inserted_session_ids.update(tip.stripe_session_id for tip in inserted)
+    return inserted_session_ids, failed
+
+def handle_checkout_sessions_completed(db: Session, events: list[StripeWebhookEvent], notifications: list[PaymentNotification]) -> int:
+    """Turn a batch of completed checkout sessions into tips with one insert and one totals update. Returns the failure count."""
+    failed = 0
+    tips_data: dict[str, tuple[StripeWebhookEvent, TipCreate]] = {}
+    for event in events:
+        try:
+            tips_data[event.id] = (event, build_tip_data(event))
+        except (KeyError, TypeError, ValueError) as e:
+            failed += 1
+            fail_stripe_webhook_event(event, e)
+
+    # Stripe may deliver the same session under several event ids, so the tip itself is the idempotency key.
+    existing_session_ids = get_existing_stripe_session_ids(
+        db, [tip_data.stripe_session_id for _, tip_data in tips_data.values()]
+    )
+    profiles = get_creator_profiles_by_ids(
+        db, list({tip_data.creator_profile_id for _, tip_data in tips_data.values()})
+    )
+
+    pending_tips = []
+    for event, tip_data in tips_data.values():
+        if tip_data.stripe_session_id in existing_session_ids:
+            mark_stripe_webhook_event_processed(event)
+            continue
+        profile = profiles.get(tip_data.creator_profile_id)
+        if not profile:
+            failed += 1
+            fail_stripe_webhook_event(event, ValueError(f"Creator profile {tip_data.creator_profile_id} not found."))
+            continue
+        session = event.payload["data"]["object"]
+        email = get_supporter_email(session)
+        pending_tips.append(PendingTip(
+            event=event,
+            tip_data=tip_data,
+            notification=PaymentNotification(
+                supporter_email=email,
+                creator_email=profile.creator.email,
+                display_name=profile.display_name,
+                amount=str(tip_data.amount/100),
+                currency=session["currency"],
+                supporter_customer_id=None if email else session.get("customer")
+            )
+        ))
+        # Later events for the same session in this batch are duplicates: one tip, one email.
+        existing_session_ids.add(tip_data.stripe_session_id)
+    if not pending_tips:
+        return failed
+
+    inserted_session_ids, insert_failed = insert_pending_tips(db, pending_tips)
+    notifications.extend(
+        pending.notification for pending in pending_tips
+        if pending.tip_data.stripe_session_id in inserted_session_ids
+    )
+    return failed + insert_failed
+
+def handle_account_updated(db: Session, event: StripeWebhookEvent, notifications: list[PaymentNotification]):
+    account = event.payload["data"]["object"]
+    if not account["charges_enabled"]:
+        return
+    profile = get_creator_profile_by_stripe_account_id(db, account["id"])
+    if profile and not profile.is_bank_connected:
+        profile.is_bank_connected = True
+        invalidate_creator_profile_cache(db, profile.id)
+        invalidate_principal_cache(db, profile.creator_id)
+
+STRIPE_WEBHOOK_HANDLERS: dict[str, Callable[[Session, StripeWebhookEvent, list[PaymentNotification]], None]] = {
+    "account.updated": handle_account_updated,
+}
+
+def process_stripe_webhook_events(db: Session, batch_size: int, max_attempts: int) -> tuple[int, int, list[PaymentNotification]]:
+    """Process one batch of inbox events in a single transaction and commit it.
+
+    Completed checkout sessions are ingested together; other events run in their own savepoint,
+    so a failing event is recorded for retry without undoing the rest of the batch. Returns
+    (claimed, failed, notifications); notifications are only returned once the commit succeeded,
+    so callers never email about a rolled back tip.
+    """
+    notifications: list[PaymentNotification] = []
+    events = claim_pending_stripe_webhook_events(db, batch_size, max_attempts)
+    checkout_events = [event for event in events if event.type == CHECKOUT_SESSION_COMPLETED]
+    failed = handle_checkout_sessions_completed(db, checkout_events, notifications) if checkout_events else 0
+
+    for event in events:
+        if event.type == CHECKOUT_SESSION_COMPLETED:
+            continue
+        handler = STRIPE_WEBHOOK_HANDLERS.get(event.type)
+        event_notifications: list[PaymentNotification] = []
+        try:
+            with db.begin_nested():
+                if handler:
+                    handler(db, event, event_notifications)
+        except Exception as e:
+            failed += 1
+            fail_stripe_webhook_event(event, e)
+            continue
+        mark_stripe_webhook_event_processed(event)
+        notifications.extend(event_notifications)
+    # The claim skips these from now on, so they need a person: fix the cause and requeue them.
+    exhausted = [
+        (event.id, event.type, event.attempts, event.last_error)
+        for event in events if event.processed_at is None and event.attempts >= max_attempts
+    ]
+    db.commit()
+
+    for event_id, event_type, attempts, last_error in exhausted:
+        STRIPE_WEBHOOK_EVENTS_EXHAUSTED.labels(event_type).inc()
+        Logger.log(LogLevel.ERROR, f"Giving up on Stripe webhook event {event_id} ({event_type}) after "
+                                   f"{attempts} attempts: {last_error}")
+    return len(events), failed, resolve_supporter_emails(notifications)
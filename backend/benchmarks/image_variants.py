@@ -0,0 +1,79 @@
+"""Profile image variant generation: processing time and bytes saved.
+
+Builds synthetic uploads (a phone-camera JPEG, a PNG with alpha, a wide
+banner) or takes `--images` from disk, runs generate_image_variants on
+each `--repeat` times, and reports the median processing time plus the
+size of every variant against the original a visitor used to download.
+
+    python -m benchmarks.image_variants --repeat 5
+    python -m benchmarks.image_variants --images photo.jpg banner.png
+
+Needs no database or S3, but app settings are imported, so DATABASE_URL
+must be set to any valid URL.
+"""
+import argparse
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", type=Path, default=[])
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def synthetic_image(width: int, height: int, mode: str) -> Image.Image:
+    # Noise over a gradient compresses roughly like a photo; a flat colour would flatter WebP.
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    image = Image.merge("RGB", (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    if mode == "RGBA":
+        image.putalpha(gradient)
+    return image
+
+
+def encode(image: Image.Image, format: str, **options) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def synthetic_uploads() -> list[tuple[str, str, bytes]]:
+    return [
+        ("picture, 3000x2250 JPEG", "profile_picture_key",
+            encode(synthetic_image(3000, 2250, "RGB"), "JPEG", quality=85)),
+        ("picture, 1024x1024 PNG+alpha", "profile_picture_key",
+            encode(synthetic_image(1024, 1024, "RGBA"), "PNG")),
+        ("banner, 3000x1000 JPEG", "profile_banner_key",
+            encode(synthetic_image(3000, 1000, "RGB"), "JPEG", quality=92)),
+    ]
+
+
+def main():
+    args = parse_args()
+    from app.utils.images import PROFILE_IMAGE_VARIANTS, generate_image_variants
+
+    uploads = synthetic_uploads()
+    for path in args.images:
+        key_column = "profile_banner_key" if "banner" in path.name else "profile_picture_key"
+        uploads.append((path.name, key_column, path.read_bytes()))
+
+    for label, key_column, data in uploads:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            variants = generate_image_variants(data, PROFILE_IMAGE_VARIANTS[key_column])
+            timings.append(time.perf_counter() - started)
+        print(f"{label}: {len(data) / 1024:8.1f} KiB original, {statistics.median(timings) * 1000:8.1f} ms for all variants")
+        for name, variant in variants.items():
+            saved = 100 * (1 - len(variant) / len(data))
+            print(f"    {name:<10} {len(variant) / 1024:8.1f} KiB  {saved:5.1f}% smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Load test for the public tipping flow.
+
+Seeds Postgres with creators and tips (benchmarks.seed), then drives a
+running API with a weighted mix of the public endpoints at a fixed
+concurrency and writes p50/p95/p99 latency and throughput per endpoint to
+a JSON results file. --compare prints the change against an earlier file.
+
+Start the stubs and the API first, each in its own shell:
+
+    uvicorn benchmarks.stubs.stripe_stub:app --port 12111
+    uvicorn benchmarks.stubs.sendgrid_stub:app --port 12112
+    moto_server -p 5055    # S3, from `pip install "moto[server]"`
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_API_KEY=sk_test_stub \\
+        STRIPE_WEBHOOK_SECRET_CHECKOUT=whsec_load_test \\
+        SEND_GRID_API_HOST=http://localhost:12112 SEND_GRID_API_KEY=SG.stub \\
+        AWS_S3_ENDPOINT_URL=http://localhost:5055 RATE_LIMIT_ENABLED=false \\
+        uvicorn app.main:app --port 8000 --workers 4
+    celery -A app.celery worker -Q webhooks,emails    # drains the webhook scenario's inbox and sends its emails
+
+then, with the same DATABASE_URL/REDIS_* environment as the API:
+
+    python -m benchmarks.load_test --tips 2000000 --concurrency 64 --duration 60 --output results/before.json
+    python -m benchmarks.load_test --skip-seed --output results/after.json --compare results/before.json
+
+Restart the API after seeding: its per-worker caches still hold the old data.
+Without --skip-seed THE DATABASE'S public SCHEMA IS DROPPED, then migrated to head
+with alembic. Use a throwaway database, never one holding real data.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+
+import httpx
+
+SCENARIOS = ("profile", "tips_feed", "tips_paging", "checkout", "webhook")
+DEFAULT_MIX = "profile=50,tips_feed=25,tips_paging=10,checkout=10,webhook=5"
+CACHE_KEY_PATTERNS = ("creator_profile:*", "principal:*")
+# Traffic is skewed towards a few big creators; this alpha sends roughly a fifth of requests to creator 1.
+CREATOR_POPULARITY_ALPHA = 1.16
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--creators", type=int, default=20_000)
+    parser.add_argument("--tips", type=int, default=2_000_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse data seeded by a previous run.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds, after the warmup.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load that are not recorded.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. profile=80,checkout=20.")
+    parser.add_argument("--webhook-secret", default=os.getenv("STRIPE_WEBHOOK_SECRET_CHECKOUT", "whsec_load_test"))
+    parser.add_argument("--seed", type=int, default=1, help="Random seed, so runs pick the same creators.")
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file.")
+    parser.add_argument("--compare", default=None, help="Print the change against this earlier results file.")
+    return parser.parse_args()
+
+
+@dataclass
+class Recorder:
+    recording: bool = False
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        if not self.recording:
+            return
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+class LoadClient:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, args):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.creators = args.creators
+        self.webhook_secret = args.webhook_secret
+
+    def pick_creator(self) -> int:
+        return min(self.creators, int(self.rng.paretovariate(CREATOR_POPULARITY_ALPHA)))
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - started, ok=False)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - started, ok=response.status_code < 400)
+        return response
+
+    async def profile(self):
+        await self.request("GET /creator/profile/username/{username}", "GET", f"/api/v1/creator/profile/username/creator{self.pick_creator()}")
+
+    async def tips_feed(self):
+        await self.request("GET /tips/{id}", "GET", f"/api/v1/tips/{self.pick_creator()}", params={"limit": 10})
+
+    async def tips_paging(self):
+        # Scroll the big creator's feed, the deepest pages anyone reads.
+        params = {"limit": 20}
+        for _ in range(5):
+            response = await self.request("GET /tips/{id}?cursor", "GET", "/api/v1/tips/1", params=params)
+            if response is None or response.status_code != 200 or not response.json().get("next_cursor"):
+                return
+            params = {"limit": 20, "cursor": response.json()["next_cursor"]}
+
+    async def checkout(self):
+        await self.request("POST /stripe/checkout", "POST", "/api/v1/stripe/checkout", json={
+            "username": f"creator{self.pick_creator()}",
+            "number_of_tube_tips": self.rng.randint(1, 5),
+            "name": "Load test",
+            "message": "Thanks for the videos!",
+        })
+
+    async def webhook(self):
+        session_id = f"cs_load_{uuid4().hex}"
+        customer_id = f"cus_{uuid4().hex[:14]}"
+        payload = json.dumps({
+            "id": f"evt_load_{uuid4().hex}",
+            "object": "event",
+            "type": "checkout.session.completed",
+            "data": {"object": {
+                "id": session_id,
+                "object": "checkout.session",
+                "amount_total": 300 * self.rng.randint(1, 5),
+                "currency": "gbp",
+                "customer": customer_id,
+                "customer_details": {"email": f"{customer_id}@example.com", "name": "Load test"},
+                "metadata": {"creator_profile_id": str(self.pick_creator()), "name": "Load test", "message": ""},
+            }},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(self.webhook_secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        await self.request("POST /stripe/webhook/checkout", "POST", "/api/v1/stripe/webhook/checkout", content=payload, headers={
+            "Content-Type": "application/json",
+            "Stripe-Signature": f"t={timestamp},v1={signature}",
+        })
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name!r} in --mix")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+async def worker(load_client: LoadClient, scenarios: list[str], weights: list[int], deadline: float):
+    while time.perf_counter() < deadline:
+        scenario = load_client.rng.choices(scenarios, weights)[0]
+        await getattr(load_client, scenario)()
+
+
+async def run_load(args, weights: dict[str, int]) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30.0) as client:
+        started = time.perf_counter()
+        deadline = started + args.warmup + args.duration
+        workers = [
+            worker(LoadClient(client, recorder, random.Random(args.seed + i), args), list(weights), list(weights.values()), deadline)
+            for i in range(args.concurrency)
+        ]
+
+        async def start_recording():
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+
+        await asyncio.gather(start_recording(), *workers)
+    return recorder, args.duration
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarise(recorder: Recorder, duration: float) -> dict[str, dict]:
+    results = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        results[endpoint] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[endpoint],
+            "throughput_rps": round(len(latencies) / duration, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict[str, dict], baseline: Optional[dict[str, dict]]):
+    print(f"{'endpoint':<42} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint, result in results.items():
+        print(f"{endpoint:<42} {result['throughput_rps']:>8} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}")
+        before = (baseline or {}).get(endpoint)
+        if before:
+            changes = [
+                f"{key.removesuffix('_ms').removesuffix('_rps')} {100 * (result[key] - before[key]) / before[key]:+.1f}%"
+                for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms") if before[key]
+            ]
+            print(f"{'':<42} vs baseline: {', '.join(changes)}")
+
+
+def clear_app_caches():
+    from app.core.redis import get_redis
+
+    redis_client = get_redis()
+    for pattern in CACHE_KEY_PATTERNS:
+        keys = list(redis_client.scan_iter(match=pattern, count=1000))
+        for start in range(0, len(keys), 1000):
+            redis_client.delete(*keys[start:start + 1000])
+
+
+def seed(args):
+    from app.db.session import engine
+    from app.utils.password_hashing import hash_password
+    from benchmarks.seed import reset_schema, seed_database
+
+    print(f"Seeding {args.creators} creators and {args.tips} tips...")
+    with engine.connect() as connection:
+        reset_schema(connection)
+        connection.commit()
+        seed_database(connection, creators=args.creators, tips=args.tips, password_hash=hash_password("Load-test-1"))
+    clear_app_caches()
+
+
+def main():
+    args = parse_args()
+    weights = parse_mix(args.mix)
+    if not args.skip_seed:
+        if not args.database_url:
+            sys.exit("--database-url (or DATABASE_URL) is required to seed")
+        os.environ["DATABASE_URL"] = args.database_url
+        seed(args)
+
+    print(f"{args.concurrency} concurrent clients, {args.warmup:g}s warmup + {args.duration:g}s against {args.base_url}, mix {weights}")
+    recorder, duration = asyncio.run(run_load(args, weights))
+    results = summarise(recorder, duration)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                "label": args.label,
+                "commit": git_commit(),
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "config": {key: value for key, value in vars(args).items() if key not in ("database_url", "webhook_secret")},
+                "results": results,
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
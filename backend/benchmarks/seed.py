@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "app" / "db" / "migrations"
+
+# A fifth of all tips go to creator 1 so there is always one "big creator" feed to page through.
+SEED_STATEMENTS = [
+    """
+    INSERT INTO creators (id, username, email, password_hash)
+    SELECT g, 'creator' || g, 'creator' || g || '@example.com', :password_hash
+    FROM generate_series(1, :creators) AS g
+    """,
+    """
+    INSERT INTO creator_profiles (
+        id, creator_id, display_name, bio, stripe_account_id, is_bank_connected,
+        youtube_channel_name, country, created_at, tip_count, tip_total_amount
+    )
+    SELECT g, g, 'Creator ' || g, 'Seeded creator profile', 'acct_seed_' || g, true,
+        'creator' || g, 'UnitedKingdom', now(), 0, 0
+    FROM generate_series(1, :creators) AS g
+    """,
+    """
+    INSERT INTO tips (creator_profile_id, amount, name, message, stripe_session_id, created_at)
+    SELECT CASE WHEN g % 5 = 0 THEN 1 ELSE 1 + (g % :creators) END,
+        300 * (1 + g % 10), 'Supporter ' || g, 'Thanks for the videos!', 'cs_seed_' || g,
+        now() - make_interval(secs => g)
+    FROM generate_series(1, :tips) AS g
+    """,
+    """
+    UPDATE creator_profiles
+    SET tip_count = totals.tip_count, tip_total_amount = totals.tip_total_amount
+    FROM (
+        SELECT creator_profile_id, COUNT(*) AS tip_count, SUM(amount) AS tip_total_amount
+        FROM tips
+        GROUP BY creator_profile_id
+    ) AS totals
+    WHERE creator_profiles.id = totals.creator_profile_id
+    """,
+    "SELECT setval(pg_get_serial_sequence('creators', 'id'), (SELECT MAX(id) FROM creators))",
+    "SELECT setval(pg_get_serial_sequence('creator_profiles', 'id'), (SELECT MAX(id) FROM creator_profiles))",
+    "SELECT setval(pg_get_serial_sequence('tips', 'id'), (SELECT MAX(id) FROM tips))",
+    "ANALYZE",
+]
+
+def reset_schema(connection: Connection):
+    """Drop everything in the public schema, alembic_version included, and migrate it to head.
+
+    Migrated rather than built with metadata.create_all, so the indexes only the migrations create exist too.
+    Alembic connects to DATABASE_URL itself, which must be the database `connection` is on.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    connection.execute(text("DROP SCHEMA public CASCADE"))
+    connection.execute(text("CREATE SCHEMA public"))
+    connection.commit()
+    # No alembic.ini: its logging config would silence the app's loggers for the rest of the run.
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    command.upgrade(config, "head")
+
+def truncate_tables(connection: Connection):
+    """Empty every table the models define and restart their id sequences."""
+    from app.db.base import Base
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    connection.commit()
+
+def seed_database(connection: Connection, creators: int, tips: int, password_hash: str = None):
+    """Fill an empty schema with `creators` creators/profiles and `tips` tips, then ANALYZE."""
+    for statement in SEED_STATEMENTS:
+        connection.execute(text(statement), {"creators": creators, "tips": tips, "password_hash": password_hash})
+    connection.commit()
@@ -0,0 +1,46 @@
+"""Minimal local stand-in for the SendGrid v3 mail send endpoint.
+
+    SENDGRID_STUB_LATENCY_MS=150 uvicorn benchmarks.stubs.sendgrid_stub:app --port 12112
+
+SENDGRID_STUB_FAILURE_RATE=0.2 answers that share of requests with a 503
+(and SENDGRID_STUB_THROTTLE_RATE with a 429), to exercise retries.
+
+Point the backend at it with SEND_GRID_API_HOST=http://localhost:12112 and
+any SEND_GRID_API_KEY. Messages are counted, not delivered; GET /stats
+returns the counts.
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, Request, Response
+
+LATENCY_SECONDS = int(os.getenv("SENDGRID_STUB_LATENCY_MS", "0")) / 1000
+FAILURE_RATE = float(os.getenv("SENDGRID_STUB_FAILURE_RATE", "0"))
+THROTTLE_RATE = float(os.getenv("SENDGRID_STUB_THROTTLE_RATE", "0"))
+
+app = FastAPI(title="SendGrid stub")
+
+stats = {"requests": 0, "personalizations": 0, "failed": 0, "throttled": 0}
+
+
+@app.post("/v3/mail/send")
+async def send_mail(request: Request):
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    message = await request.json()
+    stats["requests"] += 1
+    roll = random.random()
+    if roll < FAILURE_RATE:
+        stats["failed"] += 1
+        return Response(status_code=503)
+    if roll < FAILURE_RATE + THROTTLE_RATE:
+        stats["throttled"] += 1
+        return Response(status_code=429, headers={"Retry-After": "1"})
+    stats["personalizations"] += len(message.get("personalizations", []))
+    return Response(status_code=202)
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,76 @@
+"""Minimal local stand-in for the Stripe API endpoints the backend calls.
+
+    STRIPE_STUB_LATENCY_MS=300 uvicorn benchmarks.stubs.stripe_stub:app --port 12111
+
+Point the backend at it with STRIPE_API_BASE=http://localhost:12111 and any
+sk_test_ key. Every response is delayed by STRIPE_STUB_LATENCY_MS to mimic
+the real round-trip.
+"""
+import asyncio
+import os
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+
+LATENCY_SECONDS = int(os.getenv("STRIPE_STUB_LATENCY_MS", "0")) / 1000
+
+app = FastAPI(title="Stripe stub")
+
+
+async def simulate_latency():
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+
+@app.post("/v1/accounts")
+async def create_account(request: Request):
+    await simulate_latency()
+    form = await request.form()
+    return {"id": f"acct_stub_{uuid4().hex[:16]}", "object": "account", "email": form.get("email"), "country": form.get("country")}
+
+
+@app.post("/v1/account_links")
+async def create_account_link(request: Request):
+    await simulate_latency()
+    form = await request.form()
+    return {"object": "account_link", "url": f"https://connect.stripe.test/setup/{form.get('account')}"}
+
+
+@app.post("/v1/checkout/sessions")
+async def create_checkout_session(request: Request):
+    await simulate_latency()
+    session_id = f"cs_stub_{uuid4().hex}"
+    return {"id": session_id, "object": "checkout.session", "url": f"https://checkout.stripe.test/c/pay/{session_id}"}
+
+
+@app.get("/v1/customers/{customer_id}")
+async def retrieve_customer(customer_id: str):
+    await simulate_latency()
+    return {"id": customer_id, "object": "customer", "email": f"{customer_id}@example.com"}
+
+
+prices_by_lookup_key: dict[str, dict] = {}
+
+
+@app.get("/v1/prices")
+async def list_prices(request: Request):
+    await simulate_latency()
+    lookup_keys = request.query_params.getlist("lookup_keys[0]") or request.query_params.getlist("lookup_keys[]")
+    data = [prices_by_lookup_key[key] for key in lookup_keys if key in prices_by_lookup_key]
+    return {"object": "list", "data": data, "has_more": False, "url": "/v1/prices"}
+
+
+@app.post("/v1/prices")
+async def create_price(request: Request):
+    await simulate_latency()
+    form = await request.form()
+    price = {
+        "id": f"price_stub_{uuid4().hex[:16]}",
+        "object": "price",
+        "currency": form.get("currency"),
+        "unit_amount": int(form.get("unit_amount")),
+        "lookup_key": form.get("lookup_key"),
+    }
+    if price["lookup_key"]:
+        prices_by_lookup_key[price["lookup_key"]] = price
+    return price
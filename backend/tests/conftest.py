@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import os
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+import redis
+import redis.asyncio
+from fastapi.testclient import TestClient
+
+# Settings are chosen at import time; the test settings need no real database or Redis.
+os.environ["APP_ENV"] = "TEST"
+# Tests that need Postgres run against TEST_DATABASE_URL and are skipped without it. Its public schema
+# is dropped and migrated to head, so point it at a throwaway database.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+import app.core.redis as app_redis
+import app.utils.cache as cache
+from app.db.session import SessionLocal, async_engine, engine
+from benchmarks.seed import reset_schema, truncate_tables
+
+
+@pytest.fixture
+def fake_redis(monkeypatch) -> redis.Redis:
+    """Points the shared Redis clients at an in-memory server that runs Lua like Redis does.
+
+    Returns the shared sync client, for the test to inspect what was stored.
+    """
+    server = fakeredis.FakeServer()
+
+    def pool_kwargs() -> dict:
+        kwargs = app_redis.connection_kwargs()
+        kwargs.pop("host")
+        kwargs.pop("port")
+        kwargs.update(server=server, health_check_interval=0)
+        return kwargs
+
+    @functools.lru_cache
+    def get_redis() -> redis.Redis:
+        return app_redis.InstrumentedRedis(connection_pool=redis.BlockingConnectionPool(
+            connection_class=fakeredis.FakeRedisConnection, **pool_kwargs()
+        ))
+
+    @functools.lru_cache
+    def get_async_redis() -> redis.asyncio.Redis:
+        return app_redis.InstrumentedAsyncRedis(connection_pool=redis.asyncio.BlockingConnectionPool(
+            connection_class=fakeredis.aioredis.FakeAsyncRedisConnection, **pool_kwargs()
+        ))
+
+    for module in (app_redis, cache):
+        monkeypatch.setattr(module, "get_redis", get_redis)
+        monkeypatch.setattr(module, "get_async_redis", get_async_redis)
+    # The local caches in front of Redis would otherwise carry entries over from other tests.
+    cache.checkout_profiles.clear()
+    cache.principals.clear()
+    return get_redis()
+
+
+@pytest.fixture
+def client(fake_redis):
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    with engine.connect() as connection:
+        reset_schema(connection)
+
+
+@pytest.fixture
+def db(migrated_database, fake_redis):
+    """A sync session on an emptied, migrated database. Commits evict from the fake Redis."""
+    with engine.connect() as connection:
+        truncate_tables(connection)
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def run_async():
+    """asyncio.run, then close the async pool's connections, which only work on the loop that opened them."""
+    async def run_and_dispose(coroutine):
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return lambda coroutine: asyncio.run(run_and_dispose(coroutine))
+
+
+@pytest.fixture
+def creator_profile(db):
+    from app.db.base import Creator, CreatorProfile
+
+    creator = Creator(username="creator", email="creator@example.com", password_hash="unused")
+    creator.profile = CreatorProfile(display_name="Creator", bio="A creator", youtube_channel_name="creator")
+    db.add(creator)
+    db.commit()
+    return creator.profile
@@ -0,0 +1,124 @@
+import asyncio
+
+from app.schemas.creator import Principal
+from app.schemas.creator_profile import CreatorProfileOut
+from app.utils import cache
+from app.utils.cache import CREATOR_PROFILE_KEY, CREATOR_PROFILE_LOCK_KEY, CREATOR_PROFILE_USERNAME_KEY, INVALIDATED_CREATOR_PROFILES, \
+    INVALIDATED_PRINCIPALS, PRINCIPAL_KEY, evict_creator_profiles_async, get_or_build_creator_profile, \
+    invalidate_creator_profile_cache, invalidate_principal_cache
+
+USERNAME = "creator"
+PROFILE = CreatorProfileOut(id=42, display_name="Creator", bio="A creator", tips=[])
+
+
+class CountingBuild:
+    """A profile build that takes a while, counting how often the database would have been read."""
+
+    def __init__(self, during_build=None):
+        self.calls = 0
+        self.during_build = during_build
+
+    async def __call__(self) -> CreatorProfileOut:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.during_build:
+            await self.during_build()
+        return PROFILE
+
+
+def test_concurrent_misses_share_one_build(fake_redis):
+    build = CountingBuild()
+
+    async def scenario():
+        return await asyncio.gather(*[get_or_build_creator_profile(USERNAME, build) for _ in range(10)])
+
+    assert asyncio.run(scenario()) == [PROFILE] * 10
+    assert build.calls == 1
+    assert CreatorProfileOut.model_validate_json(fake_redis.get(CREATOR_PROFILE_KEY.format(username=USERNAME))) == PROFILE
+    assert not cache.inflight_builds
+
+
+def test_concurrent_misses_share_one_build_while_redis_is_down(fake_redis):
+    # Without the Redis lock, the worker's own in-flight builds are what keeps this to one database read.
+    fake_redis.connection_pool.connection_kwargs["server"].connected = False
+    build = CountingBuild()
+
+    async def scenario():
+        return await asyncio.gather(*[get_or_build_creator_profile(USERNAME, build) for _ in range(10)])
+
+    assert asyncio.run(scenario()) == [PROFILE] * 10
+    assert build.calls == 1
+
+
+def test_miss_waits_for_another_workers_build(fake_redis):
+    fake_redis.set(CREATOR_PROFILE_LOCK_KEY.format(username=USERNAME), "other-worker")
+    build = CountingBuild()
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.1)
+        fake_redis.set(CREATOR_PROFILE_KEY.format(username=USERNAME), PROFILE.model_dump_json())
+
+    async def scenario():
+        profile, _ = await asyncio.gather(get_or_build_creator_profile(USERNAME, build), other_worker_finishes())
+        return profile
+
+    assert asyncio.run(scenario()) == PROFILE
+    assert build.calls == 0
+
+
+def test_eviction_during_a_build_skips_the_cache_write(fake_redis):
+    # The profile changes and its commit evicts while the build is still reading the old row.
+    build = CountingBuild(during_build=lambda: evict_creator_profiles_async({PROFILE.id}, set()))
+
+    assert asyncio.run(get_or_build_creator_profile(USERNAME, build)) == PROFILE
+    assert fake_redis.get(CREATOR_PROFILE_KEY.format(username=USERNAME)) is None
+
+    # Nothing stale was cached, so the next read rebuilds, and with no eviction in between it is cached.
+    build.during_build = None
+    assert asyncio.run(get_or_build_creator_profile(USERNAME, build)) == PROFILE
+    assert build.calls == 2
+    assert fake_redis.get(CREATOR_PROFILE_KEY.format(username=USERNAME)) is not None
+
+
+def cache_creator(fake_redis, creator_profile):
+    fake_redis.set(CREATOR_PROFILE_KEY.format(username=USERNAME), PROFILE.model_dump_json())
+    fake_redis.set(CREATOR_PROFILE_USERNAME_KEY.format(creator_profile_id=creator_profile.id), USERNAME)
+    principal = Principal(
+        id=creator_profile.creator_id, username=USERNAME, email="creator@example.com", has_profile=True, is_bank_connected=False
+    )
+    fake_redis.set(PRINCIPAL_KEY.format(user_id=principal.id), principal.model_dump_json())
+    cache.principals[principal.id] = principal
+
+
+def cached_keys(fake_redis, creator_profile) -> int:
+    return fake_redis.exists(
+        CREATOR_PROFILE_KEY.format(username=USERNAME), PRINCIPAL_KEY.format(user_id=creator_profile.creator_id)
+    )
+
+
+def test_commit_evicts_invalidated_entries(db, creator_profile, fake_redis):
+    cache_creator(fake_redis, creator_profile)
+
+    creator_profile.bio = "Changed"
+    invalidate_creator_profile_cache(db, creator_profile.id)
+    invalidate_principal_cache(db, creator_profile.creator_id)
+    db.commit()
+
+    assert cached_keys(fake_redis, creator_profile) == 0
+    assert creator_profile.creator_id not in cache.principals
+
+
+def test_rollback_discards_pending_invalidations(db, creator_profile, fake_redis):
+    cache_creator(fake_redis, creator_profile)
+
+    creator_profile.bio = "Rolled back"
+    invalidate_creator_profile_cache(db, creator_profile.id)
+    invalidate_principal_cache(db, creator_profile.creator_id)
+    db.rollback()
+
+    assert INVALIDATED_CREATOR_PROFILES not in db.info
+    assert INVALIDATED_PRINCIPALS not in db.info
+    # Nothing changed, so nothing is evicted, now or by the session's next commit.
+    db.commit()
+    assert cached_keys(fake_redis, creator_profile) == 2
+    assert creator_profile.creator_id in cache.principals
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+from celery.exceptions import Retry
+
+from app.celery import tasks
+from app.celery.tasks import task_send_templated_emails
+from app.utils.email import BatchRejectedError, EmailHandler, TransientEmailError, build_personalization, \
+    parse_retry_after
+
+TEMPLATE_ID = "d-template"
+
+
+def email_handler(respond) -> EmailHandler:
+    """An EmailHandler whose requests are answered by `respond` instead of SendGrid."""
+    handler = EmailHandler()
+    handler.client = httpx.Client(base_url="https://sendgrid.test", transport=httpx.MockTransport(respond))
+    return handler
+
+
+def recipients(count: int) -> list[dict]:
+    return [build_personalization(f"supporter{i}@example.com", {"amount": "3.00"}) for i in range(count)]
+
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    """Answers the task's SendGrid requests with the queued responses, recording the requests."""
+    sendgrid = {"responses": [], "requests": []}
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        sendgrid["requests"].append(request)
+        return sendgrid["responses"].pop(0)
+
+    handler = email_handler(respond)
+    monkeypatch.setattr(tasks, "get_email_handler", lambda: handler)
+    return sendgrid
+
+
+@pytest.fixture
+def retries(monkeypatch) -> list[dict]:
+    calls = []
+
+    def retry(exc=None, countdown=None, **kwargs):
+        calls.append({"exc": exc, "countdown": countdown})
+        return Retry(exc=exc, when=countdown)
+
+    monkeypatch.setattr(task_send_templated_emails, "retry", retry)
+    return calls
+
+
+@pytest.fixture
+def enqueued(monkeypatch) -> list[tuple]:
+    calls = []
+    monkeypatch.setattr(task_send_templated_emails, "delay", lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0),
+    ("0", 0.0),
+    (None, None),
+    ("", None),
+    ("soon", None),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_dates():
+    now = datetime.now(timezone.utc)
+    assert 115 <= parse_retry_after(format_datetime(now + timedelta(seconds=120), usegmt=True)) <= 120
+    assert parse_retry_after(format_datetime(now - timedelta(seconds=120), usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("response, count, expected", [
+    pytest.param(httpx.Response(202), 2, True, id="accepted"),
+    pytest.param(httpx.Response(400, text="bad address"), 1, False, id="one recipient rejected"),
+    pytest.param(httpx.Response(401, text="bad key"), 2, False, id="unauthorized"),
+])
+def test_send_templated_emails_results(response, count, expected):
+    assert email_handler(lambda request: response).send_templated_emails(TEMPLATE_ID, recipients(count)) is expected
+
+
+def test_send_templated_emails_classifies_failures():
+    throttled = email_handler(lambda request: httpx.Response(429, headers={"Retry-After": "7"}))
+    unavailable = email_handler(lambda request: httpx.Response(503))
+    batch_rejected = email_handler(lambda request: httpx.Response(400, text="bad address"))
+
+    def disconnect(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with pytest.raises(TransientEmailError) as throttled_error:
+        throttled.send_templated_emails(TEMPLATE_ID, recipients(2))
+    with pytest.raises(TransientEmailError) as unavailable_error:
+        unavailable.send_templated_emails(TEMPLATE_ID, recipients(2))
+    with pytest.raises(TransientEmailError):
+        email_handler(disconnect).send_templated_emails(TEMPLATE_ID, recipients(2))
+    with pytest.raises(BatchRejectedError):
+        batch_rejected.send_templated_emails(TEMPLATE_ID, recipients(2))
+    assert throttled_error.value.retry_after == 7.0
+    assert unavailable_error.value.retry_after is None
+
+
+def test_throttled_send_retries_after_retry_after(sendgrid, retries):
+    sendgrid["responses"] = [httpx.Response(429, headers={"Retry-After": "30"})]
+
+    result = task_send_templated_emails.apply(args=[TEMPLATE_ID, recipients(2)])
+
+    assert isinstance(result.result, Retry)
+    assert [call["countdown"] for call in retries] == [30.0]
+
+
+@pytest.mark.parametrize("previous_retries, maximum", [(0, 1), (3, 8), (20, 600)])
+def test_failed_send_backs_off_exponentially(sendgrid, retries, previous_retries, maximum):
+    sendgrid["responses"] = [httpx.Response(503)] * 20
+
+    countdowns = []
+    for _ in range(20):
+        task_send_templated_emails.apply(args=[TEMPLATE_ID, recipients(2)], retries=previous_retries)
+        countdowns.append(retries.pop()["countdown"])
+
+    # Full jitter: anywhere from zero up to the capped exponential.
+    assert all(0 <= countdown <= maximum for countdown in countdowns)
+
+
+def test_rejected_batch_is_resent_one_recipient_at_a_time(sendgrid, retries, enqueued):
+    batch = recipients(3)
+    sendgrid["responses"] = [httpx.Response(400, text="bad address")]
+
+    result = task_send_templated_emails.apply(args=[TEMPLATE_ID, batch])
+
+    assert result.result is False
+    assert len(sendgrid["requests"]) == 1
+    assert enqueued == [(TEMPLATE_ID, [personalization]) for personalization in batch]
+    assert retries == []
@@ -0,0 +1,75 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import logging as app_logging
+from app.utils.logging import ContextFilter, request_id_var
+
+WINDOW_SECONDS = 10.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(seconds=1_000.0)
+    monkeypatch.setattr(app_logging, "time", SimpleNamespace(monotonic=lambda: now.seconds))
+    return now
+
+
+def record(lineno: int = 10, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("tubetip", level, "/app/utils/webhooks.py", lineno, "message", None, None)
+
+
+def passed(context_filter: ContextFilter, records: list[logging.LogRecord]) -> list[bool]:
+    return [context_filter.filter(log_record) for log_record in records]
+
+
+def test_call_site_is_limited_to_its_burst_per_window(clock):
+    context_filter = ContextFilter(burst=3, window_seconds=WINDOW_SECONDS)
+
+    assert passed(context_filter, [record() for _ in range(5)]) == [True, True, True, False, False]
+    clock.seconds += WINDOW_SECONDS - 1
+    assert passed(context_filter, [record()]) == [False]
+
+
+def test_next_window_reports_the_suppressed_count(clock):
+    context_filter = ContextFilter(burst=2, window_seconds=WINDOW_SECONDS)
+    first_window = [record() for _ in range(5)]
+    passed(context_filter, first_window)
+
+    clock.seconds += WINDOW_SECONDS
+    next_window = [record() for _ in range(3)]
+
+    assert passed(context_filter, next_window) == [True, True, False]
+    assert [log_record.suppressed for log_record in first_window[:2]] == [0, 0]
+    assert [log_record.suppressed for log_record in next_window[:2]] == [3, 0]
+
+
+def test_call_sites_are_sampled_separately(clock):
+    context_filter = ContextFilter(burst=1, window_seconds=WINDOW_SECONDS)
+
+    assert passed(context_filter, [record(lineno=10), record(lineno=10), record(lineno=20)]) == [True, False, True]
+
+
+@pytest.mark.parametrize("level", [logging.WARNING, logging.ERROR, logging.CRITICAL], ids=logging.getLevelName)
+def test_warnings_and_errors_are_never_sampled(clock, level):
+    context_filter = ContextFilter(burst=1, window_seconds=WINDOW_SECONDS)
+
+    assert all(passed(context_filter, [record(level=level) for _ in range(5)]))
+    # Nor do they use up the call site's burst.
+    assert passed(context_filter, [record(), record()]) == [True, False]
+
+
+def test_zero_burst_disables_sampling(clock):
+    assert all(passed(ContextFilter(burst=0, window_seconds=WINDOW_SECONDS), [record() for _ in range(50)]))
+
+
+def test_records_carry_the_request_id(clock):
+    token = request_id_var.set("req-1")
+    try:
+        log_record = record()
+        ContextFilter(burst=0, window_seconds=WINDOW_SECONDS).filter(log_record)
+    finally:
+        request_id_var.reset(token)
+
+    assert log_record.request_id == "req-1"
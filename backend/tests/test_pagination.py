@@ -0,0 +1,57 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.pagination import decode_tip_cursor, encode_tip_cursor
+
+
+def raw_cursor(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("created_at, id", [
+    pytest.param(datetime(2024, 5, 17, 9, 30, 12, 123456), 1, id="naive"),
+    pytest.param(datetime(2024, 5, 17, 9, 30, tzinfo=timezone.utc), 9_876_543_210, id="aware"),
+])
+def test_tip_cursor_round_trip(created_at, id):
+    cursor = encode_tip_cursor(created_at, id)
+
+    assert decode_tip_cursor(cursor) == (created_at, id)
+    # Goes into a query string as is.
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+MALFORMED_CURSORS = [
+    pytest.param("garbage", id="not base64 of a cursor"),
+    pytest.param("a", id="bad padding"),
+    pytest.param(raw_cursor(b"\xff\xfe|1"), id="not utf-8"),
+    pytest.param(raw_cursor(b"2024-05-17T09:30:00"), id="no id"),
+    pytest.param(raw_cursor(b"yesterday|1"), id="bad timestamp"),
+    pytest.param(raw_cursor(b"2024-05-17T09:30:00|one"), id="bad id"),
+    pytest.param(raw_cursor(b"2024-05-17T09:30:00|1|2"), id="extra field"),
+]
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+def test_malformed_tip_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_tip_cursor(cursor)
+
+
+# The cursor is checked before the feed is read, so these need no database.
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+def test_tips_feed_answers_a_malformed_cursor_with_400(client, cursor):
+    response = client.get("/api/v1/tips/1", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["errors"] == [{"field": None, "message": "Invalid cursor."}]
+
+
+def test_tips_feed_rejects_cursor_with_offset(client):
+    cursor = encode_tip_cursor(datetime(2024, 5, 17, 9, 30), 1)
+
+    response = client.get("/api/v1/tips/1", params={"cursor": cursor, "offset": 20})
+
+    assert response.status_code == 400
+    assert response.json()["errors"] == [{"field": None, "message": "Use either cursor or offset, not both."}]
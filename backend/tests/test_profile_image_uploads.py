@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+from moto import mock_aws
+
+from app.api.v1 import creator_profile as creator_profile_api
+from app.core import settings
+from app.external_services.aws_s3_client import get_s3_client
+from app.utils.auth import create_access_token
+from app.utils.upload import MAX_FILE_SIZE
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """The shared S3 client, on a moto bucket. moto also answers the browser's presigned POSTs."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(settings, "aws_s3_endpoint_url", None)
+    with mock_aws():
+        get_s3_client.cache_clear()
+        s3_client = get_s3_client()
+        s3_client.s3.create_bucket(
+            Bucket=settings.bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": settings.aws_region}
+        )
+        yield s3_client
+    get_s3_client.cache_clear()
+
+
+@pytest.fixture
+def enqueued(monkeypatch) -> list[dict]:
+    calls = []
+    monkeypatch.setattr(creator_profile_api, "task_process_profile_image", SimpleNamespace(delay=lambda **kwargs: calls.append(kwargs)))
+    return calls
+
+
+@pytest.fixture
+def signed_in(client, creator_profile):
+    client.cookies.set("access_token", create_access_token({"sub": str(creator_profile.creator_id)}))
+    return client
+
+
+def presign(client, field: str, filename: str, content_type: str) -> dict:
+    response = client.post("/api/v1/creator/profile/image-uploads", json={
+        "field": field, "filename": filename, "content_type": content_type
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+def upload(upload_out: dict, body: bytes):
+    response = requests.post(upload_out["url"], data=upload_out["fields"], files={"file": ("upload", body)})
+    assert response.ok
+
+
+def confirm(client, field: str, key: str):
+    return client.post("/api/v1/creator/profile/image-uploads/confirm", json={"field": field, "key": key})
+
+
+def stored_keys(s3_client) -> list[str]:
+    return [item["Key"] for item in s3_client.s3.list_objects_v2(Bucket=s3_client.bucket_name).get("Contents", [])]
+
+
+def test_confirmed_upload_replaces_the_profile_image(db, signed_in, creator_profile, s3, enqueued):
+    old_key = f"{creator_profile.creator_id}/profile_picture/old.png"
+    s3.put_object(old_key, PNG, "image/png")
+    creator_profile.profile_picture_key = old_key
+    db.commit()
+
+    upload_out = presign(signed_in, "profile_picture", "avatar.png", "image/png")
+    upload(upload_out, PNG)
+    response = confirm(signed_in, "profile_picture", upload_out["key"])
+    db.refresh(creator_profile)
+
+    assert response.status_code == 200
+    assert upload_out["key"] in response.json()["profile_picture_url"]
+    assert creator_profile.profile_picture_key == upload_out["key"]
+    assert stored_keys(s3) == [upload_out["key"]]
+    assert enqueued == [{"creator_profile_id": creator_profile.id, "key_column": "profile_picture_key", "key": upload_out["key"]}]
+
+
+@pytest.mark.parametrize("presigned_type, body", [
+    pytest.param("image/png", b"GIF89a" + b"\x00" * 64, id="wrong magic bytes"),
+    pytest.param("image/png", JPEG, id="content type mismatch"),
+])
+def test_rejected_upload_is_deleted(db, signed_in, creator_profile, s3, enqueued, presigned_type, body):
+    upload_out = presign(signed_in, "profile_picture", "avatar.png", presigned_type)
+    upload(upload_out, body)
+
+    response = confirm(signed_in, "profile_picture", upload_out["key"])
+    db.refresh(creator_profile)
+
+    assert response.status_code == 400
+    assert stored_keys(s3) == []
+    assert creator_profile.profile_picture_key is None
+    assert enqueued == []
+
+
+def test_oversized_upload_is_deleted(db, signed_in, creator_profile, s3, enqueued):
+    # S3 refuses this POST under the policy's content-length-range; confirm must not rely on that.
+    upload_out = presign(signed_in, "profile_banner", "banner.png", "image/png")
+    s3.put_object(upload_out["key"], PNG + b"\x00" * MAX_FILE_SIZE, "image/png")
+
+    response = confirm(signed_in, "profile_banner", upload_out["key"])
+    db.refresh(creator_profile)
+
+    assert response.status_code == 400
+    assert stored_keys(s3) == []
+    assert creator_profile.profile_banner_key is None
+
+
+@pytest.mark.parametrize("key", [
+    pytest.param("{other_user_id}/profile_picture/avatar.png", id="another user's upload"),
+    pytest.param("{user_id}/profile_banner/avatar.png", id="another field's upload"),
+    pytest.param("{user_id}/profile_picture/../../{other_user_id}/profile_picture/avatar.png", id="path traversal"),
+])
+def test_confirm_refuses_keys_outside_the_callers_prefix(db, signed_in, creator_profile, s3, enqueued, key):
+    key = key.format(user_id=creator_profile.creator_id, other_user_id=creator_profile.creator_id + 1)
+    s3.put_object(key, PNG, "image/png")
+
+    response = confirm(signed_in, "profile_picture", key)
+    db.refresh(creator_profile)
+
+    assert response.status_code == 400
+    # Not the caller's object, so it is left alone.
+    assert stored_keys(s3) == [key]
+    assert creator_profile.profile_picture_key is None
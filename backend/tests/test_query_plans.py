@@ -0,0 +1,162 @@
+"""Query plan regression tests for the CRUD and webhook access paths.
+
+Runs the real CRUD functions on a seeded database while capturing the SQL they emit, and EXPLAINs each
+statement. A test fails when its plan falls back to a sequential scan on one of CHECKED_TABLES.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from app.crud import creator as creator_crud
+from app.crud import creator_profile as creator_profile_crud
+from app.crud import tip as tip_crud
+from app.crud.stripe_webhook_event import claim_pending_stripe_webhook_events
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.schemas.tip import TipCreate
+from benchmarks.seed import seed_database, truncate_tables
+
+CREATORS = 20_000
+TIPS = 200_000
+WEBHOOK_EVENTS = 100_000
+PENDING_WEBHOOK_EVENTS = 50
+# The scenarios really run, so a lost index fails the test instead of stalling the suite on a slow query.
+STATEMENT_TIMEOUT = "10s"
+CHECKED_TABLES = {"creators", "creator_profiles", "tips", "stripe_webhook_events"}
+
+# Almost every event in the inbox has been processed, as in production once the drain keeps up.
+SEED_WEBHOOK_EVENTS = """
+INSERT INTO stripe_webhook_events (id, endpoint, type, payload, received_at, processed_at, attempts)
+SELECT 'evt_seed_' || g, 'checkout', 'checkout.session.completed', '{}'::jsonb,
+    now() - make_interval(secs => g),
+    CASE WHEN g > :pending THEN now() - make_interval(secs => g) END,
+    CASE WHEN g > :pending THEN 1 ELSE 0 END
+FROM generate_series(1, :events) AS g
+"""
+
+SYNC_SCENARIOS = {
+    "creator.get_user_by_id": lambda db: creator_crud.get_user_by_id(db, 4242),
+    "creator.get_user_by_email": lambda db: creator_crud.get_user_by_email(db, "creator4242@example.com"),
+    "creator.get_user_by_username": lambda db: creator_crud.get_user_by_username(db, "creator4242"),
+    "creator.get_user_with_profile": lambda db: creator_crud.get_user_with_profile(db, 4242),
+    "creator_profile.get_creator_profile_by_id": lambda db: creator_profile_crud.get_creator_profile_by_id(db, 4242),
+    "creator_profile.get_creator_profile_by_username": lambda db: creator_profile_crud.get_creator_profile_by_username(db, "creator4242"),
+    "creator_profile.get_creator_profiles_by_ids": lambda db: creator_profile_crud.get_creator_profiles_by_ids(db, [1, 4242]),
+    "creator_profile.set_creator_profile_image_variants": lambda db: creator_profile_crud.set_creator_profile_image_variants(
+        db, 4242, "profile_picture_key", "profile_pictures/4242/avatar.png", {"avatar": "profile_pictures/4242/avatar.webp"}
+    ),
+    "creator_profile.reconcile_tip_totals": creator_profile_crud.reconcile_tip_totals,
+    "stripe.webhook_connect": lambda db: creator_profile_crud.get_creator_profile_by_stripe_account_id(db, "acct_seed_4242"),
+    "stripe_webhook_event.claim_pending_stripe_webhook_events": lambda db: claim_pending_stripe_webhook_events(db, 100, 5),
+    "tip.increment_tip_totals": lambda db: db.execute(tip_crud.increment_tip_totals(4242, 1, 300)),
+    "tip.add_tips_bulk": lambda db: tip_crud.add_tips_bulk(db, [
+        TipCreate(creator_profile_id=4242, amount=300, stripe_session_id="cs_plan_1"),
+        TipCreate(creator_profile_id=1, amount=300, stripe_session_id="cs_plan_2"),
+    ]),
+    "tip.get_existing_stripe_session_ids": lambda db: tip_crud.get_existing_stripe_session_ids(db, ["cs_seed_4242", "cs_seed_4243"]),
+}
+
+BEFORE = (datetime.now() - timedelta(days=1), 10_000_000)
+ASYNC_SCENARIOS = {
+    "creator.get_user_by_id_async": lambda db: creator_crud.get_user_by_id_async(db, 4242),
+    "creator.get_user_by_email_async": lambda db: creator_crud.get_user_by_email_async(db, "creator4242@example.com"),
+    "creator_profile.get_creator_profile_by_id_async": lambda db: creator_profile_crud.get_creator_profile_by_id_async(db, 1),
+    "creator_profile.get_creator_profile_by_username_async": lambda db: creator_profile_crud.get_creator_profile_by_username_async(db, "creator1"),
+    "tip.get_tips_by_creator_async (big creator, deep offset)": lambda db: tip_crud.get_tips_by_creator_async(db, 1, limit=20, offset=5_000),
+    "tip.get_tips_by_creator_before_async (big creator)": lambda db: tip_crud.get_tips_by_creator_before_async(db, 1, limit=20, before=BEFORE),
+    "tip.get_tip_by_stripe_session_id_async": lambda db: tip_crud.get_tip_by_stripe_session_id_async(db, "cs_seed_4242"),
+}
+
+# Tables a scenario reads in full by design. reconcile_tip_totals checks every profile, but the tips it
+# sums for each one must still come from the index.
+FULL_SCANS = {
+    "creator_profile.reconcile_tip_totals": {"creator_profiles"},
+}
+
+
+def find_seq_scans(plan: dict) -> set[str]:
+    found = set()
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found |= find_seq_scans(child)
+    return found
+
+
+def plan_root(explain_output) -> dict:
+    # psycopg2 decodes EXPLAIN's JSON column, asyncpg hands it back as text.
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+    return explain_output[0]["Plan"]
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+
+@pytest.fixture(scope="module")
+def seeded_database(migrated_database):
+    with engine.connect() as connection:
+        truncate_tables(connection)
+        seed_database(connection, creators=CREATORS, tips=TIPS)
+        connection.execute(text(SEED_WEBHOOK_EVENTS), {"events": WEBHOOK_EVENTS, "pending": PENDING_WEBHOOK_EVENTS})
+        connection.execute(text("ANALYZE stripe_webhook_events"))
+        connection.commit()
+
+
+@pytest.mark.parametrize("name", SYNC_SCENARIOS)
+def test_sync_access_path_avoids_seq_scans(seeded_database, name):
+    recorder = StatementRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    try:
+        with SessionLocal() as db:
+            try:
+                db.execute(text(f"SET LOCAL statement_timeout = '{STATEMENT_TIMEOUT}'"))
+                SYNC_SCENARIOS[name](db)
+            finally:
+                db.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder)
+
+    assert recorder.statements
+    seq_scans = set()
+    with engine.connect() as connection:
+        for statement, parameters in recorder.statements:
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            seq_scans |= find_seq_scans(plan_root(plan))
+        connection.rollback()
+    assert seq_scans <= FULL_SCANS.get(name, set())
+
+
+@pytest.mark.parametrize("name", ASYNC_SCENARIOS)
+def test_async_access_path_avoids_seq_scans(seeded_database, run_async, name):
+    async def explain_scenario() -> tuple[int, set[str]]:
+        recorder = StatementRecorder()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", recorder)
+        try:
+            async with AsyncSessionLocal() as db:
+                try:
+                    await db.execute(text(f"SET LOCAL statement_timeout = '{STATEMENT_TIMEOUT}'"))
+                    await ASYNC_SCENARIOS[name](db)
+                finally:
+                    await db.rollback()
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", recorder)
+
+        seq_scans = set()
+        async with async_engine.connect() as connection:
+            for statement, parameters in recorder.statements:
+                result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                seq_scans |= find_seq_scans(plan_root(result.scalar()))
+            await connection.rollback()
+        return len(recorder.statements), seq_scans
+
+    statement_count, seq_scans = run_async(explain_scenario())
+    assert statement_count
+    assert seq_scans <= FULL_SCANS.get(name, set())
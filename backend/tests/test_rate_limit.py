@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core import settings
+from app.utils import rate_limit
+from app.utils.rate_limit import client_ip, enforce_rate_limits
+
+NGINX = "10.0.1.5"
+LOAD_BALANCER = "10.0.2.9"
+
+
+def make_request(peer: str, x_forwarded_for: str = None) -> Request:
+    headers = [(b"x-forwarded-for", x_forwarded_for.encode())] if x_forwarded_for else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": (peer, 51234)})
+
+
+@pytest.fixture(autouse=True)
+def behind_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "trusted_proxies", ["10.0.0.0/16"])
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    """Stands in for the Redis token bucket script: counts takes per key, never refilling."""
+    taken = {}
+
+    async def token_bucket_script(keys, args):
+        for i, key in enumerate(keys):
+            if taken.get(key, 0) >= args[2 * i]:
+                return [i + 1, "60"]
+        for key in keys:
+            taken[key] = taken.get(key, 0) + 1
+        return [0, "0"]
+
+    monkeypatch.setattr(rate_limit, "token_bucket_script", token_bucket_script)
+    return taken
+
+
+def test_client_ip_looks_through_trusted_proxies():
+    request = make_request(NGINX, f"203.0.113.7, {LOAD_BALANCER}")
+    assert client_ip(request) == "203.0.113.7"
+
+
+def test_client_ip_ignores_addresses_the_client_wrote():
+    request = make_request(NGINX, f"198.51.100.1, 203.0.113.7, {LOAD_BALANCER}")
+    assert client_ip(request) == "203.0.113.7"
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peers():
+    request = make_request("203.0.113.7", "198.51.100.1")
+    assert client_ip(request) == "203.0.113.7"
+
+
+def test_clients_behind_the_proxy_get_separate_buckets(buckets):
+    first = make_request(NGINX, f"203.0.113.7, {LOAD_BALANCER}")
+    second = make_request(NGINX, f"203.0.113.8, {LOAD_BALANCER}")
+
+    def login(request: Request):
+        asyncio.run(enforce_rate_limits("login", [("ip", client_ip(request), "1/minute")]))
+
+    login(first)
+    login(second)
+    assert len(buckets) == 2
+    with pytest.raises(HTTPException) as exc_info:
+        login(first)
+    assert exc_info.value.status_code == 429
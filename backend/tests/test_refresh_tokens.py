@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import settings
+from app.utils import refresh_tokens
+from app.utils.auth import create_refresh_token, decode_refresh_token
+from app.utils.refresh_tokens import REFRESH_TOKEN_KEY, USER_REFRESH_TOKENS_KEY, RotationResult, \
+    register_refresh_token, rotate_refresh_token
+
+USER_ID = 7
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(seconds=1_700_000_000)
+    monkeypatch.setattr(refresh_tokens, "time", SimpleNamespace(time=lambda: now.seconds))
+    return now
+
+
+def register(*jtis: str):
+    async def register_all():
+        for jti in jtis:
+            await register_refresh_token(USER_ID, jti)
+    asyncio.run(register_all())
+
+
+def post_with_refresh_token(client: TestClient, path: str, jti: str):
+    client.cookies.clear()
+    client.cookies.set("refresh_token", create_refresh_token({"sub": str(USER_ID), "jti": jti}))
+    return client.post(f"/api/v1/auth/{path}")
+
+
+def rotated_jti(response) -> str:
+    return decode_refresh_token(response.cookies["refresh_token"])["jti"]
+
+
+def test_rotation_outcomes(fake_redis, clock):
+    async def scenario():
+        await register_refresh_token(USER_ID, "a")
+        outcomes = [
+            await rotate_refresh_token(USER_ID, "a", "b"),
+            await rotate_refresh_token(USER_ID, "a", "c"),
+            await rotate_refresh_token(USER_ID + 1, "b", "d"),
+            await rotate_refresh_token(USER_ID, "unknown", "e"),
+        ]
+        clock.seconds += settings.refresh_token_reuse_grace_seconds + 1
+        outcomes.append(await rotate_refresh_token(USER_ID, "a", "f"))
+        return outcomes
+
+    assert asyncio.run(scenario()) == [
+        RotationResult.ROTATED, RotationResult.RACED, RotationResult.INVALID, RotationResult.INVALID, RotationResult.REUSED
+    ]
+    # Only the rotation that succeeded issued a token.
+    assert fake_redis.zrange(USER_REFRESH_TOKENS_KEY.format(user_id=USER_ID), 0, -1) == ["b"]
+    assert not fake_redis.exists(*[REFRESH_TOKEN_KEY.format(jti=jti) for jti in "cdef"])
+
+
+def test_replay_after_the_grace_window_revokes_every_session(client, fake_redis, clock):
+    register("a", "other-device")
+    first = post_with_refresh_token(client, "refresh", "a")
+    clock.seconds += settings.refresh_token_reuse_grace_seconds + 1
+
+    replay = post_with_refresh_token(client, "refresh", "a")
+
+    assert (first.status_code, replay.status_code) == (204, 401)
+    assert not fake_redis.exists(USER_REFRESH_TOKENS_KEY.format(user_id=USER_ID))
+    assert post_with_refresh_token(client, "refresh", rotated_jti(first)).status_code == 401
+    assert post_with_refresh_token(client, "refresh", "other-device").status_code == 401
+
+
+def test_replay_inside_the_grace_window_revokes_nothing(client, fake_redis, clock):
+    register("a", "other-device")
+    first = post_with_refresh_token(client, "refresh", "a")
+
+    concurrent = post_with_refresh_token(client, "refresh", "a")
+
+    assert (first.status_code, concurrent.status_code) == (204, 401)
+    assert post_with_refresh_token(client, "refresh", rotated_jti(first)).status_code == 204
+    assert post_with_refresh_token(client, "refresh", "other-device").status_code == 204
+
+
+def test_logout_all_revokes_every_refresh_token(client, fake_redis, clock):
+    register("a", "other-device")
+
+    logout = post_with_refresh_token(client, "logout-all", "a")
+
+    assert logout.status_code == 204
+    assert post_with_refresh_token(client, "refresh", "a").status_code == 401
+    assert post_with_refresh_token(client, "refresh", "other-device").status_code == 401
@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+from cachetools import LRUCache
+from fastapi.testclient import TestClient
+
+from app.core import settings
+from app.external_services import stripe as stripe_service
+from app.external_services.stripe import create_stripe_account, get_or_create_tip_price_async, \
+    get_stripe_client, get_stripe_http_client, params_digest
+from benchmarks.stubs import stripe_stub
+
+YOUTUBE_URL = "https://www.youtube.com/@creator"
+
+
+@pytest.fixture
+def stripe_requests(monkeypatch) -> list[httpx.Request]:
+    """Points the shared StripeClient at the in-process stub, recording every request it sends."""
+    monkeypatch.setattr(settings, "stripe_api_key", "sk_test_stub")
+    monkeypatch.setattr(settings, "stripe_api_base", "http://stripe.test")
+    monkeypatch.setattr(settings, "stripe_max_network_retries", 0)
+    monkeypatch.setattr(stripe_service, "tip_prices", LRUCache(maxsize=100))
+    monkeypatch.setattr(stripe_stub, "prices_by_lookup_key", {})
+    get_stripe_client.cache_clear()
+    get_stripe_http_client.cache_clear()
+
+    requests = []
+
+    async def record_async(request: httpx.Request):
+        requests.append(request)
+
+    http_client = get_stripe_http_client()
+    http_client._client.close()
+    http_client._client = TestClient(stripe_stub.app)
+    http_client._client.event_hooks = {"request": [requests.append]}
+    http_client._client_async = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=stripe_stub.app), event_hooks={"request": [record_async]}
+    )
+    yield requests
+    asyncio.run(stripe_service.close_stripe_client())
+
+
+def test_params_digest_ignores_key_order():
+    assert params_digest({"email": "a@example.com", "country": "DE"}) == params_digest({"country": "DE", "email": "a@example.com"})
+    assert params_digest({"email": "a@example.com", "country": "DE"}) != params_digest({"email": "a@example.com", "country": "FR"})
+
+
+def test_idempotency_key_follows_the_account_params(stripe_requests):
+    create_stripe_account("creator@example.com", "DE", YOUTUBE_URL, idempotency_key="connect-7")
+    create_stripe_account("creator@example.com", "DE", YOUTUBE_URL, idempotency_key="connect-7")
+    create_stripe_account("creator@example.com", "FR", YOUTUBE_URL, idempotency_key="connect-7")
+    create_stripe_account("renamed@example.com", "DE", YOUTUBE_URL, idempotency_key="connect-7")
+
+    keys = [request.headers["Idempotency-Key"] for request in stripe_requests]
+    assert all(key.startswith("connect-7-") for key in keys)
+    # A retry replays the first account; changed details must not be mistaken for one.
+    assert keys[0] == keys[1]
+    assert len({keys[0], keys[2], keys[3]}) == 3
+
+
+def test_repeat_tip_amount_is_served_from_the_price_cache(stripe_requests):
+    async def scenario():
+        first = await get_or_create_tip_price_async(1, "Creator", "eur", 400)
+        requests_for_first = len(stripe_requests)
+        repeat = await get_or_create_tip_price_async(1, "Creator", "eur", 400)
+        requests_for_repeat = len(stripe_requests) - requests_for_first
+        other_amount = await get_or_create_tip_price_async(1, "Creator", "eur", 800)
+        return first, requests_for_first, repeat, requests_for_repeat, other_amount
+
+    first, requests_for_first, repeat, requests_for_repeat, other_amount = asyncio.run(scenario())
+
+    assert [(request.method, request.url.path) for request in stripe_requests[:requests_for_first]] == [
+        ("GET", "/v1/prices"), ("POST", "/v1/prices")
+    ]
+    assert (repeat, requests_for_repeat) == (first, 0)
+    assert other_amount != first
+    assert len(stripe_requests) == requests_for_first * 2
+
+
+def test_price_cache_miss_reuses_the_existing_stripe_price(stripe_requests):
+    # Another worker, or this one after a restart, already created the Price for this amount.
+    first = asyncio.run(get_or_create_tip_price_async(1, "Creator", "eur", 400))
+    stripe_service.tip_prices.clear()
+    stripe_requests.clear()
+
+    assert asyncio.run(get_or_create_tip_price_async(1, "Creator", "eur", 400)) == first
+    assert [(request.method, request.url.path) for request in stripe_requests] == [("GET", "/v1/prices")]
@@ -0,0 +1,102 @@
+from app.crud.tip import add_tips_bulk
+from app.db.base import StripeWebhookEvent, Tip
+from app.schemas.tip import TipCreate
+from app.utils.webhooks import PaymentNotification, PendingTip, insert_pending_tips, process_stripe_webhook_events
+
+
+def tip(creator_profile_id: int, stripe_session_id: str, amount: int = 300) -> TipCreate:
+    return TipCreate(creator_profile_id=creator_profile_id, amount=amount, stripe_session_id=stripe_session_id)
+
+
+def checkout_event(event_id: str, creator_profile_id: int, stripe_session_id: str, amount: int = 300) -> StripeWebhookEvent:
+    return StripeWebhookEvent(
+        id=event_id,
+        endpoint="checkout",
+        type="checkout.session.completed",
+        payload={"data": {"object": {
+            "id": stripe_session_id,
+            "amount_total": amount,
+            "currency": "gbp",
+            "metadata": {"creator_profile_id": str(creator_profile_id), "name": "Supporter", "message": ""},
+            "customer_details": {"email": "supporter@example.com"},
+        }}},
+    )
+
+
+def test_add_tips_bulk_keeps_the_first_tip_of_each_session(db, creator_profile):
+    inserted = add_tips_bulk(db, [
+        tip(creator_profile.id, "cs_1", 300),
+        tip(creator_profile.id, "cs_1", 500),
+        tip(creator_profile.id, "cs_2", 700),
+    ])
+    db.commit()
+    db.refresh(creator_profile)
+
+    assert sorted((tip.stripe_session_id, tip.amount) for tip in inserted) == [("cs_1", 300), ("cs_2", 700)]
+    assert (creator_profile.tip_count, creator_profile.tip_total_amount) == (2, 1000)
+
+
+def test_replayed_sessions_do_not_count_twice(db, creator_profile):
+    add_tips_bulk(db, [tip(creator_profile.id, "cs_1"), tip(creator_profile.id, "cs_2")])
+    db.commit()
+
+    replayed = add_tips_bulk(db, [tip(creator_profile.id, "cs_1"), tip(creator_profile.id, "cs_2")])
+    partly_replayed = add_tips_bulk(db, [tip(creator_profile.id, "cs_2"), tip(creator_profile.id, "cs_3")])
+    db.commit()
+    db.refresh(creator_profile)
+
+    assert replayed == []
+    assert [tip.stripe_session_id for tip in partly_replayed] == ["cs_3"]
+    assert (creator_profile.tip_count, creator_profile.tip_total_amount) == (3, 900)
+    assert db.query(Tip).count() == 3
+
+
+def test_bulk_tips_are_stamped_when_inserted(db, creator_profile):
+    first = add_tips_bulk(db, [tip(creator_profile.id, "cs_1")])
+    db.commit()
+    second = add_tips_bulk(db, [tip(creator_profile.id, "cs_2")])
+    db.commit()
+
+    assert first[0].created_at < second[0].created_at
+
+
+def test_rejected_batch_falls_back_to_one_savepoint_per_tip(db, creator_profile):
+    # The missing profile fails its foreign key, which ON CONFLICT does not cover, so the batch is rejected.
+    good = checkout_event("evt_good", creator_profile.id, "cs_good", 300)
+    bad = checkout_event("evt_bad", creator_profile.id + 1, "cs_bad", 500)
+    db.add_all([good, bad])
+    db.commit()
+    notification = PaymentNotification(None, "creator@example.com", "Creator", "3.0", "gbp")
+
+    inserted_session_ids, failed = insert_pending_tips(db, [
+        PendingTip(event=good, tip_data=tip(creator_profile.id, "cs_good", 300), notification=notification),
+        PendingTip(event=bad, tip_data=tip(creator_profile.id + 1, "cs_bad", 500), notification=notification),
+    ])
+    db.commit()
+    db.refresh(creator_profile)
+
+    assert (inserted_session_ids, failed) == ({"cs_good"}, 1)
+    assert [tip.stripe_session_id for tip in db.query(Tip)] == ["cs_good"]
+    assert (creator_profile.tip_count, creator_profile.tip_total_amount) == (1, 300)
+    assert good.processed_at is not None and good.last_error is None
+    assert bad.processed_at is None and bad.attempts == 1 and "foreign key" in bad.last_error
+
+
+def test_drain_records_one_tip_per_session_across_events(db, creator_profile):
+    # Stripe can send one checkout session under several event ids, in one batch or in later ones.
+    db.add_all([
+        checkout_event("evt_1", creator_profile.id, "cs_1"),
+        checkout_event("evt_2", creator_profile.id, "cs_1"),
+    ])
+    db.commit()
+    claimed, failed, notifications = process_stripe_webhook_events(db, batch_size=10, max_attempts=5)
+
+    db.add(checkout_event("evt_3", creator_profile.id, "cs_1"))
+    db.commit()
+    replay = process_stripe_webhook_events(db, batch_size=10, max_attempts=5)
+    db.refresh(creator_profile)
+
+    assert (claimed, failed, len(notifications)) == (2, 0, 1)
+    assert replay == (1, 0, [])
+    assert (creator_profile.tip_count, creator_profile.tip_total_amount) == (1, 300)
+    assert db.query(StripeWebhookEvent).filter(StripeWebhookEvent.processed_at.is_(None)).count() == 0
@@ -0,0 +1,37 @@
+from app.crud.tip import add_tips_bulk, get_tips_by_creator_before_async
+from app.db.base import Tip
+from app.db.session import AsyncSessionLocal
+from app.schemas.tip import TipCreate
+
+
+def feed(run_async, creator_profile_id: int, **kwargs) -> list[Tip]:
+    async def read():
+        async with AsyncSessionLocal() as async_db:
+            return await get_tips_by_creator_before_async(async_db, creator_profile_id, **kwargs)
+    return run_async(read())
+
+
+def test_tip_inserted_later_sorts_first(db, creator_profile, run_async):
+    # A higher id than the later tip gets, as a tip written by another worker can have.
+    db.add(Tip(id=100, creator_profile_id=creator_profile.id, amount=300, stripe_session_id="cs_earlier"))
+    db.commit()
+    add_tips_bulk(db, [TipCreate(creator_profile_id=creator_profile.id, amount=300, stripe_session_id="cs_later")])
+    db.commit()
+
+    tips = feed(run_async, creator_profile.id)
+
+    assert [tip.stripe_session_id for tip in tips] == ["cs_later", "cs_earlier"]
+    assert tips[0].created_at > tips[1].created_at
+
+
+def test_before_pages_strictly_older_tips(db, creator_profile, run_async):
+    for i in range(3):
+        add_tips_bulk(db, [TipCreate(creator_profile_id=creator_profile.id, amount=300, stripe_session_id=f"cs_{i}")])
+        db.commit()
+
+    first_page = feed(run_async, creator_profile.id, limit=2)
+    last = first_page[-1]
+    second_page = feed(run_async, creator_profile.id, limit=2, before=(last.created_at, last.id))
+
+    assert [tip.stripe_session_id for tip in first_page] == ["cs_2", "cs_1"]
+    assert [tip.stripe_session_id for tip in second_page] == ["cs_0"]
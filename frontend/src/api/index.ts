@@ -15,6 +15,17 @@ export const apiAuth: AxiosInstance = axios.create({
   headers: { 'Content-Type': 'application/json' }
 });
 
+// Refresh tokens are single use, so concurrent 401s must share one /auth/refresh call.
+let refreshInFlight: Promise<unknown> | null = null;
+
+function refreshTokens(): Promise<unknown> {
+  if (!refreshInFlight) {
+    refreshInFlight = apiAuth.post("/auth/refresh").finally(() => {
+      refreshInFlight = null;
+    });
+  }
+  return refreshInFlight;
+}
 
 apiAuth.interceptors.response.use(
   (response: AxiosResponse) => response,
@@ -28,7 +39,7 @@ apiAuth.interceptors.response.use(
     if (error.response?.status === 401 && originalRequest && !originalRequest._retry) {
       originalRequest._retry = true;
       try {
-        await apiAuth.post("/auth/refresh");  
+        await refreshTokens();
         return apiAuth(originalRequest);
       } catch (refreshError) {
         return Promise.reject(refreshError);
@@ -1,5 +1,6 @@
+import axios from "axios";
 import { apiAuth } from "./index";
-import type { CreateProfileRequest, CreateProfileResponse, GetProfileRequest, GetProfileResponse, GetCurrentUserResponse, UpdateProfileRequest, UpdateProfileResponse, UploadProfileImagesRequest, UploadProfileImagesResponse } from "../types/profile"
+import type { CreateProfileRequest, CreateProfileResponse, GetProfileRequest, GetProfileResponse, GetCurrentUserResponse, ProfileImageField, ProfileImageUpload, UpdateProfileRequest, UpdateProfileResponse, UploadProfileImagesRequest, UploadProfileImagesResponse } from "../types/profile"
 
 export async function getMyProfileData() : Promise<GetCurrentUserResponse>{
   const response = await apiAuth.get(`creator/me`);
@@ -11,29 +12,43 @@ export async function createCreatorProfile(requestData: CreateProfileRequest): P
   return response.data;
 }
 
-export async function updateCreatorProfilePictures(requestData: UploadProfileImagesRequest): Promise<UploadProfileImagesResponse> {
+// Image bytes go straight from the browser to S3 through a presigned POST; the API only signs and confirms.
+async function uploadProfileImage(field: ProfileImageField, file: File): Promise<UploadProfileImagesResponse> {
+  const upload: ProfileImageUpload = (await apiAuth.post(`creator/profile/image-uploads`, {
+    field,
+    filename: file.name,
+    content_type: file.type,
+  })).data;
+
   const formData = new FormData();
-  const { profile_picture, profile_banner } = requestData
+  Object.entries(upload.fields).forEach(([name, value]) => formData.append(name, value));
+  formData.append("file", file);
+  await axios.post(upload.url, formData);
 
-  if (!profile_picture && !profile_banner) {
-    return {}
-  }
+  const response = await apiAuth.post(`creator/profile/image-uploads/confirm`, { field, key: upload.key });
+  return response.data;
+}
+
+export async function updateCreatorProfilePictures(requestData: UploadProfileImagesRequest): Promise<UploadProfileImagesResponse> {
+  const { profile_picture, profile_banner } = requestData
+  let response: UploadProfileImagesResponse = {}
 
   if (profile_picture) {
-    formData.append("profile_picture", profile_picture);
+    response = await uploadProfileImage("profile_picture", profile_picture);
   }
   if (profile_banner) {
-    formData.append("profile_banner", profile_banner);
+    response = await uploadProfileImage("profile_banner", profile_banner);
   }
-  const response = await apiAuth.put(`creator/profile/profile-pictures`, formData, {
-    headers: {
-      "Content-Type": "multipart/form-data",
-    },
-  });
-  return response.data;
+  return response;
 }
 
-export async function updateCreatorProfile(requestData: UpdateProfileRequest): Promise<UpdateProfileResponse> {
+// The image URLs come from the upload confirmations: the PATCH only returns a profile when text changed.
+export async function updateCreatorProfile(requestData: UpdateProfileRequest): Promise<Partial<UpdateProfileResponse>> {
+  const images = await updateCreatorProfilePictures({
+    profile_picture: requestData.profile_picture,
+    profile_banner: requestData.profile_banner,
+  });
+
   const formData = new FormData();
   if (requestData.display_name) {
       formData.append("display_name", requestData.display_name);
@@ -41,18 +56,15 @@ export async function updateCreatorProfile(requestData: UpdateProfileRequest): P
   if (requestData.bio) {
     formData.append("bio", requestData.bio);
   }
-  if (requestData.profile_picture) {
-    formData.append("profile_picture", requestData.profile_picture);
-  }
-  if (requestData.profile_banner) {
-    formData.append("profile_banner", requestData.profile_banner);
+  if (!requestData.display_name && !requestData.bio) {
+    return images;
   }
   const response = await apiAuth.patch(`creator/profile/update`, formData, {
     headers: {
       "Content-Type": "multipart/form-data",
     },
   });
-  return response.data;
+  return { ...images, ...response.data };
 }
 
 export async function getCreatorProfile(requestData: GetProfileRequest): Promise<GetProfileResponse> {
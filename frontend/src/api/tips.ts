@@ -2,6 +2,8 @@ import { api } from "./index";
 import type { GetTipRequest, GetTipResponse } from "../types/tip"
 
 export async function getTips(requestData: GetTipRequest): Promise<GetTipResponse> {
-    const response = await api.get(`tips/${requestData.creator_profile_id}?limit=${requestData.limit}&offset=${requestData.offset}`);
+    const params: Record<string, string | number> = { limit: requestData.limit };
+    if (requestData.cursor) params.cursor = requestData.cursor;
+    const response = await api.get(`tips/${requestData.creator_profile_id}`, { params });
     return response.data;
 }
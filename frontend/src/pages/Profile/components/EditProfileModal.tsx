@@ -70,12 +70,13 @@ export default function EditProfileModal({
     if (!hasChanges) return;
     try {
       setLoading(true);
-      const { display_name, bio, profile_picture_url, profile_banner_url } = await updateCreatorProfile(buildRequestData())
+      const updated = await updateCreatorProfile(buildRequestData())
+      // Anything the response leaves out did not change.
       onSave({
-        displayName: display_name,
-        bio: bio,
-        profilePictureUrl: profile_picture_url,
-        profileBannerUrl: profile_banner_url,
+        displayName: updated.display_name ?? displayName,
+        bio: updated.bio ?? bio,
+        profilePictureUrl: updated.profile_picture_url ?? initialProfilePicture ?? null,
+        profileBannerUrl: updated.profile_banner_url ?? initialProfileBanner ?? null,
       });
       onClose();
     } catch (err: any) {
@@ -12,27 +12,28 @@ interface TipsModalProps {
 
 export default function TipsModal({ isOpen, onClose, id, currency }: TipsModalProps) {
   const [tips, setTips] = useState<Tip[]>([]);
-  const [page, setPage] = useState(0);
+  const [cursor, setCursor] = useState<string | null>(null);
   const [hasMore, setHasMore] = useState(true);
   const modalRef = useRef<HTMLDialogElement>(null);
 
   useEffect(() => {
     if (isOpen) {
       modalRef.current?.showModal();
-      fetchTips(0);
+      fetchTips(null);
     } else {
       modalRef.current?.close();
     }
   }, [isOpen]);
 
-  const fetchTips = async (pageNum: number) => {
+  const fetchTips = async (pageCursor: string | null) => {
     if (id === null) return;
 
-    const { tips } = await getTips({creator_profile_id: id, limit: 15, offset: pageNum * 8})
-    
-    if (tips.length < 15) setHasMore(false);
+    const { tips, next_cursor } = await getTips({creator_profile_id: id, limit: 15, cursor: pageCursor})
 
-    if (pageNum === 0) {
+    setCursor(next_cursor);
+    setHasMore(next_cursor !== null);
+
+    if (pageCursor === null) {
       setTips(tips);
     } else {
       setTips(prev => [...prev, ...tips]);
@@ -58,11 +59,7 @@ export default function TipsModal({ isOpen, onClose, id, currency }: TipsModalPr
         {hasMore && (
             <button
             className="btn btn-md btn-outline btn-neutral hover:text-white rounded-full w-full mt-4"
-            onClick={() => {
-                const nextPage = page + 1;
-                setPage(nextPage);
-                fetchTips(nextPage);
-            }}
+            onClick={() => fetchTips(cursor)}
             >
             Load more
             </button>
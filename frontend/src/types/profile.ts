@@ -14,8 +14,8 @@ export interface CreateProfileResponse {
   is_bank_connected: boolean;
   tips: [any]
   youtube_channel_name: string;
-  profile_picture_url: string
-  profile_banner_url: string
+  profile_picture_url: string | null
+  profile_banner_url: string | null
 }
 
 export interface GetProfileRequest {
@@ -73,8 +73,8 @@ export interface UpdateProfileResponse {
   is_bank_connected: boolean;
   tips: [any]
   youtube_channel_name: string;
-  profile_picture_url: string
-  profile_banner_url: string
+  profile_picture_url: string | null
+  profile_banner_url: string | null
 }
 
 export interface UploadProfileImagesResponse {
@@ -85,4 +85,12 @@ export interface UploadProfileImagesResponse {
 export interface UploadProfileImagesRequest {
   profile_picture?: File | null
   profile_banner?: File | null
-}
\ No newline at end of file
+}
+export type ProfileImageField = "profile_picture" | "profile_banner"
+
+export interface ProfileImageUpload {
+  url: string
+  fields: Record<string, string>
+  key: string
+  expires_in: number
+}
@@ -9,10 +9,11 @@ export interface Tip {
 
 export interface GetTipResponse {
   tips: Tip[];
+  next_cursor: string | null;
 }
 
 export interface GetTipRequest {
     creator_profile_id: number;
     limit: number;
-    offset: number;
+    cursor?: string | null;
 }
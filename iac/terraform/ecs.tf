@@ -250,6 +250,11 @@ resource "aws_ecs_task_definition" "backend" {
           name  = "APP_ENV"
           value = "PRODUCTION"
         },
+        {
+          # nginx and the load balancer run in the VPC; their X-Forwarded-For names the real client.
+          name  = "TRUSTED_PROXIES"
+          value = jsonencode([data.aws_vpc.default.cidr_block])
+        },
       ],
       secrets = [
         {
@@ -328,7 +333,7 @@ resource "aws_ecs_task_definition" "worker" {
     {
       name    = "worker"
       image   = "${aws_ecr_repository.backend.repository_url}:latest"
-      command = ["celery", "-A", "app.celery.celery_task_queue", "worker", "--loglevel=info"]
+      command = ["celery", "-A", "app.celery.celery_task_queue", "worker", "-Q", "webhooks,emails,images,maintenance", "--loglevel=info"]
       environment = [
         {
           name  = "REDIS_HOST"
@@ -385,6 +390,77 @@ resource "aws_ecs_task_definition" "worker" {
   ])
 }
 
+# Celery beat: enqueues the periodic webhook drain and tip total reconciliation. Exactly one may run,
+# or every scheduled task is enqueued once per beat.
+resource "aws_ecs_task_definition" "beat" {
+  family                   = "beat-task"
+  requires_compatibilities = ["FARGATE"]
+  network_mode             = "awsvpc"
+  cpu                      = "256"
+  memory                   = "512"
+  execution_role_arn       = aws_iam_role.ecs_task_execution_role.arn
+
+  container_definitions = jsonencode([
+    {
+      name    = "beat"
+      image   = "${aws_ecr_repository.backend.repository_url}:latest"
+      command = ["celery", "-A", "app.celery.celery_task_queue", "beat", "--loglevel=info"]
+      environment = [
+        {
+          name  = "REDIS_HOST"
+          value = "redis.local"
+        },
+        {
+          name  = "REDIS_PORT"
+          value = "6379"
+        },
+        {
+          name  = "REDIS_DB"
+          value = "0"
+        }
+      ]
+      secrets = [
+        {
+          name      = "stripe_api_key"
+          valueFrom = data.aws_secretsmanager_secret.stripe_api_key.arn
+        },
+        {
+          name      = "stripe_webhook_secret_checkout"
+          valueFrom = data.aws_secretsmanager_secret.stripe_webhook_secret_checkout.arn
+        },
+        {
+          name      = "stripe_webhook_secret_connect"
+          valueFrom = data.aws_secretsmanager_secret.stripe_webhook_secret_connect.arn
+        },
+        {
+          name      = "send_grid_api_key"
+          valueFrom = data.aws_secretsmanager_secret.send_grid_api_key.arn
+        },
+        {
+          name      = "access_secret_key"
+          valueFrom = data.aws_secretsmanager_secret.access_secret_key.arn
+        },
+        {
+          name      = "refresh_secret_key"
+          valueFrom = data.aws_secretsmanager_secret.refresh_secret_key.arn
+        },
+        {
+          name      = "database_url"
+          valueFrom = data.aws_secretsmanager_secret.database_url.arn
+        }
+      ]
+      logConfiguration = {
+        logDriver = "awslogs",
+        options = {
+          awslogs-group         = aws_cloudwatch_log_group.ecs_worker.name,
+          awslogs-region        = var.region,
+          awslogs-stream-prefix = "beat"
+        }
+      }
+    }
+  ])
+}
+
 resource "aws_service_discovery_private_dns_namespace" "namespace" {
   name        = "local"
   description = "Private DNS namespace for ECS"
@@ -463,6 +539,25 @@ resource "aws_ecs_service" "worker" {
   depends_on = [aws_ecs_cluster.main]
 }
 
+# Stops the old beat before starting the new one, so a deploy never runs two.
+resource "aws_ecs_service" "beat" {
+  name                               = "beat-service"
+  cluster                            = aws_ecs_cluster.main.id
+  task_definition                    = aws_ecs_task_definition.beat.arn
+  launch_type                        = "FARGATE"
+  desired_count                      = 1
+  deployment_minimum_healthy_percent = 0
+  deployment_maximum_percent         = 100
+
+  network_configuration {
+    subnets          = data.aws_subnets.default.ids
+    assign_public_ip = true
+    security_groups  = [aws_security_group.worker_sg.id]
+  }
+
+  depends_on = [aws_ecs_cluster.main]
+}
+
 resource "aws_service_discovery_service" "redis" {
   name = "redis"
 